@@ -0,0 +1,246 @@
+"""
+Batch quiz generation for many URLs at once (e.g. a course syllabus).
+
+Shared by POST /api/generate_quiz/batch and the generate_batch.py CLI:
+URLs are deduplicated by article key, already generated articles are
+found with one IN query, missing articles are fetched through a bounded
+pool, LLM calls fan out under the shared rate limiter, and all new
+quizzes are saved in one transaction. Progress is reported as a stream
+of per-item events.
+
+With pack=True, short articles are bin-packed several to a prompt as
+they are fetched; each pack is generated as soon as it is full, and the
+rest once all fetches are done (see packing.py).
+"""
+import asyncio
+import logging
+from collections import Counter
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from config import settings
+from database import Quiz, resolve_aliases
+from llm_client import LLMCapacityError, llm_manager
+from llm_quiz_generator import generate_quiz_from_article_async
+from packing import PackBins, PackItem, cached_quiz, generate_packed, is_packable, packing_report
+from quiz_pipeline import PreparedArticle, prepare_article, save_quizzes_async, with_session
+from scraper import article_key_from_url, validate_wikipedia_url
+from token_accounting import TokenUsage
+
+logger = logging.getLogger(__name__)
+
+
+def _item(url: str, status: str, **fields) -> dict:
+    return {"event": "item", "url": url, "status": status, **fields}
+
+
+def _existing_quizzes(db, article_keys: List[str]) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """Each key's target article (redirect titles seen before resolve) and the quiz ids by target"""
+    resolved = resolve_aliases(db, article_keys)
+    rows = (
+        db.query(Quiz.id, Quiz.article_key)
+        .filter(Quiz.article_key.in_(set(resolved.values())))
+        .all()
+    )
+    return resolved, {row.article_key: row.id for row in rows}
+
+
+# Queued by each task as it finishes
+_TASK_DONE = object()
+
+
+async def _drain(tasks: List[asyncio.Task], events: asyncio.Queue) -> AsyncIterator[dict]:
+    """Yield queued events until every task has finished, including tasks added meanwhile"""
+    finished = 0
+    while finished < len(tasks):
+        event = await events.get()
+        if event is _TASK_DONE:
+            finished += 1
+        else:
+            yield event
+
+
+def read_url_file(path: str) -> List[str]:
+    """URLs from a test_urls.txt-style file: one per line, blank lines and # comments skipped"""
+    with open(path, encoding="utf-8") as handle:
+        return [
+            line.strip()
+            for line in handle
+            if line.strip() and not line.strip().startswith("#")
+        ]
+
+
+async def run_batch(urls: List[str], force: bool = False, pack: bool = False) -> AsyncIterator[dict]:
+    """
+    Generate quizzes for a list of URLs, yielding progress events.
+
+    Yields {"event": "item", "url", "status", ...} as each article moves
+    through invalid / cached / scraping / generating / generated / saved
+    / failed, then one {"event": "summary"} with the totals (and, in
+    packing mode, the packing report).
+    """
+    counts = {"requested": len(urls), "unique": 0, "cached": 0, "generated": 0, "failed": 0}
+
+    # Dedupe by canonical article key; the first URL seen for a key is used
+    pending: Dict[str, str] = {}
+    for url in urls:
+        if not validate_wikipedia_url(url):
+            counts["failed"] += 1
+            yield _item(url, "invalid", error="Invalid Wikipedia URL")
+            continue
+        pending.setdefault(article_key_from_url(url), url)
+    counts["unique"] = len(pending)
+
+    # One IN query finds everything that already has a quiz
+    if not force and pending:
+        resolved, quiz_ids = await asyncio.to_thread(with_session, _existing_quizzes, list(pending))
+        for article_key, target in resolved.items():
+            if target in quiz_ids:
+                counts["cached"] += 1
+                yield _item(pending.pop(article_key), "cached", quiz_id=quiz_ids[target])
+
+    events: asyncio.Queue = asyncio.Queue()
+    fetch_pool = asyncio.Semaphore(settings.BATCH_FETCH_CONCURRENCY)
+    # Items wait here rather than inside the limiter, so its queue timeout
+    # only covers an item's own turn
+    llm_pool = asyncio.Semaphore(llm_manager.max_concurrency)
+    results: List[tuple] = []
+    tasks: List[asyncio.Task] = []
+    packer = PackBins()
+    fetching = len(pending)
+    stopped = False
+    # This batch's packing counts; packing_stats keeps the process totals
+    batch_packing: Counter = Counter()
+
+    def fail(url: str, error: Exception) -> None:
+        counts["failed"] += 1
+        if isinstance(error, HTTPException):
+            message = str(error.detail)
+        elif isinstance(error, LLMCapacityError):
+            message = str(error)
+        else:
+            message = f"LLM error: {str(error)}"
+        events.put_nowait(_item(url, "failed", error=message))
+
+    def generated(url: str, prepared: PreparedArticle, quiz_data: dict, usage: Optional[TokenUsage]) -> None:
+        results.append((url, prepared, quiz_data, usage))
+        events.put_nowait(_item(url, "generated", questions=len(quiz_data["quiz"])))
+
+    async def generate_one(url: str, prepared: PreparedArticle) -> None:
+        usage = TokenUsage()
+        try:
+            async with llm_pool:
+                events.put_nowait(_item(url, "generating"))
+                quiz_data = await generate_quiz_from_article_async(prepared.title, prepared.clean_text, usage)
+        except Exception as e:
+            fail(url, e)
+            return
+        generated(url, prepared, quiz_data, usage)
+
+    async def generate_pack(members: List[tuple]) -> None:
+        for url, _ in members:
+            events.put_nowait(_item(url, "generating", packed=len(members)))
+        quizzes = await generate_packed(
+            [PackItem(prepared.title, prepared.clean_text) for _, prepared in members],
+            batch_packing,
+            llm_pool
+        )
+        for (url, prepared), (quiz_data, usage) in zip(members, quizzes):
+            if isinstance(quiz_data, Exception):
+                fail(url, quiz_data)
+            else:
+                generated(url, prepared, quiz_data, usage)
+
+    def spawn(work) -> None:
+        task = asyncio.create_task(work)
+        task.add_done_callback(lambda _: events.put_nowait(_TASK_DONE))
+        tasks.append(task)
+
+    def start_packs(bins: List[list]) -> None:
+        if stopped:
+            return
+        for members in bins:
+            if len(members) == 1:
+                spawn(generate_one(*members[0]))
+            else:
+                logger.info("→ Packing %s short articles into one request", len(members))
+                spawn(generate_pack(members))
+
+    def add_to_pack(url: str, prepared: PreparedArticle, item: PackItem) -> None:
+        quiz_data = cached_quiz(item)
+        if quiz_data is not None:
+            generated(url, prepared, quiz_data, TokenUsage())
+        else:
+            # Full packs start now; partly filled ones once every fetch is done
+            start_packs(packer.add((url, prepared), item))
+
+    async def prepare(article_key: str, url: str) -> Optional[PreparedArticle]:
+        """The article ready for its LLM call, or None if it failed or already has a quiz"""
+        try:
+            async with fetch_pool:
+                events.put_nowait(_item(url, "scraping"))
+                prepared = await prepare_article(url, article_key, force, lambda status: None)
+        except Exception as e:
+            fail(url, e)
+            return None
+
+        if isinstance(prepared, dict):
+            # Redirect to an article that already has a quiz
+            counts["cached"] += 1
+            events.put_nowait(_item(url, "cached", quiz_id=prepared["id"]))
+            return None
+        return prepared
+
+    async def process(article_key: str, url: str) -> None:
+        nonlocal fetching
+        single = None
+        try:
+            prepared = await prepare(article_key, url)
+            if prepared is not None:
+                item = PackItem(prepared.title, prepared.clean_text)
+                if pack and is_packable(item):
+                    add_to_pack(url, prepared, item)
+                else:
+                    single = prepared
+        finally:
+            fetching -= 1
+            if not fetching:
+                start_packs(packer.flush())
+
+        if single is not None:
+            await generate_one(url, single)
+
+    for key, url in pending.items():
+        spawn(process(key, url))
+    try:
+        async for event in _drain(tasks, events):
+            yield event
+    finally:
+        # Client went away: stop fetching and generating for it
+        stopped = True
+        for task in tasks:
+            task.cancel()
+
+    # All new quizzes go to the database in one transaction
+    if results:
+        error: Optional[str] = None
+        saved: List[Optional[dict]] = [None] * len(results)
+        try:
+            saved = await save_quizzes_async(
+                [(prepared, quiz_data, usage) for _, prepared, quiz_data, usage in results]
+            )
+        except HTTPException as e:
+            error = str(e.detail)
+
+        for (url, _, _, _), body in zip(results, saved):
+            if body is None:
+                counts["failed"] += 1
+                yield _item(url, "failed", error=error)
+            else:
+                counts["generated"] += 1
+                yield _item(url, "saved", quiz_id=body["id"])
+
+    if pack:
+        counts["packing"] = packing_report(batch_packing)
+    yield {"event": "summary", **counts}
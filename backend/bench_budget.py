@@ -0,0 +1,80 @@
+"""CPU time and allocations of budgeted extraction versus extract-then-truncate
+
+For the longest saved pages in sample_data/pages, compares:
+
+- truncate: every paragraph extracted and cleaned, the text joined, split
+            into words and cut to 3000 words, then cut to 15000
+            characters for the prompt (the two limits used before the
+            token budget)
+- budget:   the extractor stopping once ARTICLE_TOKEN_BUDGET is spent
+
+Reports median CPU time and the tracemalloc peak of one extraction, per
+backend. Parsing the page into a tree is the same in both modes, so the
+difference is the text work the budget avoids. tracemalloc only sees
+Python allocations: the bs4 tree is counted, lxml's C tree is not.
+
+Usage:
+    python bench_budget.py [--repeat 20] [--pages World_War_II Climate_change]
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from config import settings
+from scraper import LXML_AVAILABLE, parse_wikipedia_html
+from wiki_standin import saved_pages
+
+MODES = ("truncate", "budget")
+
+
+def extract(html: str, backend: str, mode: str) -> str:
+    if mode == "budget":
+        return parse_wikipedia_html(html, backend=backend)[1]
+    budget = settings.ARTICLE_TOKEN_BUDGET
+    settings.ARTICLE_TOKEN_BUDGET = 10 ** 9
+    try:
+        text = parse_wikipedia_html(html, backend=backend)[1]
+    finally:
+        settings.ARTICLE_TOKEN_BUDGET = budget
+    words = text.split()
+    if len(words) > 3000:
+        text = ' '.join(words[:3000]) + "..."
+    return text[:15000]
+
+
+def measure(html: str, backend: str, mode: str, repeat: int):
+    cpu = []
+    for _ in range(repeat):
+        started = time.process_time()
+        extract(html, backend, mode)
+        cpu.append(time.process_time() - started)
+    tracemalloc.start()
+    text = extract(html, backend, mode)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(cpu), peak, len(text)
+
+
+def main(repeat: int, titles: list) -> None:
+    pages = saved_pages()
+    backends = ["bs4", "lxml"] if LXML_AVAILABLE else ["bs4"]
+    print(f"median CPU of {repeat} extractions, ARTICLE_TOKEN_BUDGET={settings.ARTICLE_TOKEN_BUDGET}")
+    print(f"{'page':<24} {'backend':<8} {'mode':<9} {'CPU ms':>8} {'peak KB':>9} {'chars':>7}")
+    for title in titles:
+        html = pages[title]
+        for backend in backends:
+            results = {mode: measure(html, backend, mode, repeat) for mode in MODES}
+            for mode, (cpu, peak, chars) in results.items():
+                print(f"{title:<24} {backend:<8} {mode:<9} {cpu * 1000:8.2f} {peak / 1024:9.0f} {chars:7}")
+            saved_cpu = 1 - results["budget"][0] / results["truncate"][0]
+            saved_peak = 1 - results["budget"][1] / results["truncate"][1]
+            print(f"{'':<24} {backend:<8} {'saved':<9} {saved_cpu:8.0%} {saved_peak:9.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Budgeted vs truncated extraction cost")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--pages", nargs="+", default=["World_War_II", "Climate_change"])
+    args = parser.parse_args()
+    main(args.repeat, args.pages)
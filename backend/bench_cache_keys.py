@@ -0,0 +1,87 @@
+"""Quiz cache hit rate over URL spellings of the sample_data/test_urls.txt articles
+
+Builds a corpus of ways the same articles get requested: the plain URL,
+percent-encoded titles, #fragments, ?oldid= revisions, a lower-case first
+letter, %20 for underscores and redirect titles. Every URL is requested
+twice, in shuffled order, against main.app with the fake LLM provider and
+the scraper routed to the local Wikipedia stand-in.
+
+Reports how many requests were answered from the quiz cache, how many LLM
+calls and page fetches they cost, and what keying the cache on the raw URL
+string (as before article keys) would have given for the same sequence.
+
+Usage:
+    python bench_cache_keys.py [--seed 0]
+"""
+import argparse
+import os
+import random
+import tempfile
+from pathlib import Path
+from urllib.parse import quote
+
+from wiki_standin import REDIRECTS, WikiStandIn, route_scraper
+
+URLS_FILE = Path(__file__).resolve().parent.parent / "sample_data" / "test_urls.txt"
+PREFIX = "https://en.wikipedia.org/wiki/"
+
+
+def url_variants(url: str) -> list:
+    title = url[len(PREFIX):]
+    variants = [
+        url,
+        PREFIX + quote(title, safe=""),
+        url + "#History",
+        url + "?oldid=1234567",
+        PREFIX + title[0].lower() + title[1:],
+        PREFIX + title.replace("_", "%20"),
+    ]
+    for alias, target in REDIRECTS.items():
+        if target == title:
+            variants += [PREFIX + alias, PREFIX + alias + "#Overview"]
+    return variants
+
+
+def main(seed: int) -> None:
+    urls = [line.strip() for line in URLS_FILE.read_text().splitlines() if line.strip()]
+    corpus = [variant for url in urls for variant in url_variants(url)] * 2
+    random.Random(seed).shuffle(corpus)
+
+    with tempfile.TemporaryDirectory() as tmp, WikiStandIn() as wiki:
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{tmp}/bench_cache_keys.db",
+            "LLM_PROVIDER": "fake",
+            "FAKE_LLM_LATENCY_MS": "0",
+            "FAKE_LLM_JITTER_MS": "0",
+            "LLM_REQUESTS_PER_MINUTE": "10000",
+            # Measure the quiz cache alone, not the content-hash LLM cache behind it
+            "LLM_CACHE_ENABLED": "False",
+            "LOG_LEVEL": "WARNING",
+        })
+        route_scraper(wiki.origin)
+        from fastapi.testclient import TestClient
+
+        import main as app_module
+        from llm_client import llm_manager
+
+        hits = 0
+        with TestClient(app_module.app) as client:
+            while not client.get("/health").json().get("database_ready"):
+                pass
+            for url in corpus:
+                response = client.post("/api/generate_quiz/", json={"url": url})
+                response.raise_for_status()
+                hits += response.json().get("cached", False)
+            llm_calls = llm_manager.get_provider().calls
+
+    raw_url_hits = len(corpus) - len(set(corpus))
+    print(f"{len(corpus)} requests: {len(urls)} articles, {len(set(corpus))} distinct URL strings")
+    print(f"article keys: {hits / len(corpus):6.1%} hit rate, {llm_calls} LLM calls, {wiki.fetches()} page fetches")
+    print(f"raw URL keys: {raw_url_hits / len(corpus):6.1%} hit rate, {len(set(corpus))} LLM calls (one per distinct URL)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quiz cache hit rate over URL variants")
+    parser.add_argument("--seed", type=int, default=0, help="Shuffle seed for the request order")
+    args = parser.parse_args()
+    main(args.seed)
@@ -0,0 +1,86 @@
+"""Quality and cost of compressing articles to LLM_CONTEXT_TOKEN_BUDGET
+
+For every saved page in sample_data/pages longer than the budget, the
+extracted article text (already capped at ARTICLE_TOKEN_BUDGET) is fitted
+into each --budgets token budget two ways:
+
+- truncate: the text cut at the budget, keeping the start of the article
+- compress: context_compressor.compress_article, the lead paragraph plus
+            the most entity-dense paragraphs spread across the article
+
+and compared with sending the full text. Quality is measured against the
+full text, as proxies for what the LLM can ask about:
+
+- entities: share of the distinct entities (proper nouns, numbers,
+            dates) of the full text that reach the prompt
+- coverage: share of the article's tenths with at least one paragraph in
+            the prompt
+
+Cost is the prompt tokens (what the provider bills and prefills before
+the first output token) and the median CPU time of building the text.
+
+Usage:
+    python bench_compress.py [--budgets 1500 2250 3000] [--repeat 50]
+"""
+import argparse
+import statistics
+import time
+
+from context_compressor import ENTITY_PATTERN, compress_article
+from scraper import parse_wikipedia_html
+from token_budget import char_budget, estimate_tokens
+from wiki_standin import saved_pages
+
+MODES = ("truncate", "compress")
+PARTS = 10
+
+
+def truncate(text: str, token_budget: int) -> str:
+    return text[:char_budget(token_budget)]
+
+
+def entities(text: str) -> set:
+    return set(ENTITY_PATTERN.findall(text))
+
+
+def coverage(full_text: str, prompt_text: str) -> float:
+    paragraphs = [part for part in full_text.split("\n\n") if part.strip()]
+    covered = {
+        n * PARTS // len(paragraphs)
+        for n, paragraph in enumerate(paragraphs)
+        if paragraph[:80] in prompt_text
+    }
+    return len(covered) / min(PARTS, len(paragraphs))
+
+
+def measure(text: str, mode: str, token_budget: int, repeat: int):
+    fit = compress_article if mode == "compress" else truncate
+    cpu = []
+    for _ in range(repeat):
+        started = time.process_time()
+        prompt_text = fit(text, token_budget)
+        cpu.append(time.process_time() - started)
+    recall = len(entities(prompt_text) & entities(text)) / len(entities(text))
+    return estimate_tokens(prompt_text), recall, coverage(text, prompt_text), statistics.median(cpu)
+
+
+def main(budgets: list, repeat: int) -> None:
+    texts = {title: parse_wikipedia_html(html)[1] for title, html in saved_pages().items()}
+    texts = {title: text for title, text in texts.items() if estimate_tokens(text) > min(budgets)}
+    full_tokens = statistics.mean(estimate_tokens(text) for text in texts.values())
+    print(f"{len(texts)} saved pages over the smallest budget, mean of per-page results")
+    print(f"{'budget':>7} {'mode':<9} {'tokens':>7} {'entities':>9} {'coverage':>9} {'CPU ms':>7}")
+    print(f"{'-':>7} {'full':<9} {full_tokens:7.0f} {1:9.0%} {1:9.0%} {0:7.2f}")
+    for token_budget in budgets:
+        for mode in MODES:
+            results = [measure(text, mode, token_budget, repeat) for text in texts.values()]
+            tokens, recall, covered, cpu = (statistics.mean(column) for column in zip(*results))
+            print(f"{token_budget:>7} {mode:<9} {tokens:7.0f} {recall:9.0%} {covered:9.0%} {cpu * 1000:7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Context compression quality and cost")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[1500, 2250, 3000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.budgets, args.repeat)
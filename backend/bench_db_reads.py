@@ -0,0 +1,86 @@
+"""Compare concurrent read throughput of the sync and async session paths
+
+Runs the history-page and quiz-detail queries from many coroutines on one
+event loop, as one uvicorn worker would, against DATABASE_URL. The sync
+path blocks the loop for every query; the async path yields while the
+driver waits on the database.
+
+Usage:
+    python bench_db_reads.py [--concurrency 1 16 64] [--requests 2000]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from database import Quiz, SessionLocal, close_async_engine, get_async_session_factory
+
+
+def sync_read(quiz_id: int) -> None:
+    db = SessionLocal()
+    try:
+        db.query(Quiz.id, Quiz.url, Quiz.title, Quiz.date_generated).order_by(
+            Quiz.date_generated.desc(), Quiz.id.desc()
+        ).limit(50).all()
+        db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    finally:
+        db.close()
+
+
+async def async_read(quiz_id: int) -> None:
+    async with get_async_session_factory()() as db:
+        await db.execute(
+            select(Quiz.id, Quiz.url, Quiz.title, Quiz.date_generated)
+            .order_by(Quiz.date_generated.desc(), Quiz.id.desc())
+            .limit(50)
+        )
+        await db.get(Quiz, quiz_id)
+
+
+async def run(mode: str, concurrency: int, requests: int, quiz_ids: list) -> float:
+    """Requests per second with `concurrency` coroutines sharing `requests` reads"""
+    remaining = iter(range(requests))
+
+    async def client():
+        for n in remaining:
+            quiz_id = quiz_ids[n % len(quiz_ids)]
+            if mode == "sync":
+                sync_read(quiz_id)
+                # A real handler yields to the loop between requests
+                await asyncio.sleep(0)
+            else:
+                await async_read(quiz_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+
+async def main(levels: list, requests: int) -> None:
+    db = SessionLocal()
+    try:
+        quiz_ids = [row.id for row in db.query(Quiz.id).limit(1000)]
+    finally:
+        db.close()
+    if not quiz_ids:
+        raise SystemExit("No quizzes in the database; generate a few first")
+
+    # Warm both pools
+    await run("sync", 1, 10, quiz_ids)
+    await run("async", 1, 10, quiz_ids)
+
+    print(f"{'concurrency':>11} {'sync req/s':>11} {'async req/s':>12}")
+    for concurrency in levels:
+        sync_rate = await run("sync", concurrency, requests, quiz_ids)
+        async_rate = await run("async", concurrency, requests, quiz_ids)
+        print(f"{concurrency:>11} {sync_rate:>11.0f} {async_rate:>12.0f}")
+    await close_async_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync vs async read throughput on one event loop")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.requests))
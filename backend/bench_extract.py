@@ -0,0 +1,53 @@
+"""Article extraction time per backend over the saved pages in sample_data/pages
+
+Parses every saved page with each available backend and reports the
+median time per page, the throughput, and whether the backends agree.
+
+Usage:
+    python bench_extract.py [--repeat 20]
+"""
+import argparse
+import statistics
+import time
+
+from scraper import LXML_AVAILABLE, parse_wikipedia_html
+from wiki_standin import saved_pages
+
+
+def time_parse(html: str, backend: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse_wikipedia_html(html, backend=backend)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(repeat: int) -> None:
+    pages = saved_pages()
+    backends = ["bs4", "lxml"] if LXML_AVAILABLE else ["bs4"]
+    print(f"{len(pages)} pages, median of {repeat} parses")
+    print(f"{'page':<32} {'KB':>6} " + " ".join(f"{backend + ' ms':>9}" for backend in backends) + "  same")
+    totals = dict.fromkeys(backends, 0.0)
+    for title, html in pages.items():
+        outputs = {backend: parse_wikipedia_html(html, backend=backend) for backend in backends}
+        medians = {backend: time_parse(html, backend, repeat) for backend in backends}
+        for backend, seconds in medians.items():
+            totals[backend] += seconds
+        same = len(set(outputs.values())) == 1
+        print(
+            f"{title:<32} {len(html.encode()) / 1024:6.0f} "
+            + " ".join(f"{medians[backend] * 1000:9.2f}" for backend in backends)
+            + f"  {'yes' if same else 'NO'}"
+        )
+    size_mb = sum(len(html.encode()) for html in pages.values()) / 2**20
+    print(f"{'total':<32} {size_mb * 1024:6.0f} " + " ".join(f"{totals[backend] * 1000:9.2f}" for backend in backends))
+    for backend in backends:
+        print(f"{backend}: {size_mb / totals[backend]:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Article extraction microbenchmark")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.repeat)
@@ -0,0 +1,112 @@
+"""Generation success rate and latency under injected LLM faults
+
+Runs --generations quiz generations (--concurrency at a time) through
+generate_quiz_from_article_async against the fake provider. The provider
+fails a share of calls with transient 503s, quota 429s or malformed JSON.
+Each fault mix runs under two retry setups:
+
+- legacy:  the original loop; transient errors retried twice after 5 s
+           and 10 s, quota and malformed output fail at once
+- current: per-class budgets with jittered backoff, one repair call for
+           malformed output, all under LLM_REQUEST_DEADLINE
+
+Reports the success rate, p50/p99 latency of all generations and the
+number of LLM calls made.
+
+Usage:
+    python bench_faults.py [--generations 200] [--concurrency 20] [--latency-ms 200]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+# (transient, quota, malformed) shares of LLM calls
+FAULT_MIXES = [(0.0, 0.0, 0.0), (0.1, 0.0, 0.0), (0.1, 0.05, 0.05), (0.2, 0.1, 0.1)]
+
+
+def legacy_policies():
+    from retry import RetryPolicy
+
+    class LinearPolicy(RetryPolicy):
+        def backoff(self, retry_number: int) -> float:
+            return (retry_number + 1) * 5.0
+
+    return {"transient": LinearPolicy(max_retries=2)}
+
+
+async def run_mix(generations: int, concurrency: int, latency_ms: float, mix: tuple, seed: int):
+    from llm_client import llm_manager
+    from llm_providers import FakeProvider
+    from llm_quiz_generator import generate_quiz_from_article_async
+
+    transient, quota, malformed = mix
+    provider = FakeProvider(
+        "fake-quiz-model", {}, latency_ms=latency_ms, jitter_ms=latency_ms / 2,
+        failure_rate=transient, quota_rate=quota, malformed_rate=malformed, seed=seed
+    )
+    llm_manager._provider = provider
+    semaphore = asyncio.Semaphore(concurrency)
+    timings, successes = [], 0
+
+    async def generate(n: int) -> None:
+        nonlocal successes
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await generate_quiz_from_article_async(
+                    f"Fault bench {n}", f"Fault bench article number {n} about history and science. " * 20
+                )
+                successes += 1
+            except Exception:
+                pass
+            timings.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(generate(n) for n in range(generations)))
+    timings.sort()
+    return successes / generations, timings[len(timings) // 2], timings[int(len(timings) * 0.99)], provider.calls
+
+
+def main(generations: int, concurrency: int, latency_ms: float, seed: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{tmp}/bench_faults.db",
+            "LLM_PROVIDER": "fake",
+            "LLM_MAX_CONCURRENCY": str(concurrency),
+            "LLM_REQUESTS_PER_MINUTE": "100000",
+            "LLM_TOKENS_PER_MINUTE": "100000000",
+            "LLM_CACHE_ENABLED": "False",
+        })
+        # Every injected fault logs a warning; keep the report readable
+        logging.basicConfig(level=logging.ERROR)
+        import llm_quiz_generator
+        import retry
+
+        current = dict(retry.RETRY_POLICIES)
+        print(f"{generations} generations, {concurrency} concurrent, {latency_ms:g} ms per LLM call")
+        print(f"{'503/429/bad':<13} {'retries':<8} {'success':>8} {'p50 s':>7} {'p99 s':>7} {'LLM calls':>10}")
+
+        # One event loop for every run: the shared LLM limiter binds to it
+        async def run_all() -> None:
+            for mix in FAULT_MIXES:
+                for name in ("legacy", "current"):
+                    retry.RETRY_POLICIES.clear()
+                    retry.RETRY_POLICIES.update(legacy_policies() if name == "legacy" else current)
+                    llm_quiz_generator.REPAIRABLE = () if name == "legacy" else retry.REPAIRABLE
+                    success, p50, p99, calls = await run_mix(generations, concurrency, latency_ms, mix, seed)
+                    label = "/".join(f"{share:.0%}" for share in mix)
+                    print(f"{label:<13} {name:<8} {success:8.1%} {p50:7.2f} {p99:7.2f} {calls:10}")
+
+        asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM fault injection benchmark")
+    parser.add_argument("--generations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.generations, args.concurrency, args.latency_ms, args.seed)
@@ -0,0 +1,222 @@
+"""History endpoint cost at scale: full-table load, OFFSET pages and keyset pages
+
+Seeds two temporary SQLite databases with --rows quizzes each:
+
+- legacy: the original quizzes table, with the scraped HTML in the row
+- current: today's schema, HTML compressed in quiz_contents
+
+and measures one history response under three strategies:
+
+- full:   db.query(Quiz).order_by(date_generated.desc()).all(), every
+          column of every row serialized, as /api/history/ used to
+- offset: one 50-row page of summary columns at OFFSET rows/2
+- keyset: the same page through the (date_generated, id) cursor the
+          handler uses now, plus the first page for reference
+
+Each strategy runs in its own child process so the reported peak RSS
+belongs to that strategy alone.
+
+Usage:
+    python bench_history.py [--rows 10000 100000] [--html-kb 10] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Integer, String, Text, and_, create_engine, insert, or_, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+PAGE_SIZE = 50
+STRATEGIES = ("full", "offset", "keyset", "keyset-first")
+
+LegacyBase = declarative_base()
+
+
+class LegacyQuiz(LegacyBase):
+    """The quizzes table before the content side table and keyset paging"""
+    __tablename__ = "quizzes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(500), unique=True, nullable=False, index=True)
+    title = Column(String(255), nullable=False)
+    date_generated = Column(DateTime, default=datetime.utcnow)
+    scraped_content = Column(Text, nullable=True)
+    full_quiz_data = Column(Text, nullable=False)
+
+
+def sample_rows(rows: int, html_kb: int):
+    html = ("<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 16 + "</p>\n") * (html_kb * 1024 // 920 + 1)
+    html = html[:html_kb * 1024]
+    quiz_data = json.dumps({
+        "title": "Benchmark article",
+        "summary": "A synthetic article. " * 10,
+        "quiz": [
+            {"question": f"Question {n}?", "options": ["A", "B", "C", "D"], "answer": "A",
+             "difficulty": "easy", "explanation": "Because. " * 10}
+            for n in range(10)
+        ],
+        "related_topics": ["One", "Two", "Three"],
+    })
+    started = datetime(2024, 1, 1)
+    for n in range(rows):
+        yield {
+            "url": f"https://en.wikipedia.org/wiki/History_bench_{n}",
+            "article_key": f"History_bench_{n}",
+            "title": f"History bench {n}",
+            # Every tenth quiz shares its timestamp with the previous one
+            "date_generated": started + timedelta(seconds=n - n // 10),
+            "scraped_content": html,
+            "full_quiz_data": quiz_data,
+        }
+
+
+def seed(legacy_url: str, current_url: str, rows: int, html_kb: int) -> None:
+    from database import Base, Quiz, QuizContent, _compress
+
+    legacy = create_engine(legacy_url)
+    current = create_engine(current_url)
+    LegacyBase.metadata.create_all(legacy)
+    Base.metadata.create_all(current)
+    batch = []
+    for row in sample_rows(rows, html_kb):
+        batch.append(row)
+        if len(batch) == 5000:
+            _insert(legacy, current, batch, LegacyQuiz, Quiz, QuizContent, _compress)
+            batch = []
+    if batch:
+        _insert(legacy, current, batch, LegacyQuiz, Quiz, QuizContent, _compress)
+    legacy.dispose()
+    current.dispose()
+
+
+def _insert(legacy, current, batch, legacy_model, quiz_model, content_model, compress) -> None:
+    with legacy.begin() as conn:
+        conn.execute(insert(legacy_model), [
+            {key: row[key] for key in ("url", "title", "date_generated", "scraped_content", "full_quiz_data")}
+            for row in batch
+        ])
+    compressed = compress(batch[0]["scraped_content"])
+    with current.begin() as conn:
+        ids = conn.execute(
+            insert(quiz_model).returning(quiz_model.id),
+            [
+                {key: row[key] for key in ("url", "article_key", "title", "date_generated", "full_quiz_data")}
+                for row in batch
+            ]
+        ).scalars().all()
+        conn.execute(insert(content_model), [
+            {"quiz_id": quiz_id, "raw_html_z": compressed} for quiz_id in ids
+        ])
+
+
+def run_strategy(strategy: str, legacy_url: str, current_url: str, rows: int, repeat: int) -> dict:
+    """Child process: time one strategy and report its peak RSS"""
+    from database import Quiz
+    from models import QuizHistoryItem
+
+    if strategy == "full":
+        engine = create_engine(legacy_url)
+
+        def respond(db):
+            quizzes = db.query(LegacyQuiz).order_by(LegacyQuiz.date_generated.desc()).all()
+            return json.dumps([
+                {
+                    "id": quiz.id,
+                    "url": quiz.url,
+                    "title": quiz.title,
+                    "date_generated": quiz.date_generated.isoformat(),
+                    "scraped_content": quiz.scraped_content,
+                    "full_quiz_data": quiz.full_quiz_data,
+                }
+                for quiz in quizzes
+            ])
+    else:
+        engine = create_engine(current_url)
+        summary = select(Quiz.id, Quiz.url, Quiz.title, Quiz.date_generated).order_by(
+            Quiz.date_generated.desc(), Quiz.id.desc()
+        )
+        with engine.connect() as conn:
+            middle = conn.execute(summary.offset(rows // 2).limit(1)).one()
+
+        if strategy == "offset":
+            query = summary.offset(rows // 2).limit(PAGE_SIZE + 1)
+        elif strategy == "keyset":
+            query = summary.where(
+                Quiz.date_generated <= middle.date_generated,
+                or_(
+                    Quiz.date_generated < middle.date_generated,
+                    and_(Quiz.date_generated == middle.date_generated, Quiz.id < middle.id)
+                )
+            ).limit(PAGE_SIZE + 1)
+        else:
+            query = summary.limit(PAGE_SIZE + 1)
+
+        def respond(db):
+            page = db.execute(query).all()[:PAGE_SIZE]
+            return json.dumps([
+                QuizHistoryItem.model_validate(row).model_dump(mode="json") for row in page
+            ])
+
+    Session = sessionmaker(bind=engine)
+    timings = []
+    body_bytes = 0
+    for _ in range(repeat):
+        db = Session()
+        try:
+            started = time.perf_counter()
+            body_bytes = len(respond(db))
+            timings.append(time.perf_counter() - started)
+        finally:
+            db.close()
+    engine.dispose()
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "body_kb": body_bytes / 1024,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main(row_counts: list, html_kb: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        # database.py needs a URL at import; every engine here is built explicitly
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/unused.db"
+        print(f"{html_kb} KB of HTML per quiz, median of {repeat} runs, page size {PAGE_SIZE}")
+        print(f"{'rows':>7} {'strategy':<13} {'median ms':>10} {'body KB':>10} {'peak RSS MB':>12}")
+        for rows in row_counts:
+            legacy_url = f"sqlite:///{tmp}/legacy_{rows}.db"
+            current_url = f"sqlite:///{tmp}/current_{rows}.db"
+            seed(legacy_url, current_url, rows, html_kb)
+            for strategy in STRATEGIES:
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", strategy, legacy_url, current_url,
+                     str(rows), str(repeat)],
+                    check=True, capture_output=True, text=True,
+                    env={**os.environ, "LOG_LEVEL": "WARNING"}
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(
+                    f"{rows:>7} {strategy:<13} {result['median_ms']:10.2f} "
+                    f"{result['body_kb']:10.1f} {result['peak_rss_mb']:12.1f}"
+                )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        strategy, legacy_url, current_url, rows, repeat = sys.argv[2:7]
+        os.environ.setdefault("DATABASE_URL", current_url)
+        print(json.dumps(run_strategy(strategy, legacy_url, current_url, int(rows), int(repeat))))
+        sys.exit(0)
+    parser = argparse.ArgumentParser(description="History endpoint: full load vs OFFSET vs keyset")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--html-kb", type=int, default=10, help="Scraped HTML per quiz")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.html_kb, args.repeat)
@@ -0,0 +1,124 @@
+"""Load test: /health and /api/history/ latency while generations are in flight
+
+Starts the app under uvicorn (one worker) in a subprocess with the fake LLM
+provider and the scraper routed to a local Wikipedia stand-in, then probes
+/health and /api/history/ back to back: first while idle, then while
+--generations generations of different articles run concurrently. On a
+non-blocking pipeline the probe latencies under load stay close to idle.
+
+Uses DATABASE_URL from the environment, or a temporary SQLite file.
+
+Usage:
+    python bench_load.py [--generations 20] [--llm-latency-ms 2000] [--fetch-delay-ms 200]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from wiki_standin import WikiStandIn
+
+SERVER = (
+    "import sys, wiki_standin, uvicorn; "
+    "wiki_standin.route_scraper(sys.argv[1]); "
+    "uvicorn.run('main:app', port=int(sys.argv[2]), log_level='warning')"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def summary(timings: list) -> str:
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2] * 1000
+    p95 = timings[int(len(timings) * 0.95)] * 1000
+    return f"p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  max {timings[-1] * 1000:7.1f} ms  (n={len(timings)})"
+
+
+async def probe(client: httpx.AsyncClient, timings: dict, until) -> None:
+    """Alternate /health and /api/history/ requests until until() is true"""
+    while not until():
+        for path in ("/health", "/api/history/"):
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            timings[path].append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+
+async def run(base_url: str, generations: int, idle_seconds: float) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        while True:
+            try:
+                if (await client.get("/health")).json().get("database_ready"):
+                    break
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+
+        idle = {"/health": [], "/api/history/": []}
+        deadline = time.perf_counter() + idle_seconds
+        await probe(client, idle, lambda: time.perf_counter() > deadline)
+
+        loaded = {"/health": [], "/api/history/": []}
+        durations = []
+
+        async def generate(n: int) -> None:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/generate_quiz/",
+                json={"url": f"https://en.wikipedia.org/wiki/Load_test_article_{n}_{int(time.time())}"}
+            )
+            response.raise_for_status()
+            durations.append(time.perf_counter() - started)
+
+        tasks = [asyncio.create_task(generate(n)) for n in range(generations)]
+        await asyncio.sleep(0.05)  # let every generation start
+        await probe(client, loaded, lambda: all(task.done() for task in tasks))
+        await asyncio.gather(*tasks)
+
+    for path in idle:
+        print(f"{path:<14} idle     {summary(idle[path])}")
+        print(f"{path:<14} loaded   {summary(loaded[path])}")
+    print(f"{generations} generations: {summary(durations)}")
+
+
+def main(generations: int, llm_latency_ms: float, fetch_delay_ms: float, idle_seconds: float) -> None:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp, WikiStandIn(delay=fetch_delay_ms / 1000) as wiki:
+        env = {
+            **os.environ,
+            "DATABASE_URL": os.environ.get("DATABASE_URL") or f"sqlite:///{tmp}/bench_load.db",
+            "LLM_PROVIDER": "fake",
+            "FAKE_LLM_LATENCY_MS": str(llm_latency_ms),
+            "FAKE_LLM_JITTER_MS": "0",
+            "LLM_MAX_CONCURRENCY": str(generations),
+            "LLM_REQUESTS_PER_MINUTE": "10000",
+            "LLM_CACHE_ENABLED": "False",
+            "LOG_LEVEL": "WARNING",
+        }
+        server = subprocess.Popen([sys.executable, "-c", SERVER, wiki.origin, str(port)], env=env)
+        try:
+            asyncio.run(run(f"http://127.0.0.1:{port}", generations, idle_seconds))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Probe latency under concurrent generations")
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=2000)
+    parser.add_argument("--fetch-delay-ms", type=float, default=200)
+    parser.add_argument("--idle-seconds", type=float, default=3)
+    args = parser.parse_args()
+    main(args.generations, args.llm_latency_ms, args.fetch_delay_ms, args.idle_seconds)
@@ -0,0 +1,115 @@
+"""Per-request database latency: NullPool + SELECT 1 versus the pooled engine
+
+Replays what one history read and one detail read cost per request under
+three setups, against DATABASE_URL (MySQL) or a temporary SQLite file:
+
+- null+select1: NullPool and the SELECT 1 get_db used to send first
+- queue:        QueuePool with pool_pre_ping (the default)
+- queue-noping: QueuePool without pre-ping
+
+SQLite opens connections in microseconds, so --connect-ms adds a delay to
+every new connection to stand in for a MySQL TCP+TLS handshake; leave it
+at 0 against a real MySQL server.
+
+Usage:
+    python bench_pool.py [--requests 2000] [--connect-ms 5]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+SETUPS = ("null+select1", "queue", "queue-noping")
+
+
+def make_engine(url: str, setup: str, connect_ms: float):
+    import database
+    from config import settings
+
+    settings.DB_POOL_MODE = "null" if setup == "null+select1" else "queue"
+    settings.DB_POOL_PRE_PING = setup == "queue"
+    engine = create_engine(url, **database._engine_options())
+    if connect_ms:
+        @event.listens_for(engine, "do_connect")
+        def _handshake(dialect, conn_rec, cargs, cparams):
+            time.sleep(connect_ms / 1000)
+    return engine
+
+
+def seed(url: str, quizzes: int) -> list:
+    """Create tables and a few quizzes when the database is empty; returns quiz ids"""
+    from database import Base, Quiz
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        if db.query(Quiz.id).first() is None:
+            db.add_all(
+                Quiz(
+                    url=f"https://en.wikipedia.org/wiki/Pool_bench_{n}",
+                    article_key=f"Pool_bench_{n}",
+                    title=f"Pool bench {n}",
+                    full_quiz_data='{"quiz": []}'
+                )
+                for n in range(quizzes)
+            )
+            db.commit()
+        return [row.id for row in db.query(Quiz.id).limit(1000)]
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def run(url: str, setup: str, requests: int, connect_ms: float, quiz_ids: list) -> list:
+    from database import Quiz
+
+    engine = make_engine(url, setup, connect_ms)
+    Session = sessionmaker(bind=engine)
+    timings = []
+    try:
+        for n in range(requests):
+            started = time.perf_counter()
+            db = Session()
+            try:
+                if setup == "null+select1":
+                    db.execute(text("SELECT 1"))
+                db.query(Quiz.id, Quiz.url, Quiz.title, Quiz.date_generated).order_by(
+                    Quiz.date_generated.desc(), Quiz.id.desc()
+                ).limit(50).all()
+                db.query(Quiz).filter(Quiz.id == quiz_ids[n % len(quiz_ids)]).first()
+            finally:
+                db.close()
+            timings.append(time.perf_counter() - started)
+    finally:
+        engine.dispose()
+    return timings
+
+
+def main(database_url: str, requests: int, connect_ms: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{tmp}/bench_pool.db"
+        # database.py needs a URL at import; the benchmark builds its own engines
+        os.environ["DATABASE_URL"] = url
+        quiz_ids = seed(url, 200)
+        print(f"{url.split('://')[0]}, {requests} requests, {connect_ms:g} ms per new connection")
+        print(f"{'setup':<14} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for setup in SETUPS:
+            run(url, setup, 20, connect_ms, quiz_ids)  # warm up
+            timings = sorted(run(url, setup, requests, connect_ms, quiz_ids))
+            print(
+                f"{setup:<14} {statistics.mean(timings) * 1000:8.3f} "
+                f"{timings[len(timings) // 2] * 1000:8.3f} {timings[int(len(timings) * 0.95)] * 1000:8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connection pool latency benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--connect-ms", type=float, default=0)
+    args = parser.parse_args()
+    main(os.environ.get("DATABASE_URL", ""), args.requests, args.connect_ms)
@@ -0,0 +1,85 @@
+"""Benchmark the search index on synthetic quizzes (no database needed)
+
+Reports the build rate, memory and query latency, then re-indexes
+quizzes until tombstones trigger a compaction and reports the latency of
+those add() calls, which save_quiz makes on the request path.
+
+Usage:
+    python bench_search.py [--quizzes 100000] [--queries 200]
+"""
+import argparse
+import random
+import resource
+import time
+
+from search_index import SearchIndex
+
+QUERIES = ["history", "river", "war", "quantum physics", "ancient emp", "mount", "city council", "sci"]
+
+
+def synthetic_quiz(rng: random.Random, vocabulary: list, n: int):
+    def words(count):
+        return " ".join(rng.choices(vocabulary, k=count))
+
+    quiz_data = {
+        "summary": words(60),
+        "key_entities": {"people": [words(2)], "organizations": [words(2)], "locations": [words(1)]},
+        "quiz": [{"question": words(12)} for _ in range(7)],
+    }
+    return f"Article {n} {words(3)}", quiz_data, words(500)
+
+
+def main(quizzes: int, queries: int) -> None:
+    rng = random.Random(0)
+    # Zipf-like vocabulary: a few very common words and a long tail
+    vocabulary = [f"w{i}" for i in range(50_000)]
+    vocabulary += ["history", "river", "war", "quantum", "physics", "ancient", "empire", "mountain", "city", "council", "science"] * 200
+    index = SearchIndex()
+
+    started = time.perf_counter()
+    for n in range(quizzes):
+        title, quiz_data, article = synthetic_quiz(rng, vocabulary, n)
+        index.add_quiz(n, title, quiz_data, article)
+    build = time.perf_counter() - started
+    print(f"Indexed {quizzes} quizzes in {build:.1f}s ({quizzes / build:.0f}/s)")
+    print(f"Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    print(index.stats())
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(queries // len(QUERIES)):
+            started = time.perf_counter()
+            index.search(query, 20)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(
+            f"{query!r:<18} p50 {timings[len(timings) // 2] * 1000:7.1f} ms  "
+            f"p95 {timings[int(len(timings) * 0.95)] * 1000:7.1f} ms"
+        )
+
+    # Re-indexing tombstones the old postings; compaction starts at half the live ones
+    timings = []
+    n = 0
+    dead = 0
+    started = time.perf_counter()
+    while index.stats()["dead_postings"] >= dead:
+        dead = index.stats()["dead_postings"]
+        title, quiz_data, article = synthetic_quiz(rng, vocabulary, n % quizzes)
+        add_started = time.perf_counter()
+        index.add_quiz(n % quizzes, title, quiz_data, article)
+        timings.append(time.perf_counter() - add_started)
+        n += 1
+    timings.sort()
+    print(
+        f"Re-indexed {n} quizzes until compacted in {time.perf_counter() - started:.1f}s: add() "
+        f"p50 {timings[len(timings) // 2] * 1000:.2f} ms  p99 {timings[int(len(timings) * 0.99)] * 1000:.2f} ms  "
+        f"max {timings[-1] * 1000:.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search index latency benchmark")
+    parser.add_argument("--quizzes", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main(args.quizzes, args.queries)
@@ -0,0 +1,115 @@
+"""Measure cold-start cost: import time of main and time to first request
+
+Uses the environment of the calling shell (DATABASE_URL, LLM_PROVIDER, ...).
+
+Usage:
+    python bench_startup.py [--runs 5] [--top 10]
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile():
+    """(total microseconds, {top-level module: cumulative microseconds}) for `import main`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    total = 0
+    children = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if name == "main" and indent == 1:
+            total = cumulative
+        elif indent == 3:
+            # Imported directly by main (or by site, which is negligible)
+            children[name] = children.get(name, 0) + cumulative
+    return total, children
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_json(url: str):
+    with urllib.request.urlopen(url, timeout=1) as response:
+        return json.loads(response.read())
+
+
+def time_to_first_request(timeout: float = 60):
+    """Seconds from process start until GET / answers, and until the database is ready"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING")}
+    )
+    first_request = database_ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if first_request is None:
+                    get_json(f"http://127.0.0.1:{port}/")
+                    first_request = time.perf_counter() - started
+                if get_json(f"http://127.0.0.1:{port}/health").get("database_ready"):
+                    database_ready = time.perf_counter() - started
+                    break
+            except OSError:
+                pass
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    return first_request, database_ready
+
+
+def main(runs: int, top: int) -> None:
+    totals = []
+    children = {}
+    for _ in range(runs):
+        total, run_children = import_profile()
+        totals.append(total)
+        for name, cumulative in run_children.items():
+            children.setdefault(name, []).append(cumulative)
+
+    print(f"import main: median {statistics.median(totals) / 1000:.0f} ms over {runs} runs")
+    slowest = sorted(children.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, values in slowest[:top]:
+        print(f"  {name:<28} {statistics.median(values) / 1000:7.1f} ms")
+
+    first, ready = [], []
+    for _ in range(runs):
+        first_request, database_ready = time_to_first_request()
+        if first_request is not None:
+            first.append(first_request)
+        if database_ready is not None:
+            ready.append(database_ready)
+    if first:
+        print(f"time to first request: median {statistics.median(first) * 1000:.0f} ms")
+    if ready:
+        print(f"time to database ready: median {statistics.median(ready) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports of main to list")
+    args = parser.parse_args()
+    main(args.runs, args.top)
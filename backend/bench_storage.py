@@ -0,0 +1,171 @@
+"""Storage size and Quiz read latency: scraped HTML in the row versus quiz_contents
+
+Fills two temporary SQLite databases with --rows quizzes built from the
+saved pages in sample_data/pages (HTML cut to 50 KB, as the pipeline
+stores it):
+
+- legacy:  the original quizzes table, raw HTML in scraped_content
+- current: quizzes plus the zlib-compressed quiz_contents side table,
+           which also keeps the extracted article text
+
+then reports the database size after VACUUM, the bytes held by the
+content columns, and the time of the Quiz reads the handlers make:
+
+- detail:     one Quiz by id, as /api/quiz/{id}/ and the cache lookups do
+- list:       50 full Quiz entities by primary key (the legacy table has
+              no date index, so ordering by date would measure the scan)
+- regenerate: one Quiz plus its stored article text (current only; the
+              legacy schema had no text and re-scraped instead)
+
+Usage:
+    python bench_storage.py [--rows 5000] [--reads 2000]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from bench_history import LegacyBase, LegacyQuiz
+from wiki_standin import saved_pages
+
+MAX_HTML = 50000
+
+
+def seed(legacy_url: str, current_url: str, rows: int) -> None:
+    from database import Base, Quiz, QuizContent, _compress
+    from scraper import parse_wikipedia_html
+
+    pages = []
+    for title, html in saved_pages().items():
+        _, text = parse_wikipedia_html(html)
+        html = html[:MAX_HTML]
+        pages.append((title, html, _compress(html), _compress(text)))
+    quiz_data = json.dumps({
+        "title": "Storage benchmark",
+        "summary": "A synthetic summary. " * 10,
+        "quiz": [
+            {"question": f"Question {n}?", "options": ["A", "B", "C", "D"], "answer": "A",
+             "difficulty": "easy", "explanation": "Because. " * 10}
+            for n in range(10)
+        ],
+        "related_topics": ["One", "Two", "Three"],
+    })
+
+    legacy = create_engine(legacy_url)
+    current = create_engine(current_url)
+    LegacyBase.metadata.create_all(legacy)
+    Base.metadata.create_all(current)
+    for start in range(0, rows, 1000):
+        batch = [(n, pages[n % len(pages)]) for n in range(start, min(start + 1000, rows))]
+        with legacy.begin() as conn:
+            conn.execute(insert(LegacyQuiz), [
+                {"url": f"https://en.wikipedia.org/wiki/{title}_{n}", "title": title,
+                 "scraped_content": html, "full_quiz_data": quiz_data}
+                for n, (title, html, _, _) in batch
+            ])
+        with current.begin() as conn:
+            ids = conn.execute(
+                insert(Quiz).returning(Quiz.id),
+                [
+                    {"url": f"https://en.wikipedia.org/wiki/{title}_{n}", "article_key": f"{title}_{n}",
+                     "title": title, "full_quiz_data": quiz_data}
+                    for n, (title, _, _, _) in batch
+                ]
+            ).scalars().all()
+            conn.execute(insert(QuizContent), [
+                {"quiz_id": quiz_id, "raw_html_z": html_z, "article_text_z": text_z}
+                for quiz_id, (_, (_, _, html_z, text_z)) in zip(ids, batch)
+            ])
+    for engine in (legacy, current):
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+        engine.dispose()
+
+
+def content_bytes(url: str, columns: list) -> int:
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            return sum(conn.execute(select(func.sum(func.length(column)))).scalar() or 0 for column in columns)
+    finally:
+        engine.dispose()
+
+
+def time_reads(url: str, read, reads: int, ids: list) -> list:
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+    timings = []
+    try:
+        for n in range(reads):
+            db = Session()
+            try:
+                started = time.perf_counter()
+                read(db, ids[n % len(ids)])
+                timings.append(time.perf_counter() - started)
+            finally:
+                db.close()
+    finally:
+        engine.dispose()
+    return sorted(timings)
+
+
+def main(rows: int, reads: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = Path(tmp) / "legacy.db"
+        current_path = Path(tmp) / "current.db"
+        legacy_url = f"sqlite:///{legacy_path}"
+        current_url = f"sqlite:///{current_path}"
+        # database.py needs a URL at import; every engine here is built explicitly
+        os.environ["DATABASE_URL"] = current_url
+        from database import Quiz, QuizContent
+
+        seed(legacy_url, current_url, rows)
+        ids = random.Random(0).sample(range(1, rows + 1), min(rows, 1000))
+
+        legacy_bytes = content_bytes(legacy_url, [LegacyQuiz.scraped_content])
+        current_bytes = content_bytes(current_url, [QuizContent.raw_html_z, QuizContent.article_text_z])
+        print(f"{rows} quizzes from {len(saved_pages())} saved pages")
+        print(f"{'':<10} {'file MB':>9} {'content MB':>11}")
+        print(f"{'legacy':<10} {legacy_path.stat().st_size / 2**20:9.1f} {legacy_bytes / 2**20:11.1f}  (raw HTML)")
+        print(f"{'current':<10} {current_path.stat().st_size / 2**20:9.1f} {current_bytes / 2**20:11.1f}  (zlib HTML + article text)")
+
+        reads_by_name = {
+            "detail": (
+                lambda db, quiz_id: db.query(LegacyQuiz).filter(LegacyQuiz.id == quiz_id).first(),
+                lambda db, quiz_id: db.query(Quiz).filter(Quiz.id == quiz_id).first(),
+            ),
+            "list": (
+                lambda db, _: db.query(LegacyQuiz).order_by(LegacyQuiz.id.desc()).limit(50).all(),
+                lambda db, _: db.query(Quiz).order_by(Quiz.id.desc()).limit(50).all(),
+            ),
+            "regenerate": (
+                None,
+                lambda db, quiz_id: db.query(Quiz).filter(Quiz.id == quiz_id).first().content.article_text,
+            ),
+        }
+        print(f"\n{'read':<11} {'schema':<8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, (legacy_read, current_read) in reads_by_name.items():
+            for schema, url, read in (("legacy", legacy_url, legacy_read), ("current", current_url, current_read)):
+                if read is None:
+                    continue
+                time_reads(url, read, 50, ids)  # warm up
+                timings = time_reads(url, read, reads, ids)
+                print(
+                    f"{name:<11} {schema:<8} {statistics.mean(timings) * 1000:8.3f} "
+                    f"{timings[len(timings) // 2] * 1000:8.3f} {timings[int(len(timings) * 0.95)] * 1000:8.3f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quiz storage size and read latency")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.rows, args.reads)
@@ -0,0 +1,183 @@
+"""Time to first question: streamed versus blocking quiz generation
+
+Starts a local OpenAI-compatible chat completions server that answers
+with the fake provider's quiz after --ttft-ms, then emits it at
+--tokens-per-second (about 4 characters per token), streamed as SSE
+deltas or in one body. The app runs under uvicorn with LLM_PROVIDER=openai
+pointed at that server and the scraper routed to the Wikipedia stand-in.
+
+For --articles different articles per mode it reports:
+
+- stream:   POST /api/generate_quiz/stream, time to the first question
+            event and to the done event
+- blocking: POST /api/generate_quiz/, time to the full response
+
+Usage:
+    python bench_stream.py [--articles 5] [--ttft-ms 400] [--tokens-per-second 100]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from bench_load import SERVER, free_port
+from llm_providers import FakeProvider
+from wiki_standin import WikiStandIn
+
+CHARS_PER_TOKEN = 4
+TOKENS_PER_CHUNK = 4
+
+
+class FakeLLMServer:
+    """Threaded /v1/chat/completions server with a fixed first-token delay and token rate"""
+
+    def __init__(self, ttft: float, tokens_per_second: float):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def _handler(self):
+        llm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.0"  # Close-delimited bodies, so SSE needs no chunking
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt = request["messages"][0]["content"]
+                text = json.dumps(FakeProvider.build_quiz(prompt))
+                chunk_chars = CHARS_PER_TOKEN * TOKENS_PER_CHUNK
+                chunk_seconds = TOKENS_PER_CHUNK / llm.tokens_per_second
+                time.sleep(llm.ttft)
+
+                if not request.get("stream"):
+                    time.sleep(len(text) / CHARS_PER_TOKEN / llm.tokens_per_second)
+                    body = json.dumps({
+                        "choices": [{"message": {"role": "assistant", "content": text}}],
+                        "usage": {
+                            "prompt_tokens": len(prompt) // CHARS_PER_TOKEN,
+                            "completion_tokens": len(text) // CHARS_PER_TOKEN,
+                        },
+                    }).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for start in range(0, len(text), chunk_chars):
+                    delta = {"choices": [{"delta": {"content": text[start:start + chunk_chars]}}]}
+                    self.wfile.write(f"data: {json.dumps(delta)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(chunk_seconds)
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
+
+    def __enter__(self) -> "FakeLLMServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def summary(timings: list) -> str:
+    timings = sorted(timings)
+    return (
+        f"p50 {statistics.median(timings) * 1000:7.0f} ms  "
+        f"max {timings[-1] * 1000:7.0f} ms  (n={len(timings)})"
+    )
+
+
+async def run(base_url: str, articles: int) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        while True:
+            try:
+                if (await client.get("/health")).json().get("database_ready"):
+                    break
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+
+        first_question, stream_done, blocking = [], [], []
+        for n in range(articles):
+            url = f"https://en.wikipedia.org/wiki/Stream_bench_article_{n}_{int(time.time())}"
+            started = time.perf_counter()
+            async with client.stream("POST", "/api/generate_quiz/stream", json={"url": url}) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    event = json.loads(line)["event"]
+                    if event == "question" and len(first_question) == len(stream_done):
+                        first_question.append(time.perf_counter() - started)
+                    elif event == "done":
+                        stream_done.append(time.perf_counter() - started)
+                    elif event == "error":
+                        raise RuntimeError(line)
+
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/generate_quiz/",
+                json={"url": f"https://en.wikipedia.org/wiki/Blocking_bench_article_{n}_{int(time.time())}"}
+            )
+            response.raise_for_status()
+            blocking.append(time.perf_counter() - started)
+
+    print(f"stream    first question  {summary(first_question)}")
+    print(f"stream    done            {summary(stream_done)}")
+    print(f"blocking  full response   {summary(blocking)}")
+
+
+def main(articles: int, ttft_ms: float, tokens_per_second: float) -> None:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp, WikiStandIn() as wiki, \
+            FakeLLMServer(ttft_ms / 1000, tokens_per_second) as llm:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench_stream.db",
+            "LLM_PROVIDER": "openai",
+            "LLM_BASE_URL": llm.base_url,
+            "LLM_MODEL": "fake-quiz-model",
+            "LLM_REQUESTS_PER_MINUTE": "10000",
+            "LLM_CACHE_ENABLED": "False",
+            "LOG_LEVEL": "WARNING",
+        }
+        print(f"{articles} articles per mode, first token after {ttft_ms:g} ms, {tokens_per_second:g} tokens/s")
+        server = subprocess.Popen([sys.executable, "-c", SERVER, wiki.origin, str(port)], env=env)
+        try:
+            asyncio.run(run(f"http://127.0.0.1:{port}", articles))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time to first streamed question")
+    parser.add_argument("--articles", type=int, default=5)
+    parser.add_argument("--ttft-ms", type=float, default=400)
+    parser.add_argument("--tokens-per-second", type=float, default=100)
+    args = parser.parse_args()
+    main(args.articles, args.ttft_ms, args.tokens_per_second)
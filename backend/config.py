@@ -11,12 +11,26 @@ class Settings:
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    # "queue" keeps warm connections per worker; "null" opens one per request
+    DB_POOL_MODE: str = os.getenv("DB_POOL_MODE", "queue").lower()
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 280))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    
+    # Serialized quiz responses kept in memory per worker
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
     
     # Server
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", 8000))
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     
+    # Logging: LOG_LEVEL DEBUG/INFO/WARNING/ERROR or OFF; LOG_FORMAT "text" or "json"
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text").lower()
+    
     # CORS - Production configuration
     ALLOWED_ORIGINS: list = [
         "http://localhost:3000",
@@ -26,76 +40,99 @@ class Settings:
         "*"  # For testing - remove after deployment works
     ]
     
+    # Background generation jobs
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 2))
+    JOB_QUEUE_MAX_DEPTH: int = int(os.getenv("JOB_QUEUE_MAX_DEPTH", 100))
+    # A job whose worker process stops renewing its lease this long is taken over
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", 120))
+    
+    # Batch generation: max URLs per request and concurrent article fetches
+    BATCH_MAX_URLS: int = int(os.getenv("BATCH_MAX_URLS", 500))
+    BATCH_FETCH_CONCURRENCY: int = int(os.getenv("BATCH_FETCH_CONCURRENCY", 8))
+    
     # Scraping
     REQUEST_TIMEOUT: int = 15
+    # Article extractor: "lxml" (fast, falls back to bs4 if missing) or "bs4"
+    SCRAPER_BACKEND: str = os.getenv("SCRAPER_BACKEND", "lxml").lower()
     MAX_CONTENT_LENGTH: int = 5000
     
     # LLM
+    # Estimated tokens of article text sent to the LLM (~15000 characters)
+    ARTICLE_TOKEN_BUDGET: int = int(os.getenv("ARTICLE_TOKEN_BUDGET", 3750))
+    # Opt-in: article tokens actually sent in the prompt; longer articles are
+    # compressed to their most information-dense paragraphs. 0 (the default)
+    # sends the extracted article as is; see bench_compress.py for the tradeoff
+    LLM_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("LLM_CONTEXT_TOKEN_BUDGET", 0))
+    # "gemini", "openai" (OpenAI-compatible HTTP server) or "fake" (offline, for load tests)
+    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "gemini").lower()
     LLM_TEMPERATURE: float = 0.3
-    LLM_MODEL: str = "models/gemini-2.5-flash"
-    
-    def validate(self):
-        """Validate required settings"""
-        errors = []
-        
-        if not self.GEMINI_API_KEY:
-            errors.append("GEMINI_API_KEY is required")
-        
-        if not self.DATABASE_URL:
-            errors.append("DATABASE_URL is required")
-        
-        if errors:
-            raise ValueError(f"Configuration errors: {', '.join(errors)}")
-        
-        return True
-
-settings = Settings()
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-class Settings:
-    """Application configuration settings"""
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "models/gemini-2.5-flash")
+    LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "http://localhost:11434/v1")
+    LLM_API_KEY: str = os.getenv("LLM_API_KEY", "")
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+    LLM_REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 10))
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", 250000))
+    # How long a request may queue for an LLM slot before giving up (seconds)
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv("LLM_QUEUE_TIMEOUT", 60))
+    # Overall time budget for one generation, including retries (seconds)
+    LLM_REQUEST_DEADLINE: float = float(os.getenv("LLM_REQUEST_DEADLINE", 90))
     
-    # API Keys
-    GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    # Batch packing: article-text tokens per packed prompt and articles per prompt
+    LLM_PACK_TOKEN_BUDGET: int = int(os.getenv("LLM_PACK_TOKEN_BUDGET", 3750))
+    LLM_PACK_MAX_ARTICLES: int = int(os.getenv("LLM_PACK_MAX_ARTICLES", 4))
     
-    # Database
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    # Persistent cache of LLM outputs keyed by content hash (local SQLite file)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", 30 * 24 * 3600))
     
-    # Server
-    HOST: str = os.getenv("HOST", "0.0.0.0")
-    PORT: int = int(os.getenv("PORT", 8000))
-    DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
-    
-    # CORS - Production configuration
-    ALLOWED_ORIGINS: list = [
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "https://ai-quiz-generator-git-master-chaithanyas-projects-392bdd1f.vercel.app",
-        "https://*.vercel.app",
-        "*"  # For testing - remove after deployment works
-    ]
+    # Full-text search: leading article characters indexed per quiz, and how
+    # often (seconds) a worker picks up quizzes saved by other workers
+    SEARCH_ARTICLE_CHARS: int = int(os.getenv("SEARCH_ARTICLE_CHARS", 3000))
+    SEARCH_REFRESH_SECONDS: float = float(os.getenv("SEARCH_REFRESH_SECONDS", 30))
+    # Every worker builds its own full index from the database; False defers
+    # that read (and the memory) until the worker serves its first search
+    SEARCH_INDEX_ON_STARTUP: bool = os.getenv("SEARCH_INDEX_ON_STARTUP", "True").lower() == "true"
     
-    # Scraping
-    REQUEST_TIMEOUT: int = 15
-    MAX_CONTENT_LENGTH: int = 5000
+    # Speculative prefetch of related topics while the service is idle (opt-in);
+    # PREFETCH_GENERATE also spends idle LLM quota on their quizzes
+    PREFETCH_ENABLED: bool = os.getenv("PREFETCH_ENABLED", "False").lower() == "true"
+    PREFETCH_GENERATE: bool = os.getenv("PREFETCH_GENERATE", "False").lower() == "true"
+    PREFETCH_MAX_PER_HOUR: int = int(os.getenv("PREFETCH_MAX_PER_HOUR", 30))
+    PREFETCH_QUEUE_MAX: int = int(os.getenv("PREFETCH_QUEUE_MAX", 200))
+    PREFETCH_CACHE_SIZE: int = int(os.getenv("PREFETCH_CACHE_SIZE", 100))
+    # Scraped articles waiting in the cache are also capped by total size
+    PREFETCH_CACHE_MAX_BYTES: int = int(os.getenv("PREFETCH_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+    PREFETCH_TTL_SECONDS: float = float(os.getenv("PREFETCH_TTL_SECONDS", 3600))
     
-    # LLM
-    LLM_TEMPERATURE: float = 0.3
-    LLM_MODEL: str = "models/gemini-2.5-flash"
+    # Fake provider: simulated latency and the share of calls that fail
+    FAKE_LLM_LATENCY_MS: float = float(os.getenv("FAKE_LLM_LATENCY_MS", 500))
+    FAKE_LLM_JITTER_MS: float = float(os.getenv("FAKE_LLM_JITTER_MS", 200))
+    FAKE_LLM_FAILURE_RATE: float = float(os.getenv("FAKE_LLM_FAILURE_RATE", 0))
+    FAKE_LLM_QUOTA_RATE: float = float(os.getenv("FAKE_LLM_QUOTA_RATE", 0))
+    FAKE_LLM_MALFORMED_RATE: float = float(os.getenv("FAKE_LLM_MALFORMED_RATE", 0))
+    FAKE_LLM_SEED: int = int(os.getenv("FAKE_LLM_SEED", 0))
     
     def validate(self):
         """Validate required settings"""
         errors = []
         
-        if not self.GEMINI_API_KEY:
+        if self.LLM_PROVIDER not in ("gemini", "openai", "fake"):
+            errors.append("LLM_PROVIDER must be 'gemini', 'openai' or 'fake'")
+        
+        if self.LLM_PROVIDER == "gemini" and not self.GEMINI_API_KEY:
             errors.append("GEMINI_API_KEY is required")
         
         if not self.DATABASE_URL:
             errors.append("DATABASE_URL is required")
         
+        if self.SCRAPER_BACKEND not in ("lxml", "bs4"):
+            errors.append("SCRAPER_BACKEND must be 'lxml' or 'bs4'")
+        
+        if self.DB_POOL_MODE not in ("queue", "null"):
+            errors.append("DB_POOL_MODE must be 'queue' or 'null'")
+        
         if errors:
             raise ValueError(f"Configuration errors: {', '.join(errors)}")
         
@@ -1,74 +1,605 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, text
+from sqlalchemy import create_engine, Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Index, LargeBinary, event, func, or_, select, text, inspect
+from sqlalchemy.dialects.mysql import MEDIUMBLOB
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker, relationship
+from sqlalchemy.schema import CreateIndex, DropIndex
 from sqlalchemy.pool import NullPool
 from datetime import datetime
-import os
-from dotenv import load_dotenv
+import hashlib
+import json
+import logging
+import re
+import time
+import zlib
+from config import settings
+from metrics import DB_COMMIT_SECONDS
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Get DATABASE_URL from environment
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = settings.DATABASE_URL
 
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not found in environment variables")
 
-# Create engine with production settings
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=NullPool,  # Important for Render deployment
-    connect_args={
-        "connect_timeout": 30,
-        "read_timeout": 60,
-        "write_timeout": 60,
-        "charset": "utf8mb4"
-    },
-    echo=False
-)
+def _engine_options(async_driver: bool = False) -> dict:
+    """Pool and driver options driven by config.Settings"""
+    options = {"echo": False}
+    
+    if DATABASE_URL.startswith("mysql"):
+        options["connect_args"] = {
+            "connect_timeout": 30,
+            "charset": "utf8mb4"
+        }
+        if not async_driver:
+            # aiomysql has no per-socket read/write timeouts
+            options["connect_args"].update(read_timeout=60, write_timeout=60)
+    
+    if settings.DB_POOL_MODE == "null":
+        # One connection per checkout; opt-in for hosts that drop idle sockets
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            # Recycle before MySQL/proxy idle timeouts close the socket
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    
+    return options
+
+engine = create_engine(DATABASE_URL, **_engine_options())
+
+# Cumulative pool counters, reported on /health
+_pool_counters = {"connects": 0, "checkouts": 0}
+
+@event.listens_for(engine, "connect")
+def _count_connect(dbapi_connection, connection_record):
+    _pool_counters["connects"] += 1
+
+@event.listens_for(engine, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    _pool_counters["checkouts"] += 1
+
+def pool_stats() -> dict:
+    """Current connection pool usage"""
+    pool = engine.pool
+    stats = {
+        "mode": settings.DB_POOL_MODE,
+        "connects": _pool_counters["connects"],
+        "checkouts": _pool_counters["checkouts"],
+    }
+    if hasattr(pool, "checkedout"):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if _async_engine is not None and hasattr(_async_engine.pool, "checkedout"):
+        stats["async"] = {
+            "size": _async_engine.pool.size(),
+            "checked_in": _async_engine.pool.checkedin(),
+            "checked_out": _async_engine.pool.checkedout(),
+            "overflow": _async_engine.pool.overflow(),
+        }
+    return stats
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Time every commit (flush included) for the /metrics histogram
+@event.listens_for(SessionLocal, "before_commit")
+def _start_commit_timer(session):
+    session.info["commit_started"] = time.perf_counter()
+
+@event.listens_for(SessionLocal, "after_commit")
+def _observe_commit(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+# Async engine for handlers that await their queries. Created on first use,
+# so the async driver is only imported (and required) when it is needed.
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+_async_engine = None
+_async_session_factory = None
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with its driver swapped for the asyncio equivalent"""
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database '{dialect}'")
+    return f"{ASYNC_DRIVERS[dialect]}://{rest}"
+
+class AsyncBackedSession(Session):
+    """Sync session driven by AsyncSession; carries the commit timing listeners"""
+
+event.listen(AsyncBackedSession, "before_commit", _start_commit_timer)
+event.listen(AsyncBackedSession, "after_commit", _observe_commit)
+
+def get_async_session_factory():
+    """async_sessionmaker bound to the async engine, created on first call"""
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        
+        _async_engine = create_async_engine(
+            async_database_url(DATABASE_URL),
+            **_engine_options(async_driver=True)
+        )
+        event.listen(_async_engine.sync_engine, "connect", _count_connect)
+        event.listen(_async_engine.sync_engine, "checkout", _count_checkout)
+        # Attributes stay loaded after commit; lazy loads cannot run implicitly
+        _async_session_factory = async_sessionmaker(
+            _async_engine,
+            autoflush=False,
+            expire_on_commit=False,
+            sync_session_class=AsyncBackedSession
+        )
+    return _async_session_factory
+
+async def close_async_engine() -> None:
+    """Dispose the async pool (called on application shutdown)"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
 # Quiz Model
 class Quiz(Base):
     __tablename__ = "quizzes"
+    __table_args__ = (
+        # Supports keyset pagination of the history list
+        Index("ix_quizzes_date_generated_id", "date_generated", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String(500), unique=True, nullable=False, index=True)
+    # One quiz per article, however its URL was spelled
+    article_key = Column(String(255), nullable=True, unique=True, index=True)
+    # Newer quiz of the same article that took over article_key; only set on
+    # duplicates saved before keys were unique, which stay readable by id
+    superseded_by = Column(Integer, nullable=True)
     title = Column(String(255), nullable=False)
     date_generated = Column(DateTime, default=datetime.utcnow)
-    scraped_content = Column(Text, nullable=True)
     full_quiz_data = Column(Text, nullable=False)
     
+    # Cost of the last generation: tokens and LLM time across all its calls
+    prompt_tokens = Column(Integer, nullable=True)
+    output_tokens = Column(Integer, nullable=True)
+    generation_ms = Column(Integer, nullable=True)
+    
+    # Scraped page and article text live in a side table, loaded on first access
+    content = relationship(
+        "QuizContent",
+        uselist=False,
+        lazy="select",
+        cascade="all, delete-orphan",
+        back_populates="quiz"
+    )
+    
+    # Questions of full_quiz_data, one row each; replaced on every save
+    questions = relationship(
+        "Question",
+        lazy="select",
+        cascade="all, delete-orphan",
+        order_by="Question.position",
+        back_populates="quiz"
+    )
+    
     def __repr__(self):
         return f"<Quiz(id={self.id}, title='{self.title}')>"
 
+# zlib-compressed blobs; MEDIUMBLOB on MySQL so large pages are never cut off
+CompressedBlob = LargeBinary().with_variant(MEDIUMBLOB(), "mysql")
+
+def _compress(value: str) -> bytes:
+    return zlib.compress(value.encode("utf-8"), 6)
+
+def _decompress(value: bytes) -> str:
+    return zlib.decompress(value).decode("utf-8")
+
+# Scraped content for a quiz, kept out of the hot quizzes row
+class QuizContent(Base):
+    __tablename__ = "quiz_contents"
+    
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True)
+    raw_html_z = Column(CompressedBlob, nullable=True)
+    article_text_z = Column(CompressedBlob, nullable=True)
+    # HTTP validators from the last fetch, for conditional re-downloads
+    etag = Column(String(255), nullable=True)
+    last_modified = Column(String(64), nullable=True)
+    
+    quiz = relationship("Quiz", back_populates="content")
+    
+    @property
+    def raw_html(self):
+        return _decompress(self.raw_html_z) if self.raw_html_z is not None else None
+    
+    @raw_html.setter
+    def raw_html(self, value):
+        self.raw_html_z = _compress(value) if value is not None else None
+    
+    @property
+    def article_text(self):
+        return _decompress(self.article_text_z) if self.article_text_z is not None else None
+    
+    @article_text.setter
+    def article_text(self, value):
+        self.article_text_z = _compress(value) if value is not None else None
+    
+    def __repr__(self):
+        return f"<QuizContent(quiz_id={self.quiz_id})>"
+
+# Redirect titles seen so far (e.g. USA -> United_States), so the next
+# request for one finds the target's quiz without fetching the page again
+class ArticleAlias(Base):
+    __tablename__ = "article_aliases"
+    
+    alias_key = Column(String(255), primary_key=True)
+    article_key = Column(String(255), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<ArticleAlias(alias_key='{self.alias_key}', article_key='{self.article_key}')>"
+
+def article_key_matches(article_key: str):
+    """Filter for the quiz of an article key, directly or through a redirect alias"""
+    return or_(
+        Quiz.article_key == article_key,
+        Quiz.article_key.in_(
+            select(ArticleAlias.article_key).where(ArticleAlias.alias_key == article_key)
+        )
+    )
+
+def resolve_aliases(db: Session, article_keys: list) -> dict:
+    """Map each key to the article it redirects to (itself if it is no known alias)"""
+    resolved = {key: key for key in article_keys}
+    if article_keys:
+        for alias in db.query(ArticleAlias).filter(ArticleAlias.alias_key.in_(article_keys)):
+            resolved[alias.alias_key] = alias.article_key
+    return resolved
+
+def record_alias(db: Session, alias_key: str, article_key: str) -> None:
+    """Remember that alias_key redirects to article_key"""
+    try:
+        db.merge(ArticleAlias(alias_key=alias_key, article_key=article_key))
+        db.commit()
+    except IntegrityError:
+        # Recorded by a concurrent request in the meantime
+        db.rollback()
+
+# Background generation job (see jobs.py)
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+    __table_args__ = (
+        # Restart recovery scans unfinished jobs oldest first
+        Index("ix_generation_jobs_status_created_at", "status", "created_at"),
+    )
+    
+    id = Column(String(36), primary_key=True)
+    url = Column(String(500), nullable=False)
+    article_key = Column(String(255), nullable=False)
+    force = Column(Boolean, nullable=False, default=False)
+    status = Column(String(20), nullable=False, default="queued")
+    # Worker process that owns the unfinished job, until the lease expires
+    lease_owner = Column(String(64), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<GenerationJob(id={self.id}, status='{self.status}')>"
+
+# Question bank: every saved question, searchable by article and difficulty
+class Question(Base):
+    __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_article_key_difficulty", "article_key", "difficulty"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False, index=True)
+    article_key = Column(String(255), nullable=False)
+    difficulty = Column(String(10), nullable=False)
+    # sha256 of the normalized question text; spots repeats across regenerations
+    text_hash = Column(String(64), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    # The question object as generated (question, options, answer, difficulty, explanation)
+    question_data = Column(Text, nullable=False)
+    
+    quiz = relationship("Quiz", back_populates="questions")
+    
+    def __repr__(self):
+        return f"<Question(id={self.id}, article_key='{self.article_key}', difficulty='{self.difficulty}')>"
+
+# One-off data migrations that finished (see run_migrations)
+class CompletedMigration(Base):
+    __tablename__ = "completed_migrations"
+    
+    name = Column(String(64), primary_key=True)
+    completed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+def question_text_hash(text: str) -> str:
+    normalized = re.sub(r"\s+", " ", text).strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def question_rows(article_key: str, quiz_data: dict) -> list:
+    """Question rows for a quiz; unknown difficulty labels count as medium"""
+    rows = []
+    for position, question in enumerate(quiz_data.get("quiz", [])):
+        difficulty = str(question.get("difficulty", "")).strip().lower()
+        rows.append(Question(
+            article_key=article_key,
+            difficulty=difficulty if difficulty in DIFFICULTIES else "medium",
+            text_hash=question_text_hash(question.get("question", "")),
+            position=position,
+            question_data=json.dumps(question)
+        ))
+    return rows
+
 # Initialize database tables
 def init_db():
     """Create all tables in the database"""
     try:
         Base.metadata.create_all(bind=engine)
-        print("Database connected successfully")
-        print("Tables created/verified")
+        run_migrations()
+        logger.info("Database connected successfully")
+        logger.info("Tables created/verified")
     except Exception as e:
-        print(f"Database initialization failed: {e}")
+        logger.error("Database initialization failed: %s", e)
         raise
 
+# Lightweight schema migrations for tables created before a column existed
+def run_migrations():
+    """Add missing columns/indexes to existing tables and backfill them"""
+    inspector = inspect(engine)
+    columns = {col["name"] for col in inspector.get_columns("quizzes")}
+    indexes = {index["name"] for index in inspector.get_indexes("quizzes")}
+    
+    if "article_key" not in columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE quizzes ADD COLUMN article_key VARCHAR(255)"))
+            connection.execute(text("CREATE INDEX ix_quizzes_article_key ON quizzes (article_key)"))
+        logger.info("Migration: added quizzes.article_key")
+    
+    if "ix_quizzes_date_generated_id" not in indexes:
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE INDEX ix_quizzes_date_generated_id ON quizzes (date_generated, id)"
+            ))
+        logger.info("Migration: added index ix_quizzes_date_generated_id")
+    
+    if "prompt_tokens" not in columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE quizzes ADD COLUMN prompt_tokens INTEGER"))
+            connection.execute(text("ALTER TABLE quizzes ADD COLUMN output_tokens INTEGER"))
+            connection.execute(text("ALTER TABLE quizzes ADD COLUMN generation_ms INTEGER"))
+        logger.info("Migration: added quizzes.prompt_tokens, output_tokens and generation_ms")
+    
+    if "superseded_by" not in columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE quizzes ADD COLUMN superseded_by INTEGER"))
+        logger.info("Migration: added quizzes.superseded_by")
+    
+    if "scraped_content" in columns:
+        move_scraped_content()
+    
+    content_columns = {col["name"] for col in inspector.get_columns("quiz_contents")}
+    if "etag" not in content_columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE quiz_contents ADD COLUMN etag VARCHAR(255)"))
+            connection.execute(text("ALTER TABLE quiz_contents ADD COLUMN last_modified VARCHAR(64)"))
+        logger.info("Migration: added quiz_contents.etag and last_modified")
+    
+    job_columns = {col["name"] for col in inspector.get_columns("generation_jobs")}
+    if "lease_owner" not in job_columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE generation_jobs ADD COLUMN lease_owner VARCHAR(64)"))
+            connection.execute(text("ALTER TABLE generation_jobs ADD COLUMN lease_expires_at DATETIME"))
+        logger.info("Migration: added generation_jobs.lease_owner and lease_expires_at")
+    
+    backfill_article_keys()
+    
+    article_key_index = next(
+        (index for index in inspect(engine).get_indexes("quizzes") if index["name"] == "ix_quizzes_article_key"),
+        None
+    )
+    if article_key_index is not None and not article_key_index["unique"]:
+        supersede_duplicate_articles()
+        index = next(index for index in Quiz.__table__.indexes if index.name == "ix_quizzes_article_key")
+        with engine.begin() as connection:
+            connection.execute(DropIndex(index))
+            connection.execute(CreateIndex(index))
+        logger.info("Migration: made quizzes.article_key unique")
+    
+    # Full-table scan; once done, new quizzes get their questions when saved
+    if not migration_completed("backfill_questions"):
+        backfill_questions()
+        record_migration("backfill_questions")
+
+def migration_completed(name: str) -> bool:
+    with engine.connect() as connection:
+        return connection.execute(
+            select(CompletedMigration.name).where(CompletedMigration.name == name)
+        ).first() is not None
+
+def record_migration(name: str) -> None:
+    """Mark a one-off data migration as done so later startups skip it"""
+    db = SessionLocal()
+    try:
+        db.merge(CompletedMigration(name=name))
+        db.commit()
+    except IntegrityError:
+        # Another worker finished the same migration first
+        db.rollback()
+    finally:
+        db.close()
+
+def move_scraped_content(batch_size: int = 200):
+    """Move the legacy quizzes.scraped_content column into quiz_contents"""
+    moved = 0
+    with engine.begin() as connection:
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                text(
+                    "SELECT id, scraped_content FROM quizzes "
+                    "WHERE id > :last_id ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": batch_size}
+            ).fetchall()
+            if not rows:
+                break
+            payload = [
+                {"quiz_id": row.id, "raw_html_z": _compress(row.scraped_content)}
+                for row in rows
+                if row.scraped_content
+            ]
+            if payload:
+                connection.execute(QuizContent.__table__.insert(), payload)
+                moved += len(payload)
+            last_id = rows[-1].id
+        connection.execute(text("ALTER TABLE quizzes DROP COLUMN scraped_content"))
+    logger.info("Migration: moved scraped_content for %s quizzes into quiz_contents", moved)
+
+def backfill_article_keys(batch_size: int = 500):
+    """Compute article_key for rows saved before canonical keys existed"""
+    from scraper import article_key_from_url, article_key_from_html
+    
+    db = SessionLocal()
+    try:
+        updated = 0
+        while True:
+            rows = (
+                db.query(Quiz)
+                .filter(Quiz.article_key.is_(None), Quiz.superseded_by.is_(None))
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            for quiz in rows:
+                # Prefer the redirect target recorded in the stored page
+                raw_html = quiz.content.raw_html if quiz.content else None
+                quiz.article_key = (
+                    (raw_html and article_key_from_html(raw_html))
+                    or article_key_from_url(quiz.url)
+                )
+            db.commit()
+            updated += len(rows)
+        if updated:
+            logger.info("Migration: backfilled article_key for %s quizzes", updated)
+    finally:
+        db.close()
+
+def supersede_duplicate_articles():
+    """
+    Give each article key to its newest quiz only, before article_key becomes unique.
+    
+    Older quizzes of the same article are kept, so their /quiz/{id} links
+    and history entries keep working; they drop the key and record the
+    quiz that superseded them.
+    """
+    db = SessionLocal()
+    try:
+        duplicated = (
+            db.query(Quiz.article_key)
+            .filter(Quiz.article_key.isnot(None))
+            .group_by(Quiz.article_key)
+            .having(func.count(Quiz.id) > 1)
+            .all()
+        )
+        superseded = 0
+        for (article_key,) in duplicated:
+            quizzes = (
+                db.query(Quiz)
+                .filter(Quiz.article_key == article_key)
+                .order_by(Quiz.date_generated.desc(), Quiz.id.desc())
+                .all()
+            )
+            for quiz in quizzes[1:]:
+                quiz.article_key = None
+                quiz.superseded_by = quizzes[0].id
+                superseded += 1
+        db.commit()
+        if superseded:
+            logger.warning(
+                "Migration: %s older quizzes of %s articles kept, superseded by the newest quiz of each",
+                superseded, len(duplicated)
+            )
+    finally:
+        db.close()
+
+def backfill_questions(batch_size: int = 200):
+    """Fill the questions table for quizzes saved before it existed"""
+    db = SessionLocal()
+    try:
+        filled = 0
+        last_id = 0
+        while True:
+            rows = (
+                db.query(Quiz)
+                .filter(Quiz.id > last_id, Quiz.article_key.isnot(None), ~Quiz.questions.any())
+                .order_by(Quiz.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            for quiz in rows:
+                try:
+                    quiz_data = json.loads(quiz.full_quiz_data)
+                except json.JSONDecodeError:
+                    continue
+                quiz.questions = question_rows(quiz.article_key, quiz_data)
+                filled += 1
+            db.commit()
+            last_id = rows[-1].id
+        if filled:
+            logger.info("Migration: added question bank rows for %s quizzes", filled)
+    finally:
+        db.close()
+
 # Dependency for FastAPI
 def get_db():
     """Provides a database session for each request"""
     db = SessionLocal()
     try:
-        db.execute(text("SELECT 1"))
         yield db
-    except Exception as e:
-        print(f"Database connection error: {e}")
+    except SQLAlchemyError as e:
+        logger.error("Database connection error: %s", e)
+        db.rollback()
+        raise
+    except Exception:
+        # The handler's own errors (e.g. a 404 HTTPException) are not database errors
         db.rollback()
         raise
     finally:
         db.close()
 
+async def get_async_db():
+    """Provides an AsyncSession for each request"""
+    async with get_async_session_factory()() as db:
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            logger.error("Database connection error: %s", e)
+            await db.rollback()
+            raise
+        except Exception:
+            await db.rollback()
+            raise
+
 # Test database connection
 def test_connection():
     """Test if database connection is working"""
@@ -77,11 +608,11 @@ def test_connection():
             result = connection.execute(text("SELECT 1"))
             row = result.fetchone()
             if row and row[0] == 1:
-                print("Database connection test successful")
+                logger.info("Database connection test successful")
                 return True
             else:
-                print("Unexpected result from database")
+                logger.warning("Unexpected result from database")
                 return False
     except Exception as e:
-        print(f"Database connection test failed: {e}")
+        logger.error("Database connection test failed: %s", e)
         return False
@@ -0,0 +1,66 @@
+"""Generate quizzes for every URL in a file (one Wikipedia URL per line)
+
+Usage:
+    python generate_batch.py ../sample_data/test_urls.txt [--force] [--pack]
+"""
+import argparse
+import asyncio
+import sys
+
+from batch import read_url_file, run_batch
+from database import init_db
+from llm_client import llm_manager
+from logging_setup import configure_logging
+from scraper import close_http_clients
+
+STATUS_ICONS = {
+    "invalid": "✗",
+    "failed": "✗",
+    "cached": "✓",
+    "saved": "✓",
+    "generated": "✓",
+}
+
+
+async def main(path: str, force: bool, pack: bool) -> int:
+    urls = read_url_file(path)
+    print(f"→ Generating quizzes for {len(urls)} URLs from {path}")
+
+    summary = {}
+    try:
+        async for event in run_batch(urls, force, pack):
+            if event["event"] == "summary":
+                summary = event
+                continue
+            icon = STATUS_ICONS.get(event["status"], "→")
+            detail = event.get("error") or (f"quiz ID {event['quiz_id']}" if event.get("quiz_id") else "")
+            print(f"{icon} {event['status']:<10} {event['url']} {detail}".rstrip())
+    finally:
+        await close_http_clients()
+        await llm_manager.close()
+
+    print("=" * 50)
+    print(
+        f"Requested: {summary['requested']}  Unique: {summary['unique']}  "
+        f"Cached: {summary['cached']}  Generated: {summary['generated']}  Failed: {summary['failed']}"
+    )
+    if "packing" in summary:
+        report = summary["packing"]
+        print(
+            f"Packing: {report['requests_per_article']} requests/article, "
+            f"{report['prompt_tokens_per_article']} prompt tokens/article "
+            f"(vs {report['unpacked_prompt_tokens_per_article']} unpacked)"
+        )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch-generate quizzes from a URL list")
+    parser.add_argument("path", help="File with one Wikipedia URL per line")
+    parser.add_argument("--force", action="store_true", help="Regenerate articles that already have a quiz")
+    parser.add_argument("--pack", action="store_true", help="Pack several short articles into one LLM request")
+    args = parser.parse_args()
+
+    configure_logging()
+    init_db()
+    sys.exit(asyncio.run(main(args.path, args.force, args.pack)))
@@ -0,0 +1,389 @@
+"""
+Background quiz generation jobs.
+
+Jobs are persisted in the generation_jobs table so unfinished work is
+picked up again after a restart, and executed by a bounded pool of
+in-process asyncio workers. Status changes are pushed to local
+listeners (SSE streams) and always written to the database.
+
+Every unfinished job carries a lease: the worker process that owns it and
+when that ownership expires. A process runs a job only after taking its
+lease with a conditional UPDATE, and renews the lease while the job runs,
+so with several uvicorn workers each job runs once. Jobs whose lease has
+expired (their process died) are claimed by whichever process sweeps
+first. A process renews the leases of every job it holds, queued or
+running, so a local backlog longer than the lease is not taken over by
+its own sweep. Database calls run in worker threads, off the event loop.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import or_
+
+from config import settings
+from database import GenerationJob, SessionLocal
+from quiz_pipeline import run_generation
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("done", "failed")
+ACTIVE_STATUSES = ("queued", "scraping", "generating")
+
+# Owner recorded in the leases this process takes
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at JOB_QUEUE_MAX_DEPTH"""
+
+
+class QueueNotReadyError(Exception):
+    """Raised when a job is submitted before the queue has started"""
+
+
+class JobQueue:
+    """Bounded asyncio queue drained by a fixed number of workers"""
+
+    def __init__(self, workers: int, max_depth: int, lease_seconds: float, worker_id: str = WORKER_ID):
+        self.worker_count = workers
+        self.max_depth = max_depth
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # One event per SSE watcher, dropped when the watcher stops waiting
+        self._watchers: Dict[str, Set[asyncio.Event]] = {}
+        # Jobs leased to this process and queued or running here
+        self._held: Set[str] = set()
+        # Last pending status write per job, so writes land in order
+        self._status_writes: Dict[str, asyncio.Task] = {}
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        """Start workers and take over jobs whose lease has expired"""
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+        self._workers = [
+            asyncio.create_task(self._worker(n)) for n in range(self.worker_count)
+        ]
+        self._workers.append(asyncio.create_task(self._sweep()))
+        self._workers.append(asyncio.create_task(self._keep_leases()))
+        recovered = await self._recover()
+        if recovered:
+            logger.info("✓ Re-queued %s unfinished generation jobs", recovered)
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, url: str, article_key: str, force: bool) -> GenerationJob:
+        """
+        Persist a new job leased to this process and queue it.
+        
+        Raises QueueNotReadyError before start() and QueueFullError when saturated.
+        """
+        if self._queue is None:
+            raise QueueNotReadyError("Generation queue is starting up, try again shortly")
+        if self._queue.full():
+            raise QueueFullError("Generation queue is full, try again shortly")
+
+        job = await asyncio.to_thread(self._insert_job, url, article_key, force, "queued")
+        try:
+            self._queue.put_nowait(job.id)
+            self._held.add(job.id)
+        except asyncio.QueueFull:
+            # Filled up while the row was written; the sweep runs it once the lease lapses
+            logger.warning("✗ Queue filled before job %s was queued, deferring it", job.id)
+        return job
+
+    async def record_done(self, url: str, article_key: str, quiz_id: int) -> GenerationJob:
+        """Persist an already finished job (e.g. a cache hit in background mode)"""
+        return await asyncio.to_thread(self._insert_job, url, article_key, False, "done", quiz_id)
+
+    def _insert_job(
+        self,
+        url: str,
+        article_key: str,
+        force: bool,
+        status: str,
+        quiz_id: Optional[int] = None
+    ) -> GenerationJob:
+        queued = status == "queued"
+        db = SessionLocal()
+        try:
+            job = GenerationJob(
+                id=str(uuid.uuid4()),
+                url=url,
+                article_key=article_key,
+                force=force,
+                status=status,
+                quiz_id=quiz_id,
+                lease_owner=self.worker_id if queued else None,
+                lease_expires_at=self._lease_expiry() if queued else None
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> None:
+        """Block until this process updates the job, or timeout elapses"""
+        event = asyncio.Event()
+        watchers = self._watchers.setdefault(job_id, set())
+        watchers.add(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            watchers.discard(event)
+            if not watchers and self._watchers.get(job_id) is watchers:
+                del self._watchers[job_id]
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "workers": self.worker_count,
+            "queue_depth": self.depth(),
+            "max_depth": self.max_depth,
+            "running": self.running,
+            "held": len(self._held),
+            "watchers": sum(len(events) for events in self._watchers.values()),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def _lease_expiry(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+
+    def _claimable(self, now: datetime):
+        """Unfinished jobs this process may take: its own, unleased or expired"""
+        return (
+            GenerationJob.status.in_(ACTIVE_STATUSES),
+            or_(
+                GenerationJob.lease_owner == self.worker_id,
+                GenerationJob.lease_expires_at.is_(None),
+                GenerationJob.lease_expires_at < now
+            )
+        )
+
+    def _claim(self, job_id: str) -> Optional[GenerationJob]:
+        """Take the job's lease; None if it is finished or another worker holds it"""
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            claimed = db.query(GenerationJob).filter(
+                GenerationJob.id == job_id, *self._claimable(now)
+            ).update(
+                {"lease_owner": self.worker_id, "lease_expires_at": self._lease_expiry()},
+                synchronize_session=False
+            )
+            db.commit()
+            if not claimed:
+                return None
+            job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _claim_expired(self, limit: int) -> List[str]:
+        """Lease up to limit unfinished jobs whose worker is gone, oldest first"""
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            candidates = [
+                row.id
+                for row in db.query(GenerationJob.id)
+                .filter(
+                    GenerationJob.status.in_(ACTIVE_STATUSES),
+                    or_(GenerationJob.lease_expires_at.is_(None), GenerationJob.lease_expires_at < now)
+                )
+                .order_by(GenerationJob.created_at)
+                .limit(limit)
+            ]
+            claimed = []
+            for job_id in candidates:
+                # Conditional on the lease still being expired: one process wins each job
+                won = db.query(GenerationJob).filter(
+                    GenerationJob.id == job_id,
+                    GenerationJob.status.in_(ACTIVE_STATUSES),
+                    or_(GenerationJob.lease_expires_at.is_(None), GenerationJob.lease_expires_at < now)
+                ).update(
+                    {
+                        "status": "queued",
+                        "lease_owner": self.worker_id,
+                        "lease_expires_at": self._lease_expiry(),
+                        "updated_at": now
+                    },
+                    synchronize_session=False
+                )
+                db.commit()
+                if won:
+                    claimed.append(job_id)
+            return claimed
+        finally:
+            db.close()
+
+    def _renew_leases(self, job_ids: List[str]) -> int:
+        """Extend this process's leases on job_ids; jobs taken over by others are skipped"""
+        db = SessionLocal()
+        try:
+            renewed = db.query(GenerationJob).filter(
+                GenerationJob.id.in_(job_ids),
+                GenerationJob.lease_owner == self.worker_id
+            ).update({"lease_expires_at": self._lease_expiry()}, synchronize_session=False)
+            db.commit()
+            return renewed
+        finally:
+            db.close()
+
+    def _update_job(self, job_id: str, values: dict) -> None:
+        db = SessionLocal()
+        try:
+            db.query(GenerationJob).filter(GenerationJob.id == job_id).update(values)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _recover(self) -> int:
+        """Queue unfinished jobs whose lease has expired, as far as the queue has room"""
+        room = self.max_depth - self._queue.qsize()
+        if room <= 0:
+            return 0
+        job_ids = await asyncio.to_thread(self._claim_expired, room)
+        for job_id in job_ids:
+            if self._queue.full():
+                # Submissions took the room meanwhile; the lease lapses and a later sweep retries
+                break
+            self._queue.put_nowait(job_id)
+            self._held.add(job_id)
+        return len(job_ids)
+
+    async def _sweep(self) -> None:
+        """Periodically take over jobs left behind by worker processes that died"""
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                recovered = await self._recover()
+                if recovered:
+                    logger.info("✓ Took over %s generation jobs with expired leases", recovered)
+            except Exception as e:
+                logger.error("✗ Job lease sweep failed: %s", e)
+
+    async def _keep_leases(self) -> None:
+        """Renew the leases of every job queued or running here until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self._held:
+                continue
+            job_ids = list(self._held)
+            try:
+                renewed = await asyncio.to_thread(self._renew_leases, job_ids)
+                if renewed < len(job_ids):
+                    logger.warning("✗ %s held jobs were taken over by another worker", len(job_ids) - renewed)
+            except Exception as e:
+                logger.warning("✗ Job lease renewal failed: %s", e)
+
+    async def _set_status(self, job_id: str, status: str, **fields) -> None:
+        values = {"status": status, "updated_at": datetime.utcnow(), **fields}
+        await asyncio.to_thread(self._update_job, job_id, values)
+
+        # Wake SSE streams; each arms a fresh event for the next change
+        for event in self._watchers.get(job_id, ()):
+            event.set()
+
+    async def _set_status_after(self, previous: Optional[asyncio.Task], job_id: str, status: str, **fields) -> None:
+        if previous is not None:
+            (error,) = await asyncio.gather(previous, return_exceptions=True)
+            if isinstance(error, Exception):
+                logger.warning("✗ Job %s status update failed: %s", job_id, error)
+        await self._set_status(job_id, status, **fields)
+
+    def _notify_status(self, job_id: str, status: str) -> None:
+        """on_status callback: write the status behind the job's earlier writes"""
+        self._status_writes[job_id] = asyncio.create_task(
+            self._set_status_after(self._status_writes.get(job_id), job_id, status)
+        )
+
+    async def _finish(self, job_id: str, status: str, **fields) -> None:
+        """Write the final status and release the lease"""
+        await self._set_status_after(
+            self._status_writes.pop(job_id, None),
+            job_id,
+            status,
+            lease_owner=None,
+            lease_expires_at=None,
+            **fields
+        )
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self.running += 1
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error("✗ Job worker %s crashed on %s: %s", number, job_id, e)
+            finally:
+                self._held.discard(job_id)
+                self.running -= 1
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self._claim, job_id)
+        if job is None:
+            return  # Finished, or another worker process holds its lease
+        url, article_key, force = job.url, job.article_key, job.force
+
+        logger.info("→ Job %s: %s", job_id, url)
+        try:
+            result = await run_generation(
+                url,
+                article_key,
+                force,
+                on_status=lambda status: self._notify_status(job_id, status)
+            )
+        except HTTPException as e:
+            self.failed += 1
+            await self._finish(job_id, "failed", error=str(e.detail))
+            logger.warning("✗ Job %s failed: %s", job_id, e.detail)
+            return
+        except Exception as e:
+            self.failed += 1
+            await self._finish(job_id, "failed", error=str(e))
+            logger.warning("✗ Job %s failed: %s", job_id, e)
+            return
+
+        self.completed += 1
+        await self._finish(job_id, "done", quiz_id=result["id"], error=None)
+        logger.info("✓ Job %s done: quiz ID %s", job_id, result['id'])
+
+
+def get_job(job_id: str) -> Optional[GenerationJob]:
+    db = SessionLocal()
+    try:
+        job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+        if job is not None:
+            db.expunge(job)
+        return job
+    finally:
+        db.close()
+
+
+job_queue = JobQueue(settings.JOB_WORKERS, settings.JOB_QUEUE_MAX_DEPTH, settings.JOB_LEASE_SECONDS)
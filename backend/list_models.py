@@ -1,12 +1,9 @@
 """List and test available Gemini models"""
 import google.generativeai as genai
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from config import settings
 
-api_key = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=api_key)
+genai.configure(api_key=settings.GEMINI_API_KEY)
 
 print("="*70)
 print("AVAILABLE GEMINI MODELS")
@@ -0,0 +1,137 @@
+"""
+Content-addressed cache of validated LLM quiz outputs.
+
+Entries are keyed on a hash of everything that determines the model's
+answer: prompt template version, provider and model name, generation
+config and the cleaned article text. Mirrors, redirects and unchanged
+re-scrapes therefore reuse one result instead of calling the LLM again.
+
+Stored in a local SQLite file so it survives restarts and is shared by
+all workers on the host; entries expire after a TTL and the least
+recently used ones are evicted beyond a maximum count.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from config import settings
+
+
+class LLMOutputCache:
+    """Persistent LRU/TTL cache of quiz dicts keyed by content hash"""
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int, enabled: bool = True):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(prompt_version: str, model: dict, article_text: str) -> str:
+        """
+        Hash of the inputs that determine the output.
+
+        model is the provider description (provider, model, generation_config).
+        """
+        material = json.dumps(
+            [prompt_version, model, article_text],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_outputs ("
+                " key TEXT PRIMARY KEY,"
+                " quiz_data TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_outputs_last_used ON llm_outputs (last_used)")
+        return self._conn
+
+    def get(self, key: str) -> Optional[dict]:
+        """Cached quiz for key, or None if missing, expired or disabled"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT quiz_data, created_at FROM llm_outputs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_outputs WHERE key = ?", (key,))
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_outputs SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(self, key: str, quiz_data: dict) -> None:
+        """Store a validated quiz and evict beyond max_entries"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        body = json.dumps(quiz_data, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_outputs (key, quiz_data, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, body, now, now)
+            )
+            self.stores += 1
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "DELETE FROM llm_outputs WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        overflow = conn.execute(
+            "DELETE FROM llm_outputs WHERE key IN ("
+            " SELECT key FROM llm_outputs ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        self.evictions += expired + overflow
+
+    def stats(self) -> dict:
+        entries = 0
+        if self.enabled:
+            with self._lock:
+                entries = self._connect().execute("SELECT COUNT(*) FROM llm_outputs").fetchone()[0]
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+llm_outputs = LLMOutputCache(
+    settings.LLM_CACHE_PATH,
+    settings.LLM_CACHE_MAX_ENTRIES,
+    settings.LLM_CACHE_TTL_SECONDS,
+    enabled=settings.LLM_CACHE_ENABLED
+)
@@ -0,0 +1,178 @@
+"""
+Shared LLM client with concurrency and rate limiting.
+
+One long-lived provider (see llm_providers) is reused for every request.
+Calls go through slot(), which waits for a requests-per-minute token, a
+tokens-per-minute allowance and a concurrency permit, and only fails
+with LLMCapacityError once the queueing deadline has passed. The
+allowance covers the prompt estimate up front; callers charge the output
+tokens with charge_output() once the response is in.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from config import settings
+from llm_providers import LLMProvider, create_provider
+
+
+class LLMCapacityError(Exception):
+    """Raised when no LLM slot frees up before the queueing deadline"""
+
+
+class TokenBucket:
+    """Continuously refilling bucket sized to one minute of budget"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float, deadline: float) -> None:
+        """Take amount tokens, sleeping for the refill until deadline"""
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            wait = (amount - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                raise LLMCapacityError(
+                    "LLM rate limit reached and the request could not be queued in time. "
+                    "Please try again shortly."
+                )
+            await asyncio.sleep(wait)
+
+    def refund(self, amount: float) -> None:
+        """Return tokens taken for a call that was never sent"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def charge(self, amount: float) -> None:
+        """Take tokens after the fact; the balance may go negative until it refills"""
+        self._refill()
+        self.tokens -= amount
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the API reports quota exhaustion"""
+        self._refill()
+        self.tokens = 0.0
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+
+class LLMClientManager:
+    """Owns the LLM provider and the limiters every LLM call goes through"""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        queue_timeout: float
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._provider: Optional[LLMProvider] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.granted = 0
+        self.rejected = 0
+        self.quota_errors = 0
+        self.total_wait_seconds = 0.0
+
+    def get_provider(self) -> LLMProvider:
+        """Long-lived provider selected by LLM_PROVIDER, created on first use"""
+        if self._provider is None:
+            self._provider = create_provider()
+        return self._provider
+
+    async def close(self) -> None:
+        if self._provider is not None:
+            await self._provider.close()
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int, timeout: Optional[float] = None):
+        """Hold one rate-limited, concurrency-limited LLM call"""
+        started = time.monotonic()
+        deadline = started + (timeout if timeout is not None else self.queue_timeout)
+
+        taken = []
+        self.waiting += 1
+        try:
+            await self.request_bucket.acquire(1, deadline)
+            taken.append((self.request_bucket, 1))
+            await self.token_bucket.acquire(estimated_tokens, deadline)
+            taken.append((self.token_bucket, estimated_tokens))
+            try:
+                await asyncio.wait_for(
+                    self._semaphore.acquire(),
+                    max(deadline - time.monotonic(), 0)
+                )
+            except asyncio.TimeoutError:
+                raise LLMCapacityError(
+                    "All LLM request slots are busy. Please try again shortly."
+                )
+        except BaseException as e:
+            # Nothing was sent: give back the budget taken so far
+            for bucket, amount in taken:
+                bucket.refund(amount)
+            if isinstance(e, LLMCapacityError):
+                self.rejected += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.granted += 1
+        self.total_wait_seconds += time.monotonic() - started
+        self.in_flight += 1
+        try:
+            yield self.get_provider()
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def charge_output(self, output_tokens: int) -> None:
+        """Count a finished call's output tokens against the tokens-per-minute budget"""
+        self.token_bucket.charge(output_tokens)
+
+    def note_quota_exhausted(self) -> None:
+        """The API returned 429: make queued callers wait for a fresh budget"""
+        self.quota_errors += 1
+        self.request_bucket.drain()
+        self.token_bucket.drain()
+
+    def stats(self) -> dict:
+        return {
+            "provider": settings.LLM_PROVIDER,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "quota_errors": self.quota_errors,
+            "avg_wait_seconds": round(self.total_wait_seconds / self.granted, 3) if self.granted else 0.0,
+            "requests_available": round(self.request_bucket.available(), 2),
+            "tokens_available": round(self.token_bucket.available()),
+        }
+
+
+llm_manager = LLMClientManager(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT
+)
@@ -0,0 +1,314 @@
+"""
+LLM providers behind the quiz generator.
+
+Every provider turns a prompt into raw response text, in one piece or as
+a stream of chunks; prompting, parsing, retries and rate limiting stay in
+llm_quiz_generator / llm_client. Selected with LLM_PROVIDER:
+
+- "gemini": Google Generative AI SDK (imported on first use)
+- "openai": any OpenAI-compatible /chat/completions server (vLLM, Ollama, ...)
+- "fake": deterministic offline provider for load tests and CI
+"""
+import asyncio
+import json
+import random
+import re
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, AsyncIterator, NamedTuple, Optional
+
+from config import settings
+from token_budget import estimate_tokens
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class LLMResult(NamedTuple):
+    """Response text and token counts (reported by the API, else estimated)"""
+    text: str
+    prompt_tokens: int
+    output_tokens: int
+
+
+def _estimated(prompt: str, text: str) -> LLMResult:
+    return LLMResult(text, estimate_tokens(prompt), estimate_tokens(text))
+
+
+class LLMProvider(ABC):
+    """Interface shared by all providers"""
+
+    name = "base"
+
+    def __init__(self, model_name: str, generation_config: dict):
+        self.model_name = model_name
+        self.generation_config = generation_config
+
+    @abstractmethod
+    async def generate(self, prompt: str) -> LLMResult:
+        """Full response for one prompt"""
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Response text chunks as the model produces them"""
+        yield (await self.generate(prompt)).text
+
+    async def close(self) -> None:
+        pass
+
+    def describe(self) -> dict:
+        return {
+            "provider": self.name,
+            "model": self.model_name,
+            "generation_config": self.generation_config,
+        }
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via google.generativeai; the SDK loads on first call"""
+
+    name = "gemini"
+
+    def __init__(self, model_name: str, generation_config: dict, api_key: str):
+        super().__init__(model_name, generation_config)
+        self.api_key = api_key
+        self._model = None
+
+    def get_model(self):
+        """Long-lived GenerativeModel, created on first use"""
+        if self._model is None:
+            if not self.api_key:
+                raise ValueError("GEMINI_API_KEY not found in environment variables")
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=self.generation_config
+            )
+        return self._model
+
+    @staticmethod
+    def _result(prompt: str, response) -> LLMResult:
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None or not usage.prompt_token_count:
+            return _estimated(prompt, response.text)
+        return LLMResult(response.text, usage.prompt_token_count, usage.candidates_token_count)
+
+    async def generate(self, prompt: str) -> LLMResult:
+        response = await self.get_model().generate_content_async(prompt)
+        return self._result(prompt, response)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.get_model().generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Chat completions over HTTP, e.g. a local vLLM or Ollama server"""
+
+    name = "openai"
+
+    def __init__(self, model_name: str, generation_config: dict, base_url: str, api_key: str = ""):
+        super().__init__(model_name, generation_config)
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    def _payload(self, prompt: str, stream: bool = False) -> dict:
+        return {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.generation_config.get("temperature"),
+            "top_p": self.generation_config.get("top_p"),
+            "max_tokens": self.generation_config.get("max_output_tokens"),
+            "stream": stream,
+        }
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            import httpx
+            
+            # Generation time is bounded by the caller's deadline, not here
+            self._client = httpx.AsyncClient(headers=self.headers, timeout=httpx.Timeout(None, connect=10))
+        return self._client
+
+    @staticmethod
+    def _result(prompt: str, body: dict) -> LLMResult:
+        text = body["choices"][0]["message"]["content"]
+        usage = body.get("usage") or {}
+        if not usage.get("prompt_tokens"):
+            return _estimated(prompt, text)
+        return LLMResult(text, usage["prompt_tokens"], usage.get("completion_tokens", 0))
+
+    async def generate(self, prompt: str) -> LLMResult:
+        import httpx
+        
+        try:
+            response = await self._get_client().post(self.url, json=self._payload(prompt))
+        except httpx.TimeoutException as e:
+            raise TimeoutError(f"LLM request timeout: {e}")
+        response.raise_for_status()
+        return self._result(prompt, response.json())
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        async with self._get_client().stream("POST", self.url, json=self._payload(prompt, stream=True)) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    yield delta["content"]
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic offline provider for load tests.
+
+    Returns a schema-valid quiz built from the prompt after a simulated
+    latency, and fails a configurable share of calls with transient
+    (503), quota (429) or malformed-JSON errors. One seeded RNG drives
+    latency and failures, so a given seed replays the same sequence.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        model_name: str,
+        generation_config: dict,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        failure_rate: float = 0,
+        quota_rate: float = 0,
+        malformed_rate: float = 0,
+        seed: int = 0
+    ):
+        super().__init__(model_name, generation_config)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.quota_rate = quota_rate
+        self.malformed_rate = malformed_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def _draw(self):
+        """Latency (seconds) and outcome for the next call"""
+        self.calls += 1
+        latency = max(self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000
+        roll = self._rng.random()
+        if roll < self.failure_rate:
+            outcome = "transient"
+        elif roll < self.failure_rate + self.quota_rate:
+            outcome = "quota"
+        elif roll < self.failure_rate + self.quota_rate + self.malformed_rate:
+            outcome = "malformed"
+        else:
+            outcome = "ok"
+        return latency, outcome
+
+    @staticmethod
+    def build_quiz(prompt: str) -> dict:
+        """Schema-valid quiz whose content depends only on the prompt"""
+        match = re.search(r"\*\*ARTICLE TITLE:\*\* (.+)", prompt)
+        title = match.group(1).strip() if match else "Repaired Quiz"
+        words = [word for word in re.findall(r"[A-Za-z]{5,}", prompt.split("**ARTICLE TEXT:**")[-1])]
+        words = words or ["article", "content", "history", "science", "culture"]
+        difficulties = ["easy", "medium", "hard"]
+
+        questions = []
+        for n in range(5):
+            options = [words[(n * 4 + k) % len(words)] for k in range(4)]
+            questions.append({
+                "question": f"Which term appears in part {n + 1} of the article about {title}?",
+                "options": options,
+                "answer": options[n % 4],
+                "difficulty": difficulties[n % 3],
+                "explanation": f"The article mentions {options[n % 4]}.",
+            })
+
+        return {
+            "title": title,
+            "summary": f"A generated summary of {title}.",
+            "key_entities": {"people": [], "organizations": [], "locations": []},
+            "sections": ["Introduction"],
+            "quiz": questions,
+            "related_topics": [f"{title} history", f"{title} overview", f"{title} references"],
+        }
+
+    def _respond(self, prompt: str, outcome: str) -> str:
+        if outcome == "transient":
+            raise Exception("503 Fake provider temporarily unavailable")
+        if outcome == "quota":
+            raise Exception("429 Fake provider quota exceeded")
+        # Packed prompts (see packing.py) get one quiz per article
+        articles = re.split(r"(?=\*\*ARTICLE \d+ TITLE:\*\*)", prompt)[1:]
+        if articles:
+            quizzes = [
+                self.build_quiz(re.sub(r"\*\*ARTICLE \d+ (TITLE|TEXT):\*\*", r"**ARTICLE \1:**", article))
+                for article in articles
+            ]
+            text = json.dumps(quizzes, ensure_ascii=False)
+        else:
+            text = json.dumps(self.build_quiz(prompt), ensure_ascii=False)
+        if outcome == "malformed":
+            return text[:len(text) // 2]
+        return text
+
+    async def generate(self, prompt: str) -> LLMResult:
+        latency, outcome = self._draw()
+        await asyncio.sleep(latency)
+        return _estimated(prompt, self._respond(prompt, outcome))
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        latency, outcome = self._draw()
+        text = self._respond(prompt, outcome)
+        chunks = [text[i:i + 200] for i in range(0, len(text), 200)]
+        for chunk in chunks:
+            await asyncio.sleep(latency / len(chunks))
+            yield chunk
+
+
+PROVIDERS = ("gemini", "openai", "fake")
+
+
+def create_provider(name: Optional[str] = None) -> LLMProvider:
+    """Build the provider selected by LLM_PROVIDER"""
+    name = name or settings.LLM_PROVIDER
+    generation_config = {
+        "temperature": settings.LLM_TEMPERATURE,
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": 8192,
+    }
+
+    if name == "gemini":
+        return GeminiProvider(settings.LLM_MODEL, generation_config, settings.GEMINI_API_KEY)
+    if name == "openai":
+        return OpenAICompatibleProvider(
+            settings.LLM_MODEL,
+            generation_config,
+            settings.LLM_BASE_URL,
+            settings.LLM_API_KEY
+        )
+    if name == "fake":
+        return FakeProvider(
+            "fake-quiz-model",
+            generation_config,
+            latency_ms=settings.FAKE_LLM_LATENCY_MS,
+            jitter_ms=settings.FAKE_LLM_JITTER_MS,
+            failure_rate=settings.FAKE_LLM_FAILURE_RATE,
+            quota_rate=settings.FAKE_LLM_QUOTA_RATE,
+            malformed_rate=settings.FAKE_LLM_MALFORMED_RATE,
+            seed=settings.FAKE_LLM_SEED
+        )
+    raise ValueError(f"Unknown LLM provider: {name}")
@@ -1,36 +1,45 @@
 """
-Quiz generator using Google's native Generative AI SDK
+Quiz generator: prompting, parsing and retries around the configured LLM provider
 """
-import google.generativeai as genai
-from models import QuizOutput
+from models import QuizOutput, QuizQuestion
+from typing import AsyncIterator, List, Optional, Tuple
+from token_budget import estimate_tokens
+from token_accounting import TokenUsage
+from context_compressor import compress_article
+from llm_client import llm_manager
+from llm_cache import llm_outputs
+from retry import (
+    Deadline,
+    InvalidQuizSchema,
+    MalformedLLMOutput,
+    REPAIRABLE,
+    classify_error,
+    next_delay,
+    retry_counters,
+)
+from config import settings
+from metrics import LLM_PARSE_SECONDS, LLM_REQUEST_SECONDS
+from pydantic import ValidationError
+from collections import Counter
+import asyncio
 import json
+import logging
 import time
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Configure Gemini API
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-
-genai.configure(api_key=GEMINI_API_KEY)
+# Bump whenever QUIZ_GENERATION_PROMPT changes so cached outputs are not reused
+QUIZ_PROMPT_VERSION = "1"
 
 def get_llm():
-    """Get Gemini model instance"""
-    generation_config = {
-        "temperature": 0.3,
-        "top_p": 0.95,
-        "top_k": 40,
-        "max_output_tokens": 8192,
-    }
-    
-    # Use the working Gemini 2.5 Flash model
-    return genai.GenerativeModel(
-        model_name='models/gemini-2.5-flash',  # ✓ This works!
-        generation_config=generation_config
-    )
+    """Get the shared LLM provider"""
+    return llm_manager.get_provider()
+
+def output_cache_key(article_text: str) -> str:
+    """LLM output cache key for this article text under the current prompt and model"""
+    # The context budget decides which paragraphs reach the prompt
+    prompt_version = f"{QUIZ_PROMPT_VERSION}:{settings.LLM_CONTEXT_TOKEN_BUDGET}"
+    return llm_outputs.make_key(prompt_version, get_llm().describe(), article_text)
 
 QUIZ_GENERATION_PROMPT = """You are an expert educational content creator. Generate a comprehensive quiz based STRICTLY on the Wikipedia article provided.
 
@@ -79,6 +88,17 @@ Generate a quiz with the following structure in pure JSON format (no markdown):
 
 Generate ONLY the JSON output, no additional text:"""
 
+REPAIR_PROMPT = """The text below was supposed to be a single JSON object for a quiz, but it could not be used.
+
+**PROBLEM:** {problem}
+
+**REQUIRED STRUCTURE:** an object with "title", "summary", "key_entities" (with "people", "organizations", "locations" lists), "sections", "quiz" (5-10 objects with "question", "options" (exactly 4), "answer", "difficulty", "explanation") and "related_topics" (3-5 strings).
+
+**BROKEN OUTPUT:**
+{broken_output}
+
+Fix the problem while keeping the content. Return ONLY the corrected JSON, no additional text:"""
+
 def clean_json_response(text: str) -> str:
     """Remove markdown formatting from response"""
     text = text.strip()
@@ -93,84 +113,317 @@ def clean_json_response(text: str) -> str:
     
     return text.strip()
 
-def generate_quiz_from_article(title: str, article_text: str, retry_count: int = 0) -> dict:
+def build_quiz_prompt(title: str, article_text: str) -> str:
+    """
+    Format the quiz prompt.
+    
+    Articles over settings.LLM_CONTEXT_TOKEN_BUDGET are compressed to
+    their most information-dense paragraphs (see context_compressor).
+    """
+    article_text = compress_article(article_text, settings.LLM_CONTEXT_TOKEN_BUDGET)
+    
+    return QUIZ_GENERATION_PROMPT.format(
+        title=title,
+        article_text=article_text
+    )
+
+def parse_quiz_response(response_text: str) -> dict:
+    """Parse the raw LLM output and validate it against QuizOutput"""
+    with LLM_PARSE_SECONDS.time():
+        return _parse_and_validate(response_text)
+
+def _parse_and_validate(response_text: str) -> dict:
+    clean_text = clean_json_response(response_text)
+    
+    # Parse JSON
+    try:
+        quiz_data = json.loads(clean_text)
+    except json.JSONDecodeError as je:
+        logger.warning("✗ JSON parsing error: %s", je)
+        logger.debug("Response preview: %s...", clean_text[:300])
+        raise MalformedLLMOutput(f"Invalid JSON from LLM: {je}", response_text)
+    
+    # Validate with Pydantic schema
+    try:
+        validated = QuizOutput(**quiz_data)
+    except (ValidationError, TypeError) as ve:
+        raise InvalidQuizSchema(f"Quiz does not match schema: {ve}", response_text)
+    
+    logger.debug("✓ Quiz validated: %s questions", len(validated.quiz))
+    
+    return validated.model_dump()
+
+def _quota_exceeded() -> Exception:
+    return Exception(
+        f"LLM quota exceeded ({get_llm().name} provider). "
+        "Wait a minute and try again, or raise the provider's rate limit."
+    )
+
+def build_repair_prompt(error: Exception) -> str:
+    """Prompt that sends back only the broken output, not the article"""
+    return REPAIR_PROMPT.format(problem=str(error)[:1000], broken_output=error.raw_text)
+
+def _final_error(error: Exception, error_class: str) -> Exception:
+    if error_class == "quota":
+        return _quota_exceeded()
+    if error_class == "capacity":
+        return error
+    return Exception(f"Quiz generation failed: {str(error)}")
+
+async def call_llm(prompt: str, deadline: Deadline, usage: Optional[TokenUsage] = None) -> str:
+    """One rate-limited LLM call bounded by the request deadline"""
+    async with llm_manager.slot(estimate_tokens(prompt), timeout=deadline.remaining()) as provider:
+        start_time = time.time()
+        result = await asyncio.wait_for(
+            provider.generate(prompt),
+            timeout=max(deadline.remaining(), 0.001)
+        )
+        elapsed = time.time() - start_time
+        llm_manager.charge_output(result.output_tokens)
+        LLM_REQUEST_SECONDS.observe(elapsed, provider=provider.name)
+        if usage is not None:
+            usage.record(result.prompt_tokens, result.output_tokens, elapsed)
+        logger.debug(
+            "✓ LLM responded in %.2f seconds (%s prompt / %s output tokens)",
+            elapsed, result.prompt_tokens, result.output_tokens,
+            extra={"llm_seconds": elapsed, "prompt_tokens": result.prompt_tokens, "output_tokens": result.output_tokens}
+        )
+        return result.text
+
+async def generate_quiz_from_article_async(
+    title: str,
+    article_text: str,
+    usage: Optional[TokenUsage] = None
+) -> dict:
     """
-    Generate quiz using Google's Generative AI SDK
+    Generate quiz without blocking the event loop.
+    
+    Identical content (same prompt version, model, generation config and
+    article text) is served from the persistent LLM output cache. Otherwise
+    each error class has its own retry budget with jittered exponential
+    backoff (see retry.RETRY_POLICIES), all within one overall deadline of
+    settings.LLM_REQUEST_DEADLINE. Malformed or off-schema output first
+    gets one cheap repair call that resends only the broken output.
     
     Args:
         title: Wikipedia article title
         article_text: Cleaned article content
-        retry_count: Current retry attempt
+        usage: Optional TokenUsage that receives tokens and latency of every call
         
     Returns:
         Dictionary containing validated quiz data
         
     Raises:
+        LLMCapacityError: If no LLM slot frees up in time
         Exception: If generation fails after retries
     """
-    max_retries = 2
+    cache_key = output_cache_key(article_text)
+    cached = llm_outputs.get(cache_key)
+    if cached is not None:
+        logger.debug("✓ LLM output cache hit for: %s", title)
+        return cached
     
-    try:
-        # Get model
-        model = get_llm()
-        
-        # Truncate article if too long (avoid token limits)
-        max_length = 15000
-        if len(article_text) > max_length:
-            article_text = article_text[:max_length] + "\n\n[Article truncated for processing]"
-        
-        # Format prompt
-        prompt = QUIZ_GENERATION_PROMPT.format(
-            title=title,
-            article_text=article_text
-        )
+    quiz_data = await _generate_with_retries(title, article_text, usage)
+    llm_outputs.put(cache_key, quiz_data)
+    return quiz_data
+
+async def _generate_with_retries(title: str, article_text: str, usage: Optional[TokenUsage]) -> dict:
+    prompt = build_quiz_prompt(title, article_text)
+    deadline = Deadline(settings.LLM_REQUEST_DEADLINE)
+    retries = Counter()
+    attempt = 0
+    
+    while True:
+        attempt += 1
+        try:
+            logger.info("🤖 Generating quiz for: %s (Attempt %s)", title, attempt)
+            return parse_quiz_response(await call_llm(prompt, deadline, usage))
+        except Exception as e:
+            error, error_class = e, classify_error(e)
+            logger.warning("✗ Attempt %s failed (%s): %s", attempt, error_class, str(e)[:200])
         
-        print(f"🤖 Generating quiz for: {title} (Attempt {retry_count + 1})")
-        start_time = time.time()
+        if error_class in REPAIRABLE and retries["repair"] == 0:
+            retries["repair"] += 1
+            retry_counters["repair"] += 1
+            try:
+                logger.info("🔧 Repairing malformed LLM output for: %s", title)
+                return parse_quiz_response(await call_llm(build_repair_prompt(error), deadline, usage))
+            except Exception as e:
+                error, error_class = e, classify_error(e)
+                logger.warning("✗ Repair failed (%s): %s", error_class, str(e)[:200])
         
-        # Generate content
-        response = model.generate_content(prompt)
+        # Quota errors drain the limiter so this and queued calls wait for fresh budget
+        if error_class == "quota":
+            llm_manager.note_quota_exhausted()
         
-        elapsed = time.time() - start_time
-        print(f"✓ LLM responded in {elapsed:.2f} seconds")
+        delay = next_delay(error_class, retries[error_class], deadline)
+        if delay is None:
+            raise _final_error(error, error_class)
+        retries[error_class] += 1
+        retry_counters[error_class] += 1
+        logger.info("⏳ Retrying in %.1fs...", delay)
+        await asyncio.sleep(delay)
+
+class QuizArrayStreamParser:
+    """
+    Incremental scanner that pulls complete objects out of the "quiz" array.
+    
+    Feed it raw text chunks as the LLM produces them; each call returns
+    the question dicts whose closing brace arrived in that chunk. It only
+    tracks string/escape state and bracket depth, so it tolerates the
+    markdown fences that clean_json_response strips from full responses.
+    """
+    
+    def __init__(self):
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None
+        self._in_quiz = False
+        self._object_start = None
+        self._text = ""
+    
+    def feed(self, chunk: str) -> List[dict]:
+        self._text += chunk
+        found = []
+        text = self._text
         
-        # Extract and clean response text
-        response_text = response.text
-        clean_text = clean_json_response(response_text)
+        while self._position < len(text):
+            char = text[self._position]
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and not self._in_quiz:
+                        self._last_key = text[self._string_start + 1:self._position]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._position
+            elif char in "{[":
+                if char == "[" and self._depth == 1 and self._last_key == "quiz":
+                    self._in_quiz = True
+                elif char == "{" and self._in_quiz and self._depth == 2:
+                    self._object_start = self._position
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._in_quiz and char == "}" and self._depth == 2 and self._object_start is not None:
+                    found.append(json.loads(text[self._object_start:self._position + 1]))
+                    self._object_start = None
+                elif self._in_quiz and char == "]" and self._depth == 1:
+                    self._in_quiz = False
+                    self._last_key = None
+            
+            self._position += 1
         
-        # Parse JSON
+        return found
+
+async def stream_quiz_from_article(
+    title: str,
+    article_text: str,
+    usage: Optional[TokenUsage] = None
+) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Generate a quiz with a streamed LLM response.
+    
+    Yields ("question", question_dict) for each question as soon as it is
+    complete and valid, then ("quiz", quiz_data) with the fully validated
+    quiz. Queueing for the slot and the whole stream are bounded by
+    settings.LLM_REQUEST_DEADLINE. Until the first question reaches the
+    caller, failures are retried with the same per-class policies as
+    generate_quiz_from_article_async; after that a failure cannot be
+    replayed to the client and is raised.
+    
+    Raises:
+        LLMCapacityError: If no LLM slot frees up in time
+        Exception: If generation or validation fails
+    """
+    cache_key = output_cache_key(article_text)
+    cached = llm_outputs.get(cache_key)
+    if cached is not None:
+        logger.debug("✓ LLM output cache hit for: %s", title)
+        for question in cached["quiz"]:
+            yield "question", question
+        yield "quiz", cached
+        return
+    
+    prompt = build_quiz_prompt(title, article_text)
+    deadline = Deadline(settings.LLM_REQUEST_DEADLINE)
+    retries = Counter()
+    attempt = 0
+    sent = 0
+    
+    while True:
+        attempt += 1
+        logger.info("🤖 Streaming quiz for: %s (Attempt %s)", title, attempt)
+        start_time = time.time()
+        parser = QuizArrayStreamParser()
+        chunks = []
         try:
-            quiz_data = json.loads(clean_text)
-        except json.JSONDecodeError as je:
-            print(f"✗ JSON parsing error: {je}")
-            print(f"Response preview: {clean_text[:300]}...")
-            raise Exception(f"Invalid JSON from LLM: {je}")
-        
-        # Validate with Pydantic schema
-        validated = QuizOutput(**quiz_data)
-        
-        print(f"✓ Quiz validated: {len(validated.quiz)} questions")
+            # The slot is held for the whole stream
+            async with llm_manager.slot(estimate_tokens(prompt), timeout=deadline.remaining()) as provider:
+                stream = provider.stream(prompt).__aiter__()
+                try:
+                    while True:
+                        try:
+                            text = await asyncio.wait_for(stream.__anext__(), max(deadline.remaining(), 0.001))
+                        except StopAsyncIteration:
+                            break
+                        except asyncio.TimeoutError:
+                            raise TimeoutError("LLM stream did not finish within the request deadline")
+                        chunks.append(text)
+                        for question in parser.feed(text):
+                            try:
+                                validated = QuizQuestion(**question)
+                            except Exception as e:
+                                # Leave it to the final QuizOutput validation to reject
+                                logger.debug("✗ Skipping invalid streamed question: %s", str(e)[:200])
+                                continue
+                            if sent == 0:
+                                logger.debug("✓ First question after %.2f seconds", time.time() - start_time)
+                            sent += 1
+                            yield "question", validated.model_dump()
+                finally:
+                    await stream.aclose()
+                    # Streamed output counts against the token budget, even when cut short
+                    output_tokens = estimate_tokens("".join(chunks))
+                    llm_manager.charge_output(output_tokens)
+                    if usage is not None:
+                        # Streamed responses carry no usage metadata; estimate from the text
+                        usage.record(estimate_tokens(prompt), output_tokens, time.time() - start_time)
+            quiz_data = parse_quiz_response("".join(chunks))
+            break
+        except Exception as e:
+            error, error_class = e, classify_error(e)
+            logger.warning("✗ Streaming attempt %s failed (%s): %s", attempt, error_class, str(e)[:200])
         
-        return validated.model_dump()
+        # Quota errors drain the limiter so this and queued calls wait for fresh budget
+        if error_class == "quota":
+            llm_manager.note_quota_exhausted()
         
-    except Exception as e:
-        error_msg = str(e)
-        print(f"✗ Attempt {retry_count + 1} failed: {error_msg[:200]}")
+        if sent:
+            # Questions already reached the client; a retry would repeat them
+            if error_class == "quota":
+                raise _quota_exceeded()
+            raise Exception(f"Quiz generation failed: {str(error)}")
         
-        # Handle quota errors
-        if "429" in error_msg or "quota" in error_msg.lower() or "RESOURCE_EXHAUSTED" in error_msg:
-            raise Exception(
-                "Gemini API quota exceeded. Free tier: 60 requests/minute for gemini-pro. "
-                "Wait 60 seconds or get new API key at https://aistudio.google.com/apikey"
-            )
-        
-        # Retry on transient errors
-        if retry_count < max_retries:
-            if any(term in error_msg.lower() for term in ["timeout", "500", "503", "temporarily"]):
-                wait_time = (retry_count + 1) * 5
-                print(f"⏳ Retrying in {wait_time}s...")
-                time.sleep(wait_time)
-                return generate_quiz_from_article(title, article_text, retry_count + 1)
-        
-        # Final failure
-        raise Exception(f"Quiz generation failed: {error_msg}")
+        delay = next_delay(error_class, retries[error_class], deadline)
+        if delay is None:
+            raise _final_error(error, error_class)
+        retries[error_class] += 1
+        retry_counters[error_class] += 1
+        logger.info("⏳ Retrying stream in %.1fs...", delay)
+        await asyncio.sleep(delay)
+    
+    elapsed = time.time() - start_time
+    LLM_REQUEST_SECONDS.observe(elapsed, provider=provider.name)
+    logger.info("✓ LLM stream finished in %.2f seconds", elapsed)
+    
+    llm_outputs.put(cache_key, quiz_data)
+    yield "quiz", quiz_data
@@ -0,0 +1,53 @@
+"""
+Logging configuration for the API and scripts.
+
+LOG_FORMAT=text prints "time level logger: message" lines; LOG_FORMAT=json
+prints one JSON object per line with any `extra` fields included. Per-
+request and per-call messages log at DEBUG, so LOG_LEVEL=INFO (default)
+keeps the hot path quiet and LOG_LEVEL=OFF silences logging entirely.
+Messages use %-style arguments, which are only formatted when emitted.
+"""
+import json
+import logging
+from datetime import datetime, timezone
+
+from config import settings
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging() -> None:
+    """Install the handler on the root logger once"""
+    root = logging.getLogger()
+    if getattr(configure_logging, "done", False):
+        return
+    configure_logging.done = True
+
+    if settings.LOG_LEVEL == "OFF":
+        logging.disable(logging.CRITICAL)
+        return
+
+    handler = logging.StreamHandler()
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL)
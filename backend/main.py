@@ -1,18 +1,58 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+import asyncio
+import base64
 import json
+import logging
+import time
 from datetime import datetime
 
-from database import get_db, init_db, Quiz, test_connection
-from models import QuizGenerateRequest, QuizHistoryItem
-from scraper import scrape_wikipedia, validate_wikipedia_url
-from llm_quiz_generator import generate_quiz_from_article
+from database import (
+    article_key_matches,
+    get_async_db,
+    init_db,
+    close_async_engine,
+    DIFFICULTIES,
+    ArticleAlias,
+    GenerationJob,
+    Question,
+    Quiz,
+    pool_stats,
+    test_connection,
+)
+from models import (
+    JobStatus,
+    QuizAssembleRequest,
+    QuizBatchRequest,
+    QuizGenerateRequest,
+    QuizHistoryItem,
+    QuizSearchResult,
+)
+from scraper import validate_wikipedia_url, article_key_from_url, close_http_clients
+from quiz_pipeline import cached_quiz_response, run_generation
+from llm_client import llm_manager
+from retry import retry_counters
+from llm_cache import llm_outputs
+from token_accounting import usage_report
 from config import settings
+from logging_setup import configure_logging
+from metrics import HTTP_REQUEST_SECONDS, CallbackMetric, render_metrics
+from singleflight import generation_flights
+from response_cache import quiz_responses
+from search_index import quiz_search
+from prefetch import prefetcher
+from question_bank import assemble_quiz
+from batch import run_batch
+from jobs import job_queue, get_job, QueueFullError, QueueNotReadyError, TERMINAL_STATUSES
 
 # Validate configuration on startup
 settings.validate()
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -46,26 +86,105 @@ app.add_middleware(
         "Access-Control-Request-Method",
         "Access-Control-Request-Headers"
     ],
-    expose_headers=["*"],
+    expose_headers=["*", "X-Next-Cursor", "ETag"],
     max_age=3600,
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Per-route latency histogram, labelled with the route template, not the raw path"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code)
+    )
+    return response
+
+# Values already tracked elsewhere, read when /metrics is scraped
+CallbackMetric("quiz_response_cache_hits_total", "Serialized response cache hits", "counter", lambda: quiz_responses.hits)
+CallbackMetric("quiz_response_cache_misses_total", "Serialized response cache misses", "counter", lambda: quiz_responses.misses)
+CallbackMetric("quiz_llm_cache_hits_total", "LLM output cache hits", "counter", lambda: llm_outputs.hits)
+CallbackMetric("quiz_llm_cache_misses_total", "LLM output cache misses", "counter", lambda: llm_outputs.misses)
+CallbackMetric("quiz_llm_retries_total", "LLM retries and repairs by error class", "counter", lambda: dict(retry_counters), label="error_class")
+CallbackMetric("quiz_llm_quota_errors_total", "LLM quota (429) errors", "counter", lambda: llm_manager.quota_errors)
+CallbackMetric("quiz_llm_rejected_total", "LLM calls rejected by the rate limiter", "counter", lambda: llm_manager.rejected)
+CallbackMetric("quiz_generations_in_flight", "Article generations in progress", "gauge", generation_flights.in_flight)
+CallbackMetric("quiz_llm_calls_in_flight", "LLM calls in progress", "gauge", lambda: llm_manager.in_flight)
+CallbackMetric("quiz_llm_calls_waiting", "LLM calls queued in the rate limiter", "gauge", lambda: llm_manager.waiting)
+CallbackMetric("quiz_jobs_queue_depth", "Background jobs waiting", "gauge", job_queue.depth)
+CallbackMetric("quiz_jobs_running", "Background jobs running", "gauge", lambda: job_queue.running)
+CallbackMetric("quiz_prefetch_events_total", "Related-topic prefetch outcomes and hits", "counter", lambda: dict(prefetcher.counters), label="event")
+CallbackMetric("quiz_prefetch_queue_depth", "Related topics waiting to be prefetched", "gauge", prefetcher.queue_depth)
+CallbackMetric("quiz_prefetch_hit_ratio", "Prefetched articles and quizzes later used by a request", "gauge", prefetcher.hit_rate)
+CallbackMetric("quiz_search_documents", "Quizzes in the search index", "gauge", lambda: quiz_search.stats()["documents"])
+CallbackMetric("quiz_search_queries_total", "Search queries served", "counter", lambda: quiz_search.queries)
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database and test connections on startup"""
-    print("\n" + "="*50)
-    print("Starting AI Wiki Quiz Generator")
-    print("="*50)
+    """Start serving at once; connect to and prepare the database in the background"""
+    logger.info("Starting AI Wiki Quiz Generator")
+    app.state.database_ready = False
+    # Keep a reference so the task is not garbage-collected mid-run
+    app.state.startup_task = asyncio.create_task(prepare_database())
     
-    if test_connection():
-        init_db()
-    else:
-        print("Warning: Database connection issues detected")
+    logger.info("Server running on %s:%s", settings.HOST, settings.PORT)
+    logger.info("Debug mode: %s", settings.DEBUG)
+
+async def prepare_database():
+    """
+    Check the connection, create/migrate tables, then start job workers
+    and the search index build (unless SEARCH_INDEX_ON_STARTUP is off).
     
-    print(f"Server running on {settings.HOST}:{settings.PORT}")
-    print(f"Debug mode: {settings.DEBUG}")
-    print("="*50 + "\n")
+    Runs off the event loop so a slow or unreachable database does not
+    delay the first request; until it finishes, requests that need the
+    database wait on the connection pool as usual.
+    """
+    started = time.perf_counter()
+    if not await asyncio.to_thread(test_connection):
+        logger.warning("Warning: Database connection issues detected")
+        return
+    try:
+        await asyncio.to_thread(init_db)
+    except Exception:
+        return
+    await job_queue.start()
+    prefetcher.start()
+    app.state.database_ready = True
+    logger.info("✓ Database ready in %.2fs", time.perf_counter() - started)
+    if settings.SEARCH_INDEX_ON_STARTUP:
+        refresh_search_index()
+
+async def build_search_index():
+    started = time.perf_counter()
+    try:
+        indexed = await asyncio.to_thread(quiz_search.sync_from_db)
+        logger.info("✓ Indexed %s quizzes for search in %.1fs", indexed, time.perf_counter() - started)
+    except Exception as e:
+        logger.error("✗ Search index build failed: %s", str(e))
+
+def refresh_search_index():
+    """Catch the search index up with the database in the background, unless already doing so"""
+    task = getattr(app.state, "search_refresh_task", None)
+    if task is not None and not task.done():
+        return
+    quiz_search.last_refresh = time.monotonic()
+    # Keep a reference so the task is not garbage-collected mid-run
+    app.state.search_refresh_task = asyncio.create_task(build_search_index())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop job workers and release pooled outbound HTTP connections"""
+    app.state.startup_task.cancel()
+    await prefetcher.stop()
+    await job_queue.stop()
+    await close_http_clients()
+    await llm_manager.close()
+    await close_async_engine()
 
 # Root endpoint
 @app.get("/")
@@ -77,9 +196,16 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "generate_quiz": "POST /api/generate_quiz/",
+            "generate_quiz_stream": "POST /api/generate_quiz/stream",
+            "generate_quiz_batch": "POST /api/generate_quiz/batch",
             "get_history": "GET /api/history/",
             "get_quiz_details": "GET /api/quiz/{id}/",
-            "health_check": "GET /health"
+            "search": "GET /api/search?q=",
+            "assemble_quiz": "POST /api/quiz/assemble",
+            "get_job_status": "GET /api/jobs/{job_id}",
+            "job_events": "GET /api/jobs/{job_id}/events",
+            "health_check": "GET /health",
+            "metrics": "GET /metrics"
         },
         "docs": "/docs",
         "cors": "enabled"
@@ -87,16 +213,27 @@ async def root():
 
 # Health check endpoint
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     """Check if API and database are healthy"""
     try:
         from sqlalchemy import text
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         return {
             "status": "healthy",
             "database": "connected",
             "timestamp": datetime.utcnow().isoformat(),
-            "cors": "enabled"
+            "cors": "enabled",
+            "database_ready": getattr(app.state, "database_ready", False),
+            "generation_flights": generation_flights.stats(),
+            "db_pool": pool_stats(),
+            "response_cache": quiz_responses.stats(),
+            "jobs": job_queue.stats(),
+            "llm": llm_manager.stats(),
+            "llm_retries": dict(retry_counters),
+            "llm_cache": llm_outputs.stats(),
+            "token_usage": usage_report(),
+            "search_index": quiz_search.stats(),
+            "prefetch": prefetcher.stats()
         }
     except Exception as e:
         return {
@@ -106,11 +243,25 @@ async def health_check(db: Session = Depends(get_db)):
             "timestamp": datetime.utcnow().isoformat()
         }
 
+# Prometheus metrics
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage histograms, cache/retry counters and route latencies in Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+def _raw_json_response(body: bytes, etag: str) -> Response:
+    """Send pre-serialized JSON bytes as-is"""
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
 # ENDPOINT 1: Generate Quiz
 @app.post("/api/generate_quiz/")
 async def generate_quiz(
     request: QuizGenerateRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Generate quiz from Wikipedia URL with caching support
@@ -118,9 +269,11 @@ async def generate_quiz(
     Request Body:
     - url: Wikipedia article URL (required)
     - force: Force regenerate even if cached (optional, default: false)
+    - background: Queue a job and return 202 with its id (optional, default: false)
     
     Returns:
     - Complete quiz data with questions, entities, and related topics
+    - In background mode, the job status (poll /api/jobs/{job_id} or its /events stream)
     """
     try:
         # Validate URL format
@@ -130,98 +283,445 @@ async def generate_quiz(
                 detail="Invalid Wikipedia URL. Must be https://en.wikipedia.org/wiki/Article_Name"
             )
         
-        # Check cache
-        existing_quiz = db.query(Quiz).filter(Quiz.url == request.url).first()
+        # Check cache by canonical article key, not the raw URL string
+        article_key = article_key_from_url(request.url)
+        existing_quiz = (
+            await db.execute(
+                select(Quiz.id, Quiz.date_generated).where(article_key_matches(article_key)).limit(1)
+            )
+        ).first()
+        if existing_quiz and not request.force:
+            prefetcher.claim_quiz(article_key)
+        
+        if request.background:
+            if existing_quiz and not request.force:
+                job = await job_queue.record_done(request.url, article_key, existing_quiz.id)
+            else:
+                try:
+                    job = await job_queue.submit(request.url, article_key, request.force)
+                except (QueueFullError, QueueNotReadyError) as e:
+                    raise HTTPException(status_code=503, detail=str(e))
+            logger.info("✓ Queued job %s (%s) for: %s", job.id, job.status, article_key)
+            return JSONResponse(status_code=202, content=_job_status(job).model_dump(mode="json"))
         
         if existing_quiz and not request.force:
-            print(f"✓ Returning cached quiz for: {request.url}")
-            quiz_data = json.loads(existing_quiz.full_quiz_data)
-            return {
-                "id": existing_quiz.id,
-                "url": existing_quiz.url,
-                "cached": True,
-                "date_generated": existing_quiz.date_generated.isoformat(),
-                **quiz_data
-            }
+            logger.debug("✓ Returning cached quiz for: %s", article_key)
+            cache_key = quiz_responses.make_key("generate", existing_quiz.id, existing_quiz.date_generated)
+            cached = quiz_responses.get(cache_key)
+            if cached is None:
+                quiz = await db.get(Quiz, existing_quiz.id)
+                cached = quiz_responses.put(cache_key, cached_quiz_response(quiz))
+            return _raw_json_response(*cached)
         
-        # Step 1: Scrape Wikipedia
-        print(f"→ Scraping Wikipedia: {request.url}")
-        try:
-            title, clean_text, raw_html = scrape_wikipedia(request.url)
-            print(f"✓ Scraped: {title} ({len(clean_text)} characters)")
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Scraping error: {str(e)}")
+        # Hand the pooled connection back; otherwise every request waiting on
+        # the scrape and LLM call keeps one checked out and reads queue behind them
+        await db.close()
+
+        # Steps 1-3 run once per article, however many requests are waiting on it
+        return await run_generation(request.url, article_key, request.force)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("✗ Unexpected error: %s", str(e))
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+JOB_EVENTS_POLL_SECONDS = 2
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+def _encode_history_cursor(date_generated: datetime, quiz_id: int) -> str:
+    """Opaque keyset cursor pointing just after (date_generated, id)"""
+    raw = f"{date_generated.isoformat()}|{quiz_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def _decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_part, id_part = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+def _ndjson(event: str, **fields) -> bytes:
+    return (json.dumps({"event": event, **fields}, ensure_ascii=False) + "\n").encode("utf-8")
+
+# ENDPOINT 1b: Generate Quiz (streamed)
+@app.post("/api/generate_quiz/stream")
+async def generate_quiz_stream(
+    request: QuizGenerateRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Generate quiz and stream questions as the LLM produces them
+    
+    Request Body:
+    - url: Wikipedia article URL (required)
+    - force: Force regenerate even if cached (optional, default: false)
+    
+    Returns:
+    - Newline-delimited JSON events: {"event": "status"}, one
+      {"event": "question"} per question, then {"event": "done"} with the
+      complete saved quiz, or {"event": "error"} with a detail message
+    """
+    if not validate_wikipedia_url(request.url):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid Wikipedia URL. Must be https://en.wikipedia.org/wiki/Article_Name"
+        )
+    
+    article_key = article_key_from_url(request.url)
+    cached = None
+    if not request.force:
+        existing_quiz = (
+            await db.execute(
+                select(Quiz.id, Quiz.url, Quiz.date_generated, Quiz.full_quiz_data)
+                .where(article_key_matches(article_key))
+                .limit(1)
+            )
+        ).first()
+        if existing_quiz:
+            cached = cached_quiz_response(existing_quiz)
+    # No connection held while the response streams
+    await db.close()
+    
+    async def events():
+        if cached is not None:
+            logger.debug("✓ Streaming cached quiz for: %s", article_key)
+            for index, question in enumerate(cached["quiz"]):
+                yield _ndjson("question", index=index, question=question)
+            yield _ndjson("done", quiz=cached)
+            return
         
-        # Step 2: Generate quiz with LLM
-        print(f"→ Generating quiz with Gemini AI...")
+        # Statuses and questions arrive here as the shared flight produces them
+        updates = asyncio.Queue()
+        generation = asyncio.create_task(run_generation(
+            request.url,
+            article_key,
+            request.force,
+            on_status=lambda status: updates.put_nowait(("status", status)),
+            on_question=lambda question: updates.put_nowait(("question", question))
+        ))
+        generation.add_done_callback(lambda _: updates.put_nowait(None))
+        sent = 0
         try:
-            quiz_data = generate_quiz_from_article(title, clean_text)
-            print(f"✓ Generated {len(quiz_data['quiz'])} questions")
+            while True:
+                update = await updates.get()
+                if update is None:
+                    break
+                kind, payload = update
+                if kind == "status":
+                    yield _ndjson("status", status=payload)
+                else:
+                    yield _ndjson("question", index=sent, question=payload)
+                    sent += 1
+            saved = generation.result()
+            quiz = saved.get("quiz") if isinstance(saved, dict) else None
+            if not quiz:
+                yield _ndjson("error", detail="Generation finished without a quiz")
+                return
+            # Joined another request's flight, or the article was already saved
+            for index in range(sent, len(quiz)):
+                yield _ndjson("question", index=index, question=quiz[index])
+            yield _ndjson("done", quiz=saved)
+        except HTTPException as e:
+            yield _ndjson("error", detail=e.detail)
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"LLM error: {str(e)}")
+            logger.error("✗ Streaming generation error: %s", str(e))
+            yield _ndjson("error", detail=f"LLM error: {str(e)}")
+        finally:
+            # The flight itself is shielded and finishes for other callers
+            generation.cancel()
+    
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ENDPOINT 1c: Generate Quizzes in Batch
+@app.post("/api/generate_quiz/batch")
+async def generate_quiz_batch(request: QuizBatchRequest):
+    """
+    Generate quizzes for many Wikipedia URLs in one request
+    
+    Request Body:
+    - urls: Wikipedia article URLs (required, duplicates are generated once)
+    - force: Regenerate articles that already have a quiz (optional, default: false)
+    - pack: Pack several short articles into one LLM request (optional, default: false)
+    
+    Returns:
+    - Newline-delimited JSON: {"event": "item"} per status change of each URL
+      (invalid, cached, scraping, generating, generated, saved, failed),
+      then one {"event": "summary"} with the totals
+    """
+    if len(request.urls) > settings.BATCH_MAX_URLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many URLs: at most {settings.BATCH_MAX_URLS} per batch"
+        )
+    
+    async def events():
+        async for event in run_batch(request.urls, request.force, request.pack):
+            yield _ndjson(event.pop("event"), **event)
+    
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _job_status(job: GenerationJob) -> JobStatus:
+    return JobStatus(
+        job_id=job.id,
+        url=job.url,
+        status=job.status,
+        quiz_id=job.quiz_id,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
+
+# Background job status
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job_status(job_id: str):
+    """
+    Get the status of a background generation job
+    
+    Returns:
+    - Job status; once done, quiz_id points at /api/quiz/{quiz_id}/
+    """
+    job = await asyncio.to_thread(get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return _job_status(job)
+
+# Background job status stream
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_status(job_id: str):
+    """
+    Server-Sent Events stream of job status changes
+    
+    Emits a "status" event on every change and closes after done/failed.
+    """
+    if not await asyncio.to_thread(get_job, job_id):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    
+    async def events():
+        last_sent = None
+        while True:
+            job = await asyncio.to_thread(get_job, job_id)
+            if job is None:
+                return
+            payload = _job_status(job).model_dump_json()
+            if payload != last_sent:
+                yield f"event: status\ndata: {payload}\n\n"
+                last_sent = payload
+            if job.status in TERMINAL_STATUSES:
+                return
+            # Local updates wake us at once; the timeout covers other workers
+            await job_queue.wait_for_change(job_id, timeout=JOB_EVENTS_POLL_SECONDS)
+            yield ": keep-alive\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ENDPOINT 2: Get Quiz History
+@app.get("/api/history/", response_model=List[QuizHistoryItem])
+async def get_history(
+    response: Response,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a page of generated quizzes, newest first
+    
+    Query Parameters:
+    - limit: Page size (optional, default: 50, max: 200)
+    - cursor: Value of the X-Next-Cursor header from the previous page (optional)
+    
+    Returns:
+    - List of quiz summary objects (id, url, title, date_generated)
+    - X-Next-Cursor header when more quizzes are available
+    """
+    try:
+        # Select only the summary columns; the content blobs stay in the database
+        query = select(Quiz.id, Quiz.url, Quiz.title, Quiz.date_generated)
         
-        # Step 3: Save to database
-        try:
-            if existing_quiz:
-                existing_quiz.full_quiz_data = json.dumps(quiz_data)
-                existing_quiz.scraped_content = raw_html[:50000]
-                existing_quiz.date_generated = datetime.utcnow()
-                db.commit()
-                quiz_id = existing_quiz.id
-                print(f"✓ Updated quiz ID: {quiz_id}")
-            else:
-                new_quiz = Quiz(
-                    url=request.url,
-                    title=title,
-                    full_quiz_data=json.dumps(quiz_data),
-                    scraped_content=raw_html[:50000]
+        if cursor:
+            last_date, last_id = _decode_history_cursor(cursor)
+            # The leading <= bound lets the index seek to the cursor instead of
+            # walking every newer row to evaluate the OR
+            query = query.where(
+                Quiz.date_generated <= last_date,
+                or_(
+                    Quiz.date_generated < last_date,
+                    and_(Quiz.date_generated == last_date, Quiz.id < last_id)
                 )
-                db.add(new_quiz)
-                db.commit()
-                db.refresh(new_quiz)
-                quiz_id = new_quiz.id
-                print(f"✓ Saved new quiz ID: {quiz_id}")
-        except Exception as e:
-            db.rollback()
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+            )
         
-        # Return success response
-        return {
-            "id": quiz_id,
-            "url": request.url,
-            "cached": False,
-            "date_generated": datetime.utcnow().isoformat(),
-            **quiz_data
-        }
+        # Fetch one extra row to know whether another page exists
+        rows = (
+            await db.execute(
+                query.order_by(Quiz.date_generated.desc(), Quiz.id.desc()).limit(limit + 1)
+            )
+        ).all()
+        
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            response.headers["X-Next-Cursor"] = _encode_history_cursor(last.date_generated, last.id)
         
+        logger.debug("✓ Returning %s quizzes from history", len(rows))
+        return [QuizHistoryItem.model_validate(row) for row in rows]
     except HTTPException:
         raise
     except Exception as e:
-        print(f"✗ Unexpected error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+        logger.error("✗ Database error: %s", str(e))
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-# ENDPOINT 2: Get Quiz History
-@app.get("/api/history/", response_model=List[QuizHistoryItem])
-async def get_history(db: Session = Depends(get_db)):
+# ENDPOINT 2b: Search Quizzes
+@app.get("/api/search", response_model=List[QuizSearchResult])
+async def search_quizzes(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Get list of all generated quizzes
+    Full-text search over quiz titles, summaries, entities, questions and article text
+    
+    Query Parameters:
+    - q: Search terms; the last term also matches as a prefix (search-as-you-type)
+    - limit: Maximum results (optional, default: 20, max: 100)
     
     Returns:
-    - List of quiz summary objects (id, url, title, date_generated)
+    - Matching quiz summaries (id, url, title, date_generated) with BM25 score, best first
+    """
+    # Pick up quizzes saved by other workers (or build the index if startup
+    # skipped it); this query uses the index as it is
+    if not quiz_search.ready or quiz_search.is_stale():
+        refresh_search_index()
+    
+    # Scoring long posting lists takes milliseconds; keep it off the event loop
+    hits = await asyncio.to_thread(quiz_search.search, q, limit)
+    if not hits:
+        return []
+    
+    try:
+        result = await db.execute(
+            select(Quiz.id, Quiz.url, Quiz.title, Quiz.date_generated)
+            .where(Quiz.id.in_([quiz_id for quiz_id, _ in hits]))
+        )
+        rows = {row.id: row for row in result}
+    except Exception as e:
+        logger.error("✗ Database error: %s", str(e))
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    logger.debug("✓ Search %r matched %s quizzes", q, len(hits))
+    # Quizzes deleted since they were indexed are skipped
+    return [
+        QuizSearchResult(
+            id=quiz_id,
+            url=rows[quiz_id].url,
+            title=rows[quiz_id].title,
+            date_generated=rows[quiz_id].date_generated,
+            score=round(score, 4)
+        )
+        for quiz_id, score in hits
+        if quiz_id in rows
+    ]
+
+# ENDPOINT 2c: Assemble a Quiz from Saved Questions
+@app.post("/api/quiz/assemble")
+async def assemble_quiz_from_bank(
+    request: QuizAssembleRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Build a new quiz from questions already generated for one or more articles
+    
+    Never calls the LLM: questions are sampled from the question bank, spread
+    across the articles, without repeating a question text.
+    
+    Request Body:
+    - urls: Wikipedia article URLs with saved quizzes (required, at most 20)
+    - count: Number of questions (optional, default: 10, max: 50)
+    - difficulty_mix: Relative weight per difficulty (optional, default: 40/40/20 easy/medium/hard)
+    - seed: Seed for a reproducible sample (optional)
+    
+    Returns:
+    - Questions ordered easy to hard, each with the article_key it came from
+    - Counts per difficulty; shortfall lists difficulties with too few
+      questions, which were filled from the nearest other difficulty
+    - missing: article keys without saved questions
     """
+    invalid = [url for url in request.urls if not validate_wikipedia_url(url)]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid Wikipedia URLs: {', '.join(invalid)}"
+        )
+    
+    unknown = set(request.difficulty_mix) - set(DIFFICULTIES)
+    weights = request.difficulty_mix.values()
+    if unknown or any(weight < 0 for weight in weights) or sum(weights) <= 0:
+        raise HTTPException(
+            status_code=400,
+            detail="difficulty_mix needs non-negative weights for easy, medium and hard, not all zero"
+        )
+    
+    requested_keys = list(dict.fromkeys(article_key_from_url(url) for url in request.urls))
+    
+    started = time.perf_counter()
     try:
-        quizzes = db.query(Quiz).order_by(Quiz.date_generated.desc()).all()
-        print(f"✓ Returning {len(quizzes)} quizzes from history")
-        return quizzes
+        # Redirect titles seen before count as their target article
+        aliases = dict((await db.execute(
+            select(ArticleAlias.alias_key, ArticleAlias.article_key)
+            .where(ArticleAlias.alias_key.in_(requested_keys))
+        )).all())
+        article_keys = list(dict.fromkeys(aliases.get(key, key) for key in requested_keys))
+        result = await db.execute(
+            select(Question.article_key, Question.difficulty, Question.text_hash, Question.question_data)
+            .where(Question.article_key.in_(article_keys))
+            .order_by(Question.id)
+        )
+        rows = result.all()
     except Exception as e:
-        print(f"✗ Database error: {str(e)}")
+        logger.error("✗ Database error: %s", str(e))
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    if not rows:
+        raise HTTPException(
+            status_code=404,
+            detail="No saved questions for these articles; generate their quizzes first"
+        )
+    
+    assembled = assemble_quiz(rows, request.count, request.difficulty_mix, request.seed)
+    found = {row.article_key for row in rows}
+    
+    logger.debug(
+        "✓ Assembled %s questions from %s articles in %.1f ms",
+        len(assembled["quiz"]), len(found), (time.perf_counter() - started) * 1000
+    )
+    return {
+        "article_keys": [key for key in article_keys if key in found],
+        "missing": [key for key in article_keys if key not in found],
+        "difficulty_mix": request.difficulty_mix,
+        **assembled
+    }
 
 # ENDPOINT 3: Get Quiz Details
 @app.get("/api/quiz/{quiz_id}/")
-async def get_quiz_details(quiz_id: int, db: Session = Depends(get_db)):
+async def get_quiz_details(
+    quiz_id: int,
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Get complete quiz data for specific quiz ID
     
@@ -230,35 +730,55 @@ async def get_quiz_details(quiz_id: int, db: Session = Depends(get_db)):
     
     Returns:
     - Complete quiz data including questions, entities, and related topics
+    - Token counts and LLM time of the last generation
+    - ETag header; a matching If-None-Match gets 304 Not Modified
     """
     try:
-        quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+        # Only the version is needed to serve from the response cache
+        version = (await db.execute(select(Quiz.date_generated).where(Quiz.id == quiz_id))).first()
         
-        if not quiz:
+        if not version:
             raise HTTPException(
                 status_code=404,
                 detail=f"Quiz with ID {quiz_id} not found"
             )
         
-        # Deserialize JSON data
-        try:
-            quiz_data = json.loads(quiz.full_quiz_data)
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=500, detail="Corrupted quiz data in database")
+        cache_key = quiz_responses.make_key("details", quiz_id, version.date_generated)
+        cached = quiz_responses.get(cache_key)
         
-        print(f"✓ Retrieved quiz ID: {quiz_id} - {quiz.title}")
+        if cached is None:
+            quiz = await db.get(Quiz, quiz_id)
+            
+            # Deserialize JSON data
+            try:
+                quiz_data = json.loads(quiz.full_quiz_data)
+            except json.JSONDecodeError:
+                raise HTTPException(status_code=500, detail="Corrupted quiz data in database")
+            
+            logger.debug("✓ Retrieved quiz ID: %s - %s", quiz_id, quiz.title)
+            
+            cached = quiz_responses.put(cache_key, {
+                "id": quiz.id,
+                "url": quiz.url,
+                "date_generated": quiz.date_generated.isoformat(),
+                "full_quiz_data": quiz_data,
+                "generation": {
+                    "prompt_tokens": quiz.prompt_tokens,
+                    "output_tokens": quiz.output_tokens,
+                    "generation_ms": quiz.generation_ms
+                }
+            })
         
-        return {
-            "id": quiz.id,
-            "url": quiz.url,
-            "date_generated": quiz.date_generated.isoformat(),
-            "full_quiz_data": quiz_data
-        }
+        body, etag = cached
+        if etag in http_request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        return _raw_json_response(body, etag)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"✗ Error fetching quiz: {str(e)}")
+        logger.error("✗ Error fetching quiz: %s", str(e))
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 # OPTIONS handler for CORS preflight (explicit)
@@ -291,7 +811,7 @@ async def validation_exception_handler(request, exc):
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Catch-all exception handler"""
-    print(f"✗ Unhandled exception: {str(exc)}")
+    logger.error("✗ Unhandled exception: %s", str(exc))
     return {
         "error": "Internal Server Error",
         "message": "An unexpected error occurred",
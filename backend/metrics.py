@@ -0,0 +1,144 @@
+"""
+Prometheus-style metrics without extra dependencies.
+
+Histograms and counters are recorded in-process and rendered in the
+Prometheus text exposition format by GET /metrics. Values that other
+modules already track (cache hit counts, in-flight generations, ...) are
+exported through callbacks instead of being counted twice.
+
+Metrics are per worker process; scrape each worker or run a single one.
+"""
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Seconds; covers sub-millisecond parses up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+REGISTRY: List["Metric"] = []
+
+
+def _labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        REGISTRY.append(self)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Exposition lines for this metric's current values"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    """Monotonic count, optionally split by labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count of observed values"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = buckets
+        self._series: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            # One count per bucket plus +Inf, then the running sum
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the with-block, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """
+    Counter or gauge read from existing state when /metrics is scraped.
+
+    fn returns a number, or a dict mapping one label value to a number.
+    """
+
+    def __init__(self, name: str, help_text: str, kind: str, fn: Callable, label: str = ""):
+        super().__init__(name, help_text)
+        self.kind = kind
+        self.fn = fn
+        self.label = label
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_labels(((self.label, name),))} {count}" for name, count in value.items()]
+        return [f"{self.name} {value}"]
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# Stage timings
+SCRAPE_FETCH_SECONDS = Histogram("quiz_scrape_fetch_seconds", "Wikipedia page fetch time")
+SCRAPE_PARSE_SECONDS = Histogram("quiz_scrape_parse_seconds", "Article extraction time")
+LLM_REQUEST_SECONDS = Histogram("quiz_llm_request_seconds", "LLM call latency")
+LLM_PARSE_SECONDS = Histogram("quiz_llm_parse_seconds", "LLM response JSON parse and validation time")
+DB_COMMIT_SECONDS = Histogram("quiz_db_commit_seconds", "Database flush and commit time")
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency until response headers")
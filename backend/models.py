@@ -6,6 +6,33 @@ from datetime import datetime
 class QuizGenerateRequest(BaseModel):
     url: str = Field(..., description="Wikipedia article URL")
     force: bool = Field(default=False, description="Force regenerate even if cached")
+    background: bool = Field(default=False, description="Queue a background job and return its id immediately")
+
+# Input model for batch quiz generation
+class QuizBatchRequest(BaseModel):
+    urls: List[str] = Field(..., description="Wikipedia article URLs", min_length=1)
+    force: bool = Field(default=False, description="Regenerate articles that already have a quiz")
+    pack: bool = Field(default=False, description="Pack several short articles into one LLM request")
+
+# Input model for assembling a quiz from saved questions
+class QuizAssembleRequest(BaseModel):
+    urls: List[str] = Field(..., description="Wikipedia article URLs to sample from", min_length=1, max_length=20)
+    count: int = Field(default=10, description="Number of questions", ge=1, le=50)
+    difficulty_mix: Dict[str, float] = Field(
+        default_factory=lambda: {"easy": 0.4, "medium": 0.4, "hard": 0.2},
+        description="Relative weight per difficulty (easy, medium, hard)"
+    )
+    seed: Optional[int] = Field(default=None, description="Seed for a reproducible sample")
+
+# Status of a background generation job
+class JobStatus(BaseModel):
+    job_id: str
+    url: str
+    status: str = Field(..., description="queued, scraping, generating, done or failed")
+    quiz_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
 
 # Output model for quiz history items
 class QuizHistoryItem(BaseModel):
@@ -17,6 +44,10 @@ class QuizHistoryItem(BaseModel):
     class Config:
         from_attributes = True
 
+# Full-text search hit
+class QuizSearchResult(QuizHistoryItem):
+    score: float
+
 # Individual quiz question schema
 class QuizQuestion(BaseModel):
     question: str = Field(..., description="The quiz question text")
@@ -0,0 +1,241 @@
+"""
+Multi-article packing: several short articles per LLM request.
+
+Stubs and short articles use a fraction of the article token budget, but
+each single-article request still pays for the full instruction block.
+In packing mode, short articles are bin-packed into prompts that share
+one instruction block, and the model returns a JSON array with one quiz
+per article. Each quiz is validated on its own; articles whose quiz is
+missing or invalid fall back to a regular single-article call.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+from collections import Counter
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from config import settings
+from llm_cache import llm_outputs
+from llm_quiz_generator import (
+    build_quiz_prompt,
+    call_llm,
+    clean_json_response,
+    generate_quiz_from_article_async,
+    output_cache_key,
+)
+from models import QuizOutput
+from retry import Deadline
+from token_accounting import TokenUsage
+from token_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+PACKED_QUIZ_PROMPT = """You are an expert educational content creator. Generate one quiz for EACH of the {count} Wikipedia articles below, based STRICTLY on that article.
+
+**STRICT RULES:**
+- Use ONLY information from the article a quiz is for
+- DO NOT use external knowledge or mix content between articles
+- Every question must be answerable from its article
+- Ensure diverse difficulty levels (easy, medium, hard)
+
+{articles}
+
+**YOUR TASK:**
+Return a JSON array (no markdown) with exactly {count} objects, in the same order as the articles. Each object has this structure:
+
+{{
+  "title": "Article Title",
+  "summary": "Brief 2-3 sentence summary of the article",
+  "key_entities": {{"people": [], "organizations": [], "locations": []}},
+  "sections": ["Section 1", "Section 2"],
+  "quiz": [
+    {{
+      "question": "Question text here?",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "answer": "Correct option exactly as written in options",
+      "difficulty": "easy",
+      "explanation": "Brief explanation with reference to article section"
+    }}
+  ],
+  "related_topics": ["Topic 1", "Topic 2", "Topic 3"]
+}}
+
+**REQUIREMENTS:**
+- 5-7 questions per article with varied difficulty
+- Answer must exactly match one of the options
+- 3-5 related topics per article, real Wikipedia article names
+
+Generate ONLY the JSON array, no additional text:"""
+
+PACKED_ARTICLE_BLOCK = """**ARTICLE {number} TITLE:** {title}
+
+**ARTICLE {number} TEXT:**
+{article_text}"""
+
+# Requests, articles and estimated prompt tokens, packed vs. one call per
+# article, since the process started; each batch also keeps its own
+packing_stats: Counter = Counter()
+
+
+class PackItem(NamedTuple):
+    """One article to generate a quiz for"""
+    title: str
+    clean_text: str
+
+
+def is_packable(item: PackItem) -> bool:
+    """Short enough that at least two articles fit in one packed prompt"""
+    return estimate_tokens(item.clean_text) <= settings.LLM_PACK_TOKEN_BUDGET // 2
+
+
+def cached_quiz(item: PackItem) -> Optional[dict]:
+    """Quiz from the LLM output cache, if this article text was generated before"""
+    return llm_outputs.get(output_cache_key(item.clean_text))
+
+
+class PackBins:
+    """
+    First-fit bin packing of article texts under the pack budget, as they arrive.
+
+    A bin is ready as soon as it holds LLM_PACK_MAX_ARTICLES articles or
+    turns an article away for lack of room, so its request can start
+    while later articles are still being fetched; flush() hands over the
+    rest once no more will come.
+    """
+
+    def __init__(self):
+        self._bins: List[list] = []
+        self._loads: List[int] = []
+
+    def add(self, member, item: PackItem) -> List[list]:
+        """Place member (whose article is item); returns the bins this made ready"""
+        tokens = estimate_tokens(item.clean_text)
+        ready = []
+        for number in range(len(self._bins)):
+            if self._loads[number] + tokens <= settings.LLM_PACK_TOKEN_BUDGET:
+                self._bins[number].append(member)
+                self._loads[number] += tokens
+                if len(self._bins[number]) >= settings.LLM_PACK_MAX_ARTICLES:
+                    ready.append(number)
+                break
+            ready.append(number)
+        else:
+            self._bins.append([member])
+            self._loads.append(tokens)
+        return self._take(ready)
+
+    def flush(self) -> List[list]:
+        return self._take(range(len(self._bins)))
+
+    def _take(self, numbers) -> List[list]:
+        numbers = set(numbers)
+        taken = [members for number, members in enumerate(self._bins) if number in numbers]
+        self._bins = [members for number, members in enumerate(self._bins) if number not in numbers]
+        self._loads = [load for number, load in enumerate(self._loads) if number not in numbers]
+        return taken
+
+
+def build_packed_prompt(items: List[PackItem]) -> str:
+    blocks = [
+        PACKED_ARTICLE_BLOCK.format(number=number, title=item.title, article_text=item.clean_text)
+        for number, item in enumerate(items, 1)
+    ]
+    return PACKED_QUIZ_PROMPT.format(count=len(items), articles="\n\n".join(blocks))
+
+
+def parse_packed_response(response_text: str, count: int) -> List[Optional[dict]]:
+    """Validate each quiz in the returned array; None for any that is missing or invalid"""
+    try:
+        quizzes = json.loads(clean_json_response(response_text))
+    except json.JSONDecodeError as je:
+        logger.warning("✗ Packed response is not valid JSON: %s", je)
+        return [None] * count
+    if not isinstance(quizzes, list):
+        logger.warning("✗ Packed response is not a JSON array")
+        return [None] * count
+
+    results: List[Optional[dict]] = []
+    for number in range(count):
+        try:
+            results.append(QuizOutput(**quizzes[number]).model_dump())
+        except Exception as e:
+            logger.warning("✗ Packed quiz %s failed validation: %s", number + 1, str(e)[:200])
+            results.append(None)
+    return results
+
+
+async def generate_packed(
+    items: List[PackItem],
+    stats: Optional[Counter] = None,
+    slots: Optional[asyncio.Semaphore] = None
+) -> List[Tuple[Union[dict, Exception], TokenUsage]]:
+    """
+    Generate quizzes for one pack of articles with a single LLM call.
+
+    Articles whose quiz is missing or invalid (or all of them, if the call
+    fails) are regenerated concurrently with generate_quiz_from_article_async.
+    Each LLM call, packed or fallback, holds one of slots if given (e.g. a
+    batch's LLM pool). Counts go to packing_stats and, if given, to stats
+    (e.g. one batch's totals).
+
+    Returns:
+        Per article, in order: the quiz data (or the exception its fallback
+        generation raised) and its usage, an even share of the packed call
+        plus any fallback call
+    """
+    counters = [packing_stats] if stats is None else [packing_stats, stats]
+    slot = (lambda: slots) if slots is not None else contextlib.nullcontext
+    prompt = build_packed_prompt(items)
+    counts = Counter(
+        packed_requests=1,
+        packed_articles=len(items),
+        packed_prompt_tokens=estimate_tokens(prompt),
+        unpacked_prompt_tokens=sum(
+            estimate_tokens(build_quiz_prompt(item.title, item.clean_text)) for item in items
+        )
+    )
+
+    logger.info("🤖 Generating %s packed quizzes in one request", len(items))
+    pack_usage = TokenUsage()
+    try:
+        async with slot():
+            response_text = await call_llm(prompt, Deadline(settings.LLM_REQUEST_DEADLINE), pack_usage)
+        results = parse_packed_response(response_text, len(items))
+    except Exception as e:
+        logger.warning("✗ Packed request failed: %s", str(e)[:200])
+        results = [None] * len(items)
+
+    async def fall_back(item: PackItem, usage: TokenUsage) -> Union[dict, Exception]:
+        try:
+            async with slot():
+                return await generate_quiz_from_article_async(item.title, item.clean_text, usage)
+        except Exception as e:
+            return e
+
+    usages = [pack_usage.share(len(items)) for _ in items]
+    fallbacks = {}
+    for number, (item, quiz_data) in enumerate(zip(items, results)):
+        if quiz_data is None:
+            counts["fallback_requests"] += 1
+            fallbacks[number] = fall_back(item, usages[number])
+        else:
+            llm_outputs.put(output_cache_key(item.clean_text), quiz_data)
+    for number, quiz_data in zip(fallbacks, await asyncio.gather(*fallbacks.values())):
+        results[number] = quiz_data
+
+    for counter in counters:
+        counter.update(counts)
+    return list(zip(results, usages))
+
+
+def packing_report(stats: Counter = packing_stats) -> dict:
+    """Requests and prompt tokens per article for packed generation (process-wide by default)"""
+    articles = stats["packed_articles"]
+    requests = stats["packed_requests"] + stats["fallback_requests"]
+    return {
+        **stats,
+        "requests_per_article": round(requests / articles, 3) if articles else None,
+        "prompt_tokens_per_article": round(stats["packed_prompt_tokens"] / articles) if articles else None,
+        "unpacked_prompt_tokens_per_article": round(stats["unpacked_prompt_tokens"] / articles) if articles else None,
+    }
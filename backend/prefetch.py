@@ -0,0 +1,275 @@
+"""
+Speculative prefetch of related topics (opt-in with PREFETCH_ENABLED).
+
+After a quiz is generated, its related_topics (Wikipedia article names)
+are queued. A single low-priority worker takes the next topic only while
+the service is otherwise idle: no generations, jobs or LLM calls in
+progress and at least half of the per-minute LLM request budget unused.
+It scrapes the article into a small in-memory cache that prepare_article
+checks before going to Wikipedia, and with PREFETCH_GENERATE also
+generates and saves the topic's quiz. Cached articles keep only the HTML
+a saved quiz stores, and the cache is bounded by count and total bytes.
+
+A running prefetch is cancelled as soon as foreground work shows up, and
+at most PREFETCH_MAX_PER_HOUR topics are started per hour. Prefetched
+entries count as hits when a foreground request uses them before they
+expire, so hit_rate = hits / prefetched.
+
+Everything is per worker process, like the response cache.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Iterable, Optional
+
+from config import settings
+from scraper import (
+    STORED_HTML_CHARS,
+    ScrapedArticle,
+    article_key_from_html,
+    canonical_article_url,
+    normalize_article_title,
+)
+from token_accounting import TokenUsage
+
+logger = logging.getLogger(__name__)
+
+# How often the worker re-checks load while waiting or prefetching (seconds)
+POLL_SECONDS = 0.5
+
+
+class Prefetcher:
+    """Bounded queue of related topics drained by one idle-time worker"""
+
+    def __init__(
+        self,
+        enabled: bool,
+        generate: bool,
+        max_per_hour: int,
+        queue_max: int,
+        cache_size: int,
+        cache_max_bytes: int,
+        ttl_seconds: float
+    ):
+        self.enabled = enabled
+        self.generate = generate
+        self.max_per_hour = max_per_hour
+        self.queue_max = queue_max
+        self.cache_size = cache_size
+        self.cache_max_bytes = cache_max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._queue: "OrderedDict[str, str]" = OrderedDict()  # article key -> URL
+        self._articles: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (ScrapedArticle, stored at, bytes)
+        self._article_bytes = 0
+        self._generated: "OrderedDict[str, float]" = OrderedDict()  # key -> generated at
+        self._started = deque()  # start times within the last hour
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._llm_calls = 0  # LLM calls the prefetcher itself is making or waiting for
+        self.counters = Counter()
+
+    def enqueue_topics(self, topics: Iterable[str]) -> None:
+        """Queue the related topics of a freshly generated quiz"""
+        if not self.enabled:
+            return
+        for topic in topics:
+            key = normalize_article_title(topic)
+            if not key or key in self._queue or key in self._articles or key in self._generated:
+                continue
+            if len(self._queue) >= self.queue_max:
+                self.counters["dropped"] += 1
+                continue
+            self._queue[key] = canonical_article_url(key)
+            self.counters["queued"] += 1
+        if self._queue:
+            self._wakeup.set()
+
+    def take_article(self, article_key: str) -> Optional[ScrapedArticle]:
+        """Prefetched article for a foreground scrape, if one is fresh"""
+        entry = self._articles.pop(article_key, None)
+        if entry is None:
+            return None
+        article, stored_at, size = entry
+        self._article_bytes -= size
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            self.counters["expired"] += 1
+            return None
+        self.counters["article_hits"] += 1
+        logger.debug("✓ Using prefetched article: %s", article_key)
+        return article
+
+    def claim_quiz(self, article_key: str) -> None:
+        """Count a foreground request served by a prefetched quiz"""
+        generated_at = self._generated.pop(article_key, None)
+        if generated_at is None:
+            return
+        if time.monotonic() - generated_at > self.ttl_seconds:
+            self.counters["expired"] += 1
+        else:
+            self.counters["quiz_hits"] += 1
+
+    def _foreground_busy(self) -> bool:
+        from jobs import job_queue
+        from llm_client import llm_manager
+        from singleflight import generation_flights
+
+        foreground_llm = llm_manager.in_flight + llm_manager.waiting - self._llm_calls
+        return (
+            generation_flights.in_flight() > 0
+            or job_queue.depth() > 0
+            or job_queue.running > 0
+            or foreground_llm > 0
+        )
+
+    def _idle(self) -> bool:
+        if self._foreground_busy():
+            return False
+        if self.generate:
+            from llm_client import llm_manager
+
+            bucket = llm_manager.request_bucket
+            return bucket.available() >= bucket.capacity / 2
+        return True
+
+    def _budget_left(self) -> bool:
+        hour_ago = time.monotonic() - 3600
+        while self._started and self._started[0] < hour_ago:
+            self._started.popleft()
+        return len(self._started) < self.max_per_hour
+
+    def _remember(self, store: OrderedDict, key: str, value) -> None:
+        store[key] = value
+        while len(store) > self.cache_size:
+            store.popitem(last=False)
+            self.counters["evicted"] += 1
+
+    def _remember_article(self, key: str, article: ScrapedArticle) -> None:
+        """Cache a scraped article, evicting the oldest past the count or byte limit"""
+        # prepare_article only ever saves the leading HTML
+        article = article._replace(raw_html=article.raw_html[:STORED_HTML_CHARS])
+        size = len(article.clean_text.encode("utf-8")) + len(article.raw_html.encode("utf-8"))
+        if size > self.cache_max_bytes:
+            self.counters["too_large"] += 1
+            return
+        replaced = self._articles.pop(key, None)
+        if replaced is not None:
+            self._article_bytes -= replaced[2]
+        self._articles[key] = (article, time.monotonic(), size)
+        self._article_bytes += size
+        while len(self._articles) > self.cache_size or self._article_bytes > self.cache_max_bytes:
+            _, (_, _, old_size) = self._articles.popitem(last=False)
+            self._article_bytes -= old_size
+            self.counters["evicted"] += 1
+
+    async def _prefetch(self, key: str, url: str) -> None:
+        """Scrape one topic and, if configured, generate and save its quiz"""
+        from sqlalchemy import select
+
+        from database import Quiz, article_key_matches, get_async_session_factory, record_alias
+        from llm_quiz_generator import generate_quiz_from_article_async
+        from quiz_pipeline import PreparedArticle, save_quiz_async, with_session
+        from scraper import scrape_wikipedia_async
+
+        async def has_quiz(article_key: str) -> bool:
+            async with get_async_session_factory()() as db:
+                result = await db.execute(select(Quiz.id).where(article_key_matches(article_key)).limit(1))
+                return result.first() is not None
+
+        if await has_quiz(key):
+            self.counters["skipped_cached"] += 1
+            return
+
+        article = await scrape_wikipedia_async(url)
+        resolved_key = article_key_from_html(article.raw_html) or key
+        if resolved_key != key and await has_quiz(resolved_key):
+            self.counters["skipped_cached"] += 1
+            return
+
+        if not self.generate:
+            self._remember_article(key, article)
+            self.counters["scraped"] += 1
+            logger.debug("✓ Prefetched article: %s", key)
+            return
+
+        usage = TokenUsage()
+        self._llm_calls += 1
+        try:
+            quiz_data = await generate_quiz_from_article_async(article.title, article.clean_text, usage)
+        finally:
+            self._llm_calls -= 1
+
+        if resolved_key != key:
+            await asyncio.to_thread(with_session, record_alias, key, resolved_key)
+        await save_quiz_async(PreparedArticle(article.title, article.clean_text, resolved_key, article), quiz_data, usage)
+        self._remember(self._generated, key, time.monotonic())
+        self.counters["generated"] += 1
+        logger.debug("✓ Prefetched quiz: %s", resolved_key)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if not self._budget_left() or not self._idle():
+                await asyncio.sleep(POLL_SECONDS)
+                continue
+
+            key, url = self._queue.popitem(last=False)
+            self._started.append(time.monotonic())
+            task = asyncio.ensure_future(self._prefetch(key, url))
+            while not task.done():
+                await asyncio.wait({task}, timeout=POLL_SECONDS)
+                if not task.done() and self._foreground_busy():
+                    task.cancel()
+                    self.counters["cancelled"] += 1
+                    logger.debug("→ Cancelled prefetch of %s: foreground load", key)
+                    await asyncio.wait({task})
+
+            if not task.cancelled() and task.exception() is not None:
+                self.counters["failed"] += 1
+                logger.debug("✗ Prefetch of %s failed: %s", key, task.exception())
+
+    def start(self) -> None:
+        if self.enabled and self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+            logger.info("✓ Related-topic prefetch enabled (%s/hour)", self.max_per_hour)
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def hit_rate(self) -> float:
+        prefetched = self.counters["scraped"] + self.counters["generated"]
+        hits = self.counters["article_hits"] + self.counters["quiz_hits"]
+        return round(hits / prefetched, 3) if prefetched else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "generate": self.generate,
+            "queue_depth": self.queue_depth(),
+            "started_last_hour": len(self._started),
+            "max_per_hour": self.max_per_hour,
+            "cached_articles": len(self._articles),
+            "cached_bytes": self._article_bytes,
+            "hit_rate": self.hit_rate(),
+            **self.counters,
+        }
+
+
+prefetcher = Prefetcher(
+    settings.PREFETCH_ENABLED,
+    settings.PREFETCH_GENERATE,
+    settings.PREFETCH_MAX_PER_HOUR,
+    settings.PREFETCH_QUEUE_MAX,
+    settings.PREFETCH_CACHE_SIZE,
+    settings.PREFETCH_CACHE_MAX_BYTES,
+    settings.PREFETCH_TTL_SECONDS
+)
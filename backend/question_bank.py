@@ -0,0 +1,109 @@
+"""
+Quiz assembly from the question bank, without calling the LLM.
+
+Every saved quiz keeps its questions in the questions table (see
+database.question_rows). assemble_quiz() samples a new quiz from the
+questions of one or more articles to match a difficulty mix, spreading
+picks across the articles and skipping repeated question texts.
+"""
+import json
+import random
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+from database import DIFFICULTIES
+
+# Same split QUIZ_GENERATION_PROMPT asks the LLM for
+DEFAULT_DIFFICULTY_MIX = {"easy": 0.4, "medium": 0.4, "hard": 0.2}
+
+
+def difficulty_targets(count: int, mix: Dict[str, float]) -> Dict[str, int]:
+    """
+    Split count across difficulties in proportion to mix.
+
+    Uses largest remainders, so the targets always add up to count.
+    """
+    total = sum(mix.values())
+    shares = {difficulty: count * weight / total for difficulty, weight in mix.items()}
+    targets = {difficulty: int(share) for difficulty, share in shares.items()}
+    leftover = count - sum(targets.values())
+    by_remainder = sorted(shares, key=lambda difficulty: shares[difficulty] - targets[difficulty], reverse=True)
+    for difficulty in by_remainder[:leftover]:
+        targets[difficulty] += 1
+    return targets
+
+
+def _round_robin(groups: List[list], limit: int) -> list:
+    """Take up to limit items, one group at a time"""
+    picked = []
+    while len(picked) < limit and any(groups):
+        for group in groups:
+            if group and len(picked) < limit:
+                picked.append(group.pop())
+    return picked
+
+
+def assemble_quiz(
+    rows: Sequence,
+    count: int,
+    mix: Dict[str, float],
+    seed: Optional[int] = None
+) -> dict:
+    """
+    Sample count questions from question bank rows.
+
+    Args:
+        rows: (article_key, difficulty, text_hash, question_data) rows
+        count: Number of questions wanted
+        mix: Relative weight per difficulty, e.g. DEFAULT_DIFFICULTY_MIX
+        seed: Makes the sample reproducible
+
+    Returns:
+        Questions ordered easy to hard, the counts per difficulty and the
+        shortfall per difficulty that was filled from other difficulties
+    """
+    rng = random.Random(seed)
+
+    # Keep one copy of each question text, grouped by difficulty and article
+    pools = defaultdict(lambda: defaultdict(list))
+    seen = set()
+    for article_key, difficulty, text_hash, question_data in rows:
+        if text_hash in seen:
+            continue
+        seen.add(text_hash)
+        pools[difficulty][article_key].append((article_key, question_data))
+    for by_article in pools.values():
+        for group in by_article.values():
+            rng.shuffle(group)
+
+    def draw(difficulty: str, limit: int) -> list:
+        groups = list(pools[difficulty].values())
+        rng.shuffle(groups)
+        return _round_robin(groups, limit)
+
+    targets = difficulty_targets(count, mix)
+    picked = {difficulty: draw(difficulty, target) for difficulty, target in targets.items()}
+
+    # Too few questions at some difficulty: fill from the others, nearest first
+    shortfall = {d: targets[d] - len(picked[d]) for d in targets if len(picked[d]) < targets[d]}
+    for difficulty, missing in shortfall.items():
+        position = DIFFICULTIES.index(difficulty)
+        for other in sorted(DIFFICULTIES, key=lambda d: abs(DIFFICULTIES.index(d) - position)):
+            if missing == 0:
+                break
+            extra = draw(other, missing)
+            picked.setdefault(other, []).extend(extra)
+            missing -= len(extra)
+
+    questions = []
+    for difficulty in DIFFICULTIES:
+        for article_key, question_data in picked.get(difficulty, []):
+            question = json.loads(question_data)
+            question["article_key"] = article_key
+            questions.append(question)
+
+    return {
+        "quiz": questions,
+        "difficulty_counts": {d: len(picked.get(d, [])) for d in DIFFICULTIES},
+        "shortfall": shortfall,
+    }
@@ -0,0 +1,408 @@
+"""
+Scrape -> LLM -> save pipeline shared by the HTTP handlers and job workers.
+"""
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Callable, List, NamedTuple, Optional, Tuple, TypeVar, Union
+import asyncio
+import json
+import logging
+from datetime import datetime
+
+from database import Quiz, QuizContent, SessionLocal, article_key_matches, question_rows, record_alias
+from scraper import (
+    scrape_wikipedia_async,
+    article_key_from_html,
+    canonical_article_url,
+    ScrapedArticle,
+    STORED_HTML_CHARS,
+)
+from llm_quiz_generator import generate_quiz_from_article_async, stream_quiz_from_article
+from llm_client import LLMCapacityError
+from singleflight import generation_flights
+from response_cache import quiz_responses
+from search_index import quiz_search
+from prefetch import prefetcher
+from token_accounting import TokenUsage
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+StatusCallback = Callable[[str], None]
+
+T = TypeVar("T")
+
+def with_session(function: Callable[..., T], *args) -> T:
+    """
+    Call function(db, *args) with a session of its own.
+    
+    For asyncio.to_thread: sync queries and commits stay off the event
+    loop, and no ORM object crosses threads.
+    """
+    db = SessionLocal()
+    try:
+        return function(db, *args)
+    finally:
+        db.close()
+
+def cached_quiz_response(quiz: Quiz) -> dict:
+    """Response body for a quiz served from the database cache"""
+    quiz_data = json.loads(quiz.full_quiz_data)
+    return {
+        "id": quiz.id,
+        "url": quiz.url,
+        "cached": True,
+        "date_generated": quiz.date_generated.isoformat(),
+        **quiz_data
+    }
+
+def store_article(content: QuizContent, article: ScrapedArticle) -> None:
+    """Copy a freshly scraped article into its side-table row"""
+    content.raw_html = article.raw_html[:STORED_HTML_CHARS]
+    content.article_text = article.clean_text
+    content.etag = article.etag
+    content.last_modified = article.last_modified
+
+def store_usage(quiz: Quiz, usage: Optional[TokenUsage]) -> None:
+    """Record what the generation cost on the quiz row"""
+    if usage is not None:
+        quiz.prompt_tokens = usage.prompt_tokens
+        quiz.output_tokens = usage.output_tokens
+        quiz.generation_ms = usage.latency_ms
+
+class PreparedArticle(NamedTuple):
+    """Article text ready for the LLM, plus what is needed to save the result"""
+    title: str
+    clean_text: str
+    resolved_key: str
+    article: Optional[ScrapedArticle]  # None when the stored text was reused
+
+class StoredArticle(NamedTuple):
+    """Article text and validators kept from an earlier generation"""
+    title: str
+    article_key: str
+    article_text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+def load_stored_article(db: Session, article_key: str) -> Optional[StoredArticle]:
+    """The stored article of a quiz, if it has article text to regenerate from"""
+    quiz = db.query(Quiz).filter(article_key_matches(article_key)).first()
+    if not (quiz and quiz.content and quiz.content.article_text_z):
+        return None
+    content = quiz.content
+    return StoredArticle(quiz.title, quiz.article_key, content.article_text, content.etag, content.last_modified)
+
+def record_redirect(db: Session, alias_key: str, article_key: str, reuse: bool) -> Optional[dict]:
+    """Record the redirect; with reuse, return the target's cached quiz response if it has one"""
+    record_alias(db, alias_key, article_key)
+    if reuse:
+        existing_quiz = db.query(Quiz).filter(Quiz.article_key == article_key).first()
+        if existing_quiz:
+            return cached_quiz_response(existing_quiz)
+    return None
+
+async def prepare_article(
+    url: str,
+    article_key: str,
+    force: bool,
+    notify: StatusCallback
+) -> Union[PreparedArticle, dict]:
+    """
+    Step 1: scrape the article, or reuse the stored text on a forced regeneration.
+    
+    Returns the cached quiz response instead when the URL turns out to be
+    a redirect to an article that already has a quiz. Database reads and
+    writes run in worker threads with their own sessions.
+    """
+    # Forced regeneration starts from the stored article when there is one
+    stored = await asyncio.to_thread(with_session, load_stored_article, article_key) if force else None
+    
+    article = None
+    if stored is None:
+        # Related topic scraped ahead of time by the prefetcher
+        article = prefetcher.take_article(article_key)
+    if article is None and (stored is None or stored.etag or stored.last_modified):
+        # Scrape Wikipedia (conditional GET when validators are stored)
+        notify("scraping")
+        logger.info("→ Scraping Wikipedia: %s", url)
+        try:
+            if stored is not None:
+                article = await scrape_wikipedia_async(
+                    url,
+                    etag=stored.etag,
+                    last_modified=stored.last_modified
+                )
+            else:
+                article = await scrape_wikipedia_async(url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Scraping error: {str(e)}")
+    
+    if article is None:
+        # Unchanged upstream (304) or no validators to check: reuse stored text
+        logger.info("✓ Reusing stored article text for: %s", article_key)
+        return PreparedArticle(stored.title, stored.article_text, stored.article_key, None)
+    
+    logger.info("✓ Scraped: %s (%s characters)", article.title, len(article.clean_text))
+    
+    # Redirect titles resolve to the target article's key
+    resolved_key = article_key_from_html(article.raw_html) or article_key
+    if resolved_key != article_key:
+        existing = await asyncio.to_thread(
+            with_session, record_redirect, article_key, resolved_key, not force
+        )
+        if existing is not None:
+            logger.info("✓ Returning cached quiz for redirect target: %s", resolved_key)
+            return existing
+    
+    return PreparedArticle(article.title, article.clean_text, resolved_key, article)
+
+def save_quiz(
+    db: Session,
+    prepared: PreparedArticle,
+    quiz_data: dict,
+    usage: Optional[TokenUsage] = None
+) -> dict:
+    """Step 3: insert or update the quiz row and return the response body"""
+    try:
+        existing_quiz = db.query(Quiz).filter(Quiz.article_key == prepared.resolved_key).first()
+        if existing_quiz:
+            existing_quiz.full_quiz_data = json.dumps(quiz_data)
+            existing_quiz.questions = question_rows(existing_quiz.article_key, quiz_data)
+            existing_quiz.date_generated = datetime.utcnow()
+            store_usage(existing_quiz, usage)
+            if prepared.article is not None:
+                if existing_quiz.content is None:
+                    existing_quiz.content = QuizContent()
+                store_article(existing_quiz.content, prepared.article)
+            db.commit()
+            quiz_id = existing_quiz.id
+            quiz_url = existing_quiz.url
+            date_generated = existing_quiz.date_generated
+            quiz_responses.invalidate(quiz_id)
+            quiz_search.add_quiz(quiz_id, existing_quiz.title, quiz_data, prepared.clean_text, date_generated)
+            logger.info("✓ Updated quiz ID: %s", quiz_id)
+        else:
+            quiz_url = canonical_article_url(prepared.resolved_key)
+            content = QuizContent()
+            store_article(content, prepared.article)
+            new_quiz = Quiz(
+                url=quiz_url,
+                article_key=prepared.resolved_key,
+                title=prepared.title,
+                full_quiz_data=json.dumps(quiz_data),
+                content=content,
+                questions=question_rows(prepared.resolved_key, quiz_data)
+            )
+            store_usage(new_quiz, usage)
+            db.add(new_quiz)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker process saved this article first; keep its row
+                db.rollback()
+                winner = db.query(Quiz).filter(Quiz.article_key == prepared.resolved_key).first()
+                if not winner:
+                    raise
+                logger.info("✓ Quiz already saved by another worker, ID: %s", winner.id)
+                return cached_quiz_response(winner)
+            db.refresh(new_quiz)
+            quiz_id = new_quiz.id
+            date_generated = new_quiz.date_generated
+            quiz_search.add_quiz(quiz_id, new_quiz.title, quiz_data, prepared.clean_text, date_generated)
+            logger.info("✓ Saved new quiz ID: %s", quiz_id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    return {
+        "id": quiz_id,
+        "url": quiz_url,
+        "cached": False,
+        # The saved value, so this matches what /quiz/{id} and /history return
+        "date_generated": date_generated.isoformat(),
+        **quiz_data
+    }
+
+def save_quizzes(
+    db: Session,
+    results: List[Tuple[PreparedArticle, dict, Optional[TokenUsage]]]
+) -> List[dict]:
+    """
+    Step 3 for many articles: insert or update all quiz rows in one transaction.
+    
+    Existing rows are found with a single IN query. Results that resolve to
+    the same article share one row (the last result wins). Falls back to
+    save_quiz per article if another worker inserted one of them first.
+    
+    Returns:
+        Response bodies in the same order as results
+    """
+    if not results:
+        return []
+    
+    keys = {prepared.resolved_key for prepared, _, _ in results}
+    try:
+        existing = {
+            quiz.article_key: quiz
+            for quiz in db.query(Quiz).filter(Quiz.article_key.in_(keys))
+        }
+        rows = {}
+        for prepared, quiz_data, usage in results:
+            quiz = existing.get(prepared.resolved_key) or rows.get(prepared.resolved_key)
+            if quiz is None:
+                quiz = Quiz(
+                    url=canonical_article_url(prepared.resolved_key),
+                    article_key=prepared.resolved_key,
+                    title=prepared.title,
+                    content=QuizContent()
+                )
+                db.add(quiz)
+            quiz.full_quiz_data = json.dumps(quiz_data)
+            quiz.questions = question_rows(prepared.resolved_key, quiz_data)
+            quiz.date_generated = datetime.utcnow()
+            store_usage(quiz, usage)
+            if prepared.article is not None:
+                if quiz.content is None:
+                    quiz.content = QuizContent()
+                store_article(quiz.content, prepared.article)
+            rows[prepared.resolved_key] = quiz
+        db.commit()
+    except IntegrityError:
+        # Another worker saved one of these articles first; save one by one
+        db.rollback()
+        logger.warning("✗ Bulk save conflicted, saving %s quizzes individually", len(results))
+        return [save_quiz(db, prepared, quiz_data, usage) for prepared, quiz_data, usage in results]
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    for quiz in existing.values():
+        quiz_responses.invalidate(quiz.id)
+    for prepared, quiz_data, _ in results:
+        quiz = rows[prepared.resolved_key]
+        quiz_search.add_quiz(quiz.id, quiz.title, quiz_data, prepared.clean_text, quiz.date_generated)
+    logger.info("✓ Saved %s quizzes in one transaction", len(rows))
+    
+    return [
+        {
+            "id": rows[prepared.resolved_key].id,
+            "url": rows[prepared.resolved_key].url,
+            "cached": False,
+            "date_generated": rows[prepared.resolved_key].date_generated.isoformat(),
+            **quiz_data
+        }
+        for prepared, quiz_data, _ in results
+    ]
+
+async def save_quiz_async(
+    prepared: PreparedArticle,
+    quiz_data: dict,
+    usage: Optional[TokenUsage] = None
+) -> dict:
+    """save_quiz in a worker thread with its own session"""
+    return await asyncio.to_thread(with_session, save_quiz, prepared, quiz_data, usage)
+
+async def save_quizzes_async(results: List[Tuple[PreparedArticle, dict, Optional[TokenUsage]]]) -> List[dict]:
+    """save_quizzes in a worker thread with its own session"""
+    return await asyncio.to_thread(with_session, save_quizzes, results)
+
+async def scrape_generate_and_save(
+    url: str,
+    article_key: str,
+    force: bool,
+    on_status: Optional[StatusCallback] = None
+) -> dict:
+    """
+    Scrape, generate and persist a quiz for one article.
+    
+    Runs inside a single-flight task that may outlive the request that
+    started it. Each database step checks a connection out only for as
+    long as it runs, so none is held while the LLM call runs. on_status,
+    if given, is called with "scraping" and "generating" as the stages start.
+    """
+    notify = on_status or (lambda status: None)
+    prepared = await prepare_article(url, article_key, force, notify)
+    if isinstance(prepared, dict):
+        return prepared
+    
+    # Step 2: Generate quiz with LLM
+    notify("generating")
+    logger.info("→ Generating quiz with %s", settings.LLM_PROVIDER)
+    usage = TokenUsage()
+    try:
+        quiz_data = await generate_quiz_from_article_async(prepared.title, prepared.clean_text, usage)
+        logger.info("✓ Generated %s questions", len(quiz_data['quiz']))
+    except LLMCapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"LLM error: {str(e)}")
+    
+    # Step 3: Save to database
+    saved = await save_quiz_async(prepared, quiz_data, usage)
+    prefetcher.enqueue_topics(quiz_data.get("related_topics", []))
+    return saved
+
+async def stream_generate_and_save(
+    url: str,
+    article_key: str,
+    force: bool,
+    on_status: StatusCallback,
+    on_question: Callable[[dict], None]
+) -> dict:
+    """
+    scrape_generate_and_save with a streamed LLM response.
+    
+    on_question is called with each question as soon as the LLM completes
+    it; the returned saved quiz holds them all.
+    """
+    prepared = await prepare_article(url, article_key, force, on_status)
+    if isinstance(prepared, dict):
+        return prepared
+    
+    on_status("generating")
+    logger.info("→ Streaming quiz with %s", settings.LLM_PROVIDER)
+    usage = TokenUsage()
+    quiz_data = None
+    try:
+        async for kind, payload in stream_quiz_from_article(prepared.title, prepared.clean_text, usage):
+            if kind == "question":
+                on_question(payload)
+            else:
+                quiz_data = payload
+    except LLMCapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"LLM error: {str(e)}")
+    if quiz_data is None:
+        raise HTTPException(status_code=502, detail="LLM stream ended without a complete quiz")
+    logger.info("✓ Generated %s questions", len(quiz_data['quiz']))
+    
+    saved = await save_quiz_async(prepared, quiz_data, usage)
+    prefetcher.enqueue_topics(quiz_data.get("related_topics", []))
+    return saved
+
+async def run_generation(
+    url: str,
+    article_key: str,
+    force: bool,
+    on_status: Optional[StatusCallback] = None,
+    on_question: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """
+    Generate a quiz, sharing the work with any concurrent caller for the same article.
+    
+    Every caller's on_status follows the shared flight, whether it started
+    the flight or joined it. If the caller that starts the flight passes
+    on_question, the LLM response is streamed and questions reach it as
+    they complete; callers that join get the questions with the result.
+    """
+    flight_key = f"{article_key}#force" if force else article_key
+    if on_question is None:
+        work = lambda publish: scrape_generate_and_save(url, article_key, force, publish)
+    else:
+        work = lambda publish: stream_generate_and_save(url, article_key, force, publish, on_question)
+    return await generation_flights.do(flight_key, work, on_status)
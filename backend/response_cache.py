@@ -0,0 +1,82 @@
+"""
+In-process cache of serialized quiz responses.
+
+Quizzes never change after they are generated, so the final JSON bytes
+can be reused until the quiz is regenerated. Entries are keyed by
+(kind, quiz id, date_generated); a regeneration bumps date_generated,
+so stale bodies are never served even before they are evicted.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+from config import settings
+
+
+class ResponseCache:
+    """LRU cache of (body bytes, ETag) bounded by total body size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[bytes, str]]" = OrderedDict()
+        self._size = 0
+        # Saves invalidate entries from worker threads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(kind: str, quiz_id: int, date_generated: datetime) -> tuple:
+        return (kind, quiz_id, date_generated.isoformat())
+
+    def get(self, key: tuple) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, payload: dict) -> Tuple[bytes, str]:
+        """Serialize payload once and remember the bytes"""
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+        if len(body) <= self.max_bytes:
+            with self._lock:
+                self._remove(key)
+                self._entries[key] = (body, etag)
+                self._size += len(body)
+                while self._size > self.max_bytes:
+                    _, (old_body, _) = self._entries.popitem(last=False)
+                    self._size -= len(old_body)
+
+        return body, etag
+
+    def invalidate(self, quiz_id: int) -> None:
+        """Drop every cached body for a quiz"""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == quiz_id]:
+                self._remove(key)
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+quiz_responses = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
@@ -0,0 +1,134 @@
+"""
+Retry policies for LLM calls.
+
+Errors are sorted into classes, each with its own retry budget and
+jittered exponential backoff, and every attempt is bounded by one
+overall per-request deadline.
+"""
+import random
+import re
+import time
+from collections import Counter
+from typing import Optional
+
+from pydantic import ValidationError
+
+
+class MalformedLLMOutput(Exception):
+    """The LLM answered, but not with parseable JSON"""
+
+    def __init__(self, message: str, raw_text: str):
+        super().__init__(message)
+        self.raw_text = raw_text
+
+
+class InvalidQuizSchema(Exception):
+    """The LLM returned JSON that does not match QuizOutput"""
+
+    def __init__(self, message: str, raw_text: str):
+        super().__init__(message)
+        self.raw_text = raw_text
+
+
+class RetryPolicy:
+    """Retry budget and full-jitter exponential backoff for one error class"""
+
+    def __init__(self, max_retries: int, base_delay: float = 1.0, max_delay: float = 10.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, retry_number: int) -> float:
+        """Delay before the given retry (0-based): uniform in [0, base * 2^n], capped"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** retry_number))
+        return random.uniform(0, ceiling)
+
+
+class Deadline:
+    """Overall time budget shared by every attempt of one request"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+# Per-error-class policies; classes not listed are never retried
+RETRY_POLICIES = {
+    "transient": RetryPolicy(max_retries=3, base_delay=1.0, max_delay=8.0),
+    "quota": RetryPolicy(max_retries=2, base_delay=5.0, max_delay=20.0),
+    "malformed_json": RetryPolicy(max_retries=1, base_delay=0.5, max_delay=2.0),
+    "invalid_schema": RetryPolicy(max_retries=1, base_delay=0.5, max_delay=2.0),
+}
+
+# Output problems that get one cheap "repair" call before a full retry
+REPAIRABLE = ("malformed_json", "invalid_schema")
+
+# Retries taken and repairs attempted, by error class
+retry_counters: Counter = Counter()
+
+QUOTA_STATUSES = (429,)
+TRANSIENT_STATUSES = (500, 502, 503, 504)
+
+# Fallback for errors without a status; status codes only as whole words,
+# so "500" does not match e.g. "max_tokens=1500"
+QUOTA_PATTERN = re.compile(r"\b429\b|quota|RESOURCE_EXHAUSTED", re.IGNORECASE)
+TRANSIENT_PATTERN = re.compile(r"\b50[0234]\b|timeout|timed out|temporarily|unavailable", re.IGNORECASE)
+
+
+def http_status(error: Exception) -> Optional[int]:
+    """HTTP status carried by SDK / httpx errors, if any"""
+    response = getattr(error, "response", None)
+    for status in (getattr(error, "status_code", None), getattr(error, "code", None), getattr(response, "status_code", None)):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def classify_error(error: Exception) -> str:
+    """Map an exception from an LLM attempt to a retry class"""
+    if isinstance(error, MalformedLLMOutput):
+        return "malformed_json"
+    if isinstance(error, (InvalidQuizSchema, ValidationError)):
+        return "invalid_schema"
+
+    # Imported here to keep retry.py free of the SDK import chain
+    from llm_client import LLMCapacityError
+    if isinstance(error, LLMCapacityError):
+        return "capacity"
+
+    if isinstance(error, TimeoutError):
+        return "transient"
+
+    status = http_status(error)
+    if status is not None:
+        if status in QUOTA_STATUSES:
+            return "quota"
+        return "transient" if status in TRANSIENT_STATUSES else "fatal"
+
+    error_msg = str(error)
+    if QUOTA_PATTERN.search(error_msg):
+        return "quota"
+    if TRANSIENT_PATTERN.search(error_msg):
+        return "transient"
+    return "fatal"
+
+
+def next_delay(error_class: str, retries_taken: int, deadline: Deadline) -> Optional[float]:
+    """
+    Backoff before the next retry of this class, or None to give up.
+
+    Gives up when the class has no policy, its budget is spent, or the
+    backoff would run past the request deadline.
+    """
+    policy = RETRY_POLICIES.get(error_class)
+    if policy is None or retries_taken >= policy.max_retries:
+        return None
+    delay = policy.backoff(retries_taken)
+    if delay >= deadline.remaining():
+        return None
+    return delay
@@ -1,7 +1,107 @@
-import requests
-from bs4 import BeautifulSoup
-from typing import Tuple, Optional
+import asyncio
+import importlib.util
+from typing import TYPE_CHECKING, Iterator, NamedTuple, Tuple, Optional
 import re
+from urllib.parse import quote, unquote, urlsplit
+
+from config import settings
+from metrics import SCRAPE_FETCH_SECONDS, SCRAPE_PARSE_SECONDS
+from token_budget import char_budget
+
+# HTTP clients and HTML parsers are imported on first use to keep cold
+# starts fast; only their availability is checked here
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+LXML_AVAILABLE = importlib.util.find_spec('lxml') is not None
+
+# Only advertise brotli when urllib3/httpx can decode it
+if importlib.util.find_spec('brotli') is not None:
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+else:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+WIKIPEDIA_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Educational Quiz Generator Bot)',
+    'Accept-Encoding': ACCEPT_ENCODING
+}
+FETCH_TIMEOUT = 10
+POOL_CONNECTIONS = 10
+
+class FetchResult(NamedTuple):
+    """Downloaded page plus the validators needed for a conditional GET"""
+    html: Optional[str]  # None when the server answered 304 Not Modified
+    etag: Optional[str]
+    last_modified: Optional[str]
+    
+    @property
+    def not_modified(self) -> bool:
+        return self.html is None
+
+# Leading characters of page HTML kept with a saved quiz (and by the prefetch cache)
+STORED_HTML_CHARS = 50000
+
+class ScrapedArticle(NamedTuple):
+    title: str
+    clean_text: str
+    raw_html: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+# Shared keep-alive clients, created on first use
+_session: Optional["requests.Session"] = None
+_async_client: Optional["httpx.AsyncClient"] = None
+
+def get_session() -> "requests.Session":
+    """Pooled requests session for blocking fetches"""
+    global _session
+    if _session is None:
+        import requests
+        import requests.adapters
+        
+        _session = requests.Session()
+        _session.headers.update(WIKIPEDIA_HEADERS)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_CONNECTIONS
+        )
+        _session.mount('https://', adapter)
+    return _session
+
+def get_async_client() -> "httpx.AsyncClient":
+    """Pooled httpx client for non-blocking fetches"""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        import httpx
+        
+        _async_client = httpx.AsyncClient(
+            headers=WIKIPEDIA_HEADERS,
+            timeout=FETCH_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=POOL_CONNECTIONS,
+                max_keepalive_connections=POOL_CONNECTIONS
+            )
+        )
+    return _async_client
+
+async def close_http_clients() -> None:
+    """Close the shared clients (called on application shutdown)"""
+    global _session, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _session is not None:
+        _session.close()
+        _session = None
+
+def _conditional_headers(etag: Optional[str], last_modified: Optional[str]) -> dict:
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
 
 def clean_text(text: str) -> str:
     """Remove extra whitespace and normalize text"""
@@ -11,39 +111,129 @@ def clean_text(text: str) -> str:
     text = re.sub(r'\[\d+\]', '', text)
     return text.strip()
 
-def scrape_wikipedia(url: str) -> Tuple[str, str, str]:
+def _check_article_url(url: str) -> None:
+    """Reject anything that is not an English Wikipedia article URL"""
+    if not url.startswith('https://en.wikipedia.org/wiki/'):
+        raise ValueError("Invalid Wikipedia URL. Must be an English Wikipedia article.")
+
+def fetch_wikipedia_html(
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None
+) -> FetchResult:
     """
-    Scrape Wikipedia article and extract clean content.
+    Download the raw HTML of a Wikipedia article (blocking).
+    
+    When validators from an earlier fetch are given, the request is
+    conditional and an unchanged page comes back as not_modified.
     
-    Args:
-        url: Wikipedia article URL
-        
-    Returns:
-        Tuple of (title, clean_text, raw_html)
-        
     Raises:
-        ValueError: If URL is invalid or article not found
-        requests.RequestException: If network error occurs
+        ValueError: If URL is invalid or the request fails
     """
-    # Validate Wikipedia URL
-    if not url.startswith('https://en.wikipedia.org/wiki/'):
-        raise ValueError("Invalid Wikipedia URL. Must be an English Wikipedia article.")
+    _check_article_url(url)
+    import requests
     
     try:
-        # Fetch the page with timeout
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Educational Quiz Generator Bot)'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        with SCRAPE_FETCH_SECONDS.time():
+            response = get_session().get(
+                url,
+                headers=_conditional_headers(etag, last_modified),
+                timeout=FETCH_TIMEOUT
+            )
+        if response.status_code == 304:
+            return FetchResult(None, etag, last_modified)
         response.raise_for_status()
-        
     except requests.Timeout:
         raise ValueError("Request timed out. Wikipedia might be slow or unreachable.")
     except requests.RequestException as e:
         raise ValueError(f"Failed to fetch article: {str(e)}")
     
+    return FetchResult(
+        response.text,
+        response.headers.get('ETag'),
+        response.headers.get('Last-Modified')
+    )
+
+async def fetch_wikipedia_html_async(
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None
+) -> FetchResult:
+    """
+    Download the raw HTML of a Wikipedia article without blocking the event loop.
+    
+    Raises:
+        ValueError: If URL is invalid or the request fails
+    """
+    _check_article_url(url)
+    import httpx
+    
+    try:
+        with SCRAPE_FETCH_SECONDS.time():
+            response = await get_async_client().get(
+                url,
+                headers=_conditional_headers(etag, last_modified)
+            )
+        if response.status_code == 304:
+            return FetchResult(None, etag, last_modified)
+        response.raise_for_status()
+    except httpx.TimeoutException:
+        raise ValueError("Request timed out. Wikipedia might be slow or unreachable.")
+    except httpx.HTTPError as e:
+        raise ValueError(f"Failed to fetch article: {str(e)}")
+    
+    return FetchResult(
+        response.text,
+        response.headers.get('ETag'),
+        response.headers.get('Last-Modified')
+    )
+
+REFERENCE_SECTION_TERMS = ['references', 'external links', 'see also', 'notes']
+STRIPPED_TAGS = ['sup', 'table', 'style', 'script']
+
+def _assemble_article(paragraph_texts: Iterator[str], token_budget: Optional[int] = None) -> str:
+    """
+    Join substantial paragraphs until the article token budget is spent.
+    
+    Consumes paragraph_texts lazily and stops at the first paragraph that
+    does not fit, so backends never extract text that would be cut off.
+    The last paragraph is trimmed at a word boundary and marked with "...".
+    """
+    max_chars = char_budget(token_budget)
+    content_parts = []
+    used = 0
+    
+    for text in paragraph_texts:
+        if len(text.strip()) <= 50:  # Only substantial paragraphs
+            continue
+        part = clean_text(text)
+        separator = 2 if content_parts else 0  # '\n\n' between paragraphs
+        
+        if used + separator + len(part) <= max_chars:
+            content_parts.append(part)
+            used += separator + len(part)
+            continue
+        
+        remaining = max_chars - used - separator - len("...")
+        cut = part[:remaining].rsplit(' ', 1)[0].rstrip() if remaining > 0 else ''
+        if cut:
+            content_parts.append(cut + "...")
+        elif content_parts:
+            content_parts[-1] += "..."
+        break
+    
+    if not content_parts:
+        raise ValueError("No substantial content found in article.")
+    
+    # Join paragraphs with proper spacing
+    return '\n\n'.join(content_parts)
+
+def _parse_with_bs4(html: str) -> Tuple[str, str]:
+    """Reference extractor: full BeautifulSoup tree with html.parser"""
+    from bs4 import BeautifulSoup
+    
     # Parse HTML
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(html, 'html.parser')
     
     # Extract title
     title_element = soup.find('h1', {'id': 'firstHeading'})
@@ -58,13 +248,13 @@ def scrape_wikipedia(url: str) -> Tuple[str, str, str]:
         raise ValueError("Could not find article content. Page structure may have changed.")
     
     # Remove unwanted elements
-    for element in content_div.find_all(['sup', 'table', 'style', 'script']):
+    for element in content_div.find_all(STRIPPED_TAGS):
         element.decompose()
     
     # Remove reference sections
     for heading in content_div.find_all(['h2', 'h3']):
         heading_text = heading.get_text().lower()
-        if any(term in heading_text for term in ['references', 'external links', 'see also', 'notes']):
+        if any(term in heading_text for term in REFERENCE_SECTION_TERMS):
             # Remove this section and everything after it
             for sibling in list(heading.next_siblings):
                 if sibling.name and sibling.name.startswith('h'):
@@ -74,26 +264,134 @@ def scrape_wikipedia(url: str) -> Tuple[str, str, str]:
             heading.decompose()
     
     # Extract paragraphs
-    paragraphs = content_div.find_all('p')
-    content_parts = []
+    paragraphs = (p.get_text() for p in content_div.find_all('p'))
+    return title, _assemble_article(paragraphs)
+
+def _parse_with_lxml(html: str) -> Tuple[str, str]:
+    """
+    Fast extractor built on lxml's C parser.
     
-    for p in paragraphs:
-        text = p.get_text()
-        if len(text.strip()) > 50:  # Only substantial paragraphs
-            content_parts.append(clean_text(text))
+    Mirrors _parse_with_bs4 step for step (drop_tree keeps the tail text
+    that decompose keeps) and pulls paragraph text lazily.
+    """
+    import lxml.etree
+    import lxml.html
     
-    if not content_parts:
-        raise ValueError("No substantial content found in article.")
+    try:
+        document = lxml.html.document_fromstring(html)
+    except (lxml.etree.ParserError, ValueError):
+        raise ValueError("Could not find article title. Invalid Wikipedia page.")
     
-    # Join paragraphs with proper spacing
-    clean_content = '\n\n'.join(content_parts)
+    # Extract title
+    title_elements = document.xpath('//h1[@id="firstHeading"]')
+    if not title_elements:
+        raise ValueError("Could not find article title. Invalid Wikipedia page.")
     
-    # Limit content length to avoid token limits (roughly 3000 words)
-    words = clean_content.split()
-    if len(words) > 3000:
-        clean_content = ' '.join(words[:3000]) + "..."
+    title = ''.join(title_elements[0].itertext()).strip()
     
-    return title, clean_content, response.text
+    # Find main content div
+    content_divs = document.xpath('//div[@id="mw-content-text"]')
+    if not content_divs:
+        raise ValueError("Could not find article content. Page structure may have changed.")
+    content_div = content_divs[0]
+    
+    # Remove unwanted elements
+    for element in content_div.xpath(' | '.join(f'.//{tag}' for tag in STRIPPED_TAGS)):
+        element.drop_tree()
+    
+    # Remove reference sections
+    for heading in content_div.xpath('.//h2 | .//h3'):
+        if not _is_attached(heading, content_div):
+            continue  # Already removed along with an earlier section
+        heading_text = ''.join(heading.itertext()).lower()
+        if any(term in heading_text for term in REFERENCE_SECTION_TERMS):
+            # Remove this section and everything after it
+            for sibling in list(heading.itersiblings()):
+                if not isinstance(sibling.tag, str):
+                    continue  # Comments and processing instructions
+                if sibling.tag.lower().startswith('h'):
+                    break
+                sibling.drop_tree()
+            heading.drop_tree()
+    
+    # Extract paragraphs
+    paragraphs = (''.join(p.itertext()) for p in content_div.iter('p'))
+    return title, _assemble_article(paragraphs)
+
+def _is_attached(element, root) -> bool:
+    """True if element is still inside root's subtree"""
+    for ancestor in element.iterancestors():
+        if ancestor is root:
+            return True
+    return False
+
+EXTRACTION_BACKENDS = {
+    'bs4': _parse_with_bs4,
+    'lxml': _parse_with_lxml,
+}
+
+def _default_backend() -> str:
+    backend = settings.SCRAPER_BACKEND
+    if backend == 'lxml' and not LXML_AVAILABLE:
+        return 'bs4'
+    return backend
+
+def parse_wikipedia_html(html: str, backend: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Extract the title and cleaned article text from Wikipedia HTML.
+    
+    Args:
+        html: Raw article HTML
+        backend: 'lxml' or 'bs4' (defaults to settings.SCRAPER_BACKEND)
+    
+    Returns:
+        Tuple of (title, clean_text)
+        
+    Raises:
+        ValueError: If the page does not look like a Wikipedia article
+    """
+    backend = backend or _default_backend()
+    with SCRAPE_PARSE_SECONDS.time(backend=backend):
+        return EXTRACTION_BACKENDS[backend](html)
+
+def scrape_wikipedia(url: str) -> Tuple[str, str, str]:
+    """
+    Scrape Wikipedia article and extract clean content.
+    
+    Args:
+        url: Wikipedia article URL
+        
+    Returns:
+        Tuple of (title, clean_text, raw_html)
+        
+    Raises:
+        ValueError: If URL is invalid, article not found or network error occurs
+    """
+    html = fetch_wikipedia_html(url).html
+    title, clean_content = parse_wikipedia_html(html)
+    return title, clean_content, html
+
+async def scrape_wikipedia_async(
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None
+) -> Optional[ScrapedArticle]:
+    """
+    Async variant of scrape_wikipedia.
+    
+    The download uses a non-blocking HTTP client and the CPU-bound HTML
+    parsing runs in a worker thread, so the event loop stays responsive.
+    
+    Returns:
+        ScrapedArticle, or None if the validators show the page is unchanged
+        (nothing is downloaded or parsed in that case)
+    """
+    fetched = await fetch_wikipedia_html_async(url, etag, last_modified)
+    if fetched.not_modified:
+        return None
+    
+    title, clean_content = await asyncio.to_thread(parse_wikipedia_html, fetched.html)
+    return ScrapedArticle(title, clean_content, fetched.html, fetched.etag, fetched.last_modified)
 
 def validate_wikipedia_url(url: str) -> bool:
     """Quick validation of Wikipedia URL format"""
@@ -102,3 +400,44 @@ def validate_wikipedia_url(url: str) -> bool:
     if ':' in url.split('/wiki/')[-1]:
         return False
     return bool(re.match(pattern, url))
+
+WIKIPEDIA_ARTICLE_PREFIX = 'https://en.wikipedia.org/wiki/'
+CANONICAL_LINK_PATTERN = re.compile(
+    r'<link\s+rel="canonical"\s+href="(?:https?:)?//en\.wikipedia\.org/wiki/([^"#?]+)"'
+)
+
+def normalize_article_title(title: str) -> str:
+    """
+    Normalize a Wikipedia title the way MediaWiki does.
+    
+    Percent-encoding is decoded, spaces become underscores, runs of
+    underscores collapse and the first letter is upper-cased.
+    """
+    title = unquote(title).replace(' ', '_')
+    title = re.sub(r'_+', '_', title).strip('_')
+    if title:
+        title = title[0].upper() + title[1:]
+    return title
+
+def article_key_from_url(url: str) -> str:
+    """
+    Stable cache key for an article URL.
+    
+    Drops the fragment (#History) and query string (?oldid=...) and
+    normalizes the title, so every spelling of the same article maps to
+    one key. Redirects are resolved separately from the fetched page.
+    """
+    path = urlsplit(url).path
+    title = path.split('/wiki/', 1)[-1]
+    return normalize_article_title(title)
+
+def article_key_from_html(html: str) -> Optional[str]:
+    """Resolved article key from the page's canonical link, if present"""
+    match = CANONICAL_LINK_PATTERN.search(html)
+    if not match:
+        return None
+    return normalize_article_title(match.group(1))
+
+def canonical_article_url(article_key: str) -> str:
+    """Article URL for a normalized key"""
+    return WIKIPEDIA_ARTICLE_PREFIX + quote(article_key, safe="_()',-.!")
@@ -0,0 +1,367 @@
+"""
+In-process full-text index over generated quizzes.
+
+Covers the title, summary, key entities, question text and the start of
+the cleaned article text, each with its own weight. Queries are ranked
+with BM25 and the last query term also matches as a prefix, so results
+update while the user types.
+
+The article text is stored zlib-compressed, which rules out MySQL
+FULLTEXT / SQLite FTS5, so the index lives in memory: built from the
+database in the background at startup, updated in place whenever a quiz
+is saved, and caught up from the database periodically to pick up rows
+saved by other worker processes.
+
+Each worker process builds its own copy from the database at startup, so
+memory and the startup read scale with the worker count;
+SEARCH_INDEX_ON_STARTUP=False defers the build to the first search.
+
+Postings are compact arrays of (slot, weighted term frequency). Re-indexing
+a quiz gives it a new slot and leaves the old postings behind as
+tombstones, which are dropped by compaction once they pile up. Arrays are
+only ever appended to while in use, so searches score against a snapshot
+taken under the lock, and compaction rebuilds them in a background thread
+and swaps the result in, without holding the lock while they run.
+"""
+import json
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from heapq import nlargest
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has he in is it its of on or that the to was were will with".split()
+)
+
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "entities": 2.0,
+    "summary": 1.5,
+    "questions": 1.0,
+    "article": 0.5,
+}
+
+# Prefix expansions considered for the last query term
+MAX_PREFIX_TERMS = 50
+PREFIX_WEIGHT = 0.8
+
+SYNC_OVERLAP_SECONDS = 60
+
+# Compaction copies postings added while it ran outside the lock until at
+# most this many terms are left, then finishes under the lock
+COMPACTION_LOCKED_TERMS = 1000
+COMPACTION_CATCH_UP_ROUNDS = 5
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def quiz_fields(title: str, quiz_data: dict, article_text: Optional[str]) -> Dict[str, str]:
+    """Searchable text of one quiz, by field"""
+    entities = quiz_data.get("key_entities") or {}
+    return {
+        "title": title,
+        "entities": " ".join(
+            name for group in ("people", "organizations", "locations") for name in entities.get(group, [])
+        ),
+        "summary": quiz_data.get("summary", ""),
+        "questions": " ".join(question.get("question", "") for question in quiz_data.get("quiz", [])),
+        "article": (article_text or "")[:settings.SEARCH_ARTICLE_CHARS],
+    }
+
+
+class SearchIndex:
+    """Inverted index with BM25 ranking and tombstoned incremental updates"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._terms: List[str] = []  # sorted vocabulary for prefix lookups
+        self._slot_doc = array("i")  # slot -> quiz id
+        self._slot_len = array("f")  # slot -> weighted document length
+        self._slot_terms = array("i")  # slot -> number of postings
+        self._slot_live = bytearray()  # slot -> 1 while it is the quiz's current version
+        self._live: Dict[int, int] = {}  # quiz id -> current slot
+        self._versions: Dict[int, datetime] = {}  # quiz id -> date_generated indexed
+        self._total_len = 0.0
+        self._dead_postings = 0
+        self._live_postings = 0
+        self._touched: Optional[set] = None  # terms added to while a compaction runs
+        self.ready = False
+        self.watermark: Optional[datetime] = None
+        self.last_refresh = 0.0
+        self.queries = 0
+
+    def add(self, quiz_id: int, fields: Dict[str, str], version: Optional[datetime] = None) -> None:
+        """Index a quiz, replacing any earlier version of it"""
+        frequencies: Dict[str, float] = {}
+        length = 0.0
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+                length += weight
+
+        with self._lock:
+            self._remove_locked(quiz_id)
+            slot = len(self._slot_doc)
+            self._slot_doc.append(quiz_id)
+            self._slot_len.append(length)
+            self._slot_terms.append(len(frequencies))
+            self._slot_live.append(1)
+            self._live[quiz_id] = slot
+            if version is not None:
+                self._versions[quiz_id] = version
+            self._total_len += length
+            for term, frequency in frequencies.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("i"), array("f"))
+                    insort(self._terms, term)
+                postings[0].append(slot)
+                postings[1].append(frequency)
+            self._live_postings += len(frequencies)
+            if self._touched is not None:
+                self._touched.update(frequencies)
+            elif self._dead_postings > max(self._live_postings // 2, 1000):
+                self._touched = set()
+                threading.Thread(target=self.compact, name="search-compaction", daemon=True).start()
+
+    def remove(self, quiz_id: int) -> None:
+        with self._lock:
+            self._remove_locked(quiz_id)
+
+    def _remove_locked(self, quiz_id: int) -> None:
+        slot = self._live.pop(quiz_id, None)
+        self._versions.pop(quiz_id, None)
+        if slot is None:
+            return
+        self._slot_live[slot] = 0
+        self._total_len -= self._slot_len[slot]
+        self._dead_postings += self._slot_terms[slot]
+        self._live_postings -= self._slot_terms[slot]
+
+    def compact(self) -> None:
+        """
+        Drop tombstoned postings and terms only they used.
+
+        The compacted arrays are built from a snapshot without the lock,
+        then caught up with postings added meanwhile; only the last
+        catch-up and the swap hold it.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            if self._touched is None:
+                self._touched = set()
+            postings = dict(self._postings)
+
+        # Slots only ever go from live to dead, so anything dropped here stays
+        # dropped. Frequencies are appended after slots, so their length counts
+        # complete postings; merged keeps how far each term has been copied
+        live_slots = self._slot_live
+        compacted: Dict[str, Tuple[array, array]] = {}
+        merged: Dict[str, int] = {}
+        dropped = 0
+        for term, (slots, frequencies) in postings.items():
+            length = merged[term] = len(frequencies)
+            keep = [i for i in range(length) if live_slots[slots[i]]]
+            dropped += length - len(keep)
+            if keep:
+                compacted[term] = (
+                    array("i", (slots[i] for i in keep)),
+                    array("f", (frequencies[i] for i in keep)),
+                )
+        terms = sorted(compacted)
+
+        for rounds in range(1, COMPACTION_CATCH_UP_ROUNDS + 1):
+            with self._lock:
+                touched, self._touched = self._touched, set()
+                if len(touched) <= COMPACTION_LOCKED_TERMS or rounds == COMPACTION_CATCH_UP_ROUNDS:
+                    self._merge_tails(compacted, terms, merged, touched)
+                    self._postings = compacted
+                    self._terms = terms
+                    self._dead_postings -= dropped
+                    self._touched = None
+                    break
+            self._merge_tails(compacted, terms, merged, touched)
+        # Free the old arrays one term at a time; one dealloc of all of them holds the GIL
+        while postings:
+            postings.popitem()
+        logger.info("✓ Compacted search index in %.2fs", time.perf_counter() - started)
+
+    def _merge_tails(
+        self,
+        compacted: Dict[str, Tuple[array, array]],
+        terms: List[str],
+        merged: Dict[str, int],
+        touched: set
+    ) -> None:
+        """Copy postings added to touched terms since they were last merged"""
+        for term in touched:
+            slots, frequencies = self._postings[term]
+            start = merged.get(term, 0)
+            end = merged[term] = len(frequencies)
+            if end == start:
+                continue
+            if term in compacted:
+                compacted[term][0].extend(slots[start:end])
+                compacted[term][1].extend(frequencies[start:end])
+            else:
+                compacted[term] = (array("i", slots[start:end]), array("f", frequencies[start:end]))
+                insort(terms, term)
+
+    def _expand(self, term: str) -> List[str]:
+        """Indexed terms starting with term (including itself)"""
+        start = bisect_left(self._terms, term)
+        matches = []
+        for candidate in self._terms[start:start + MAX_PREFIX_TERMS]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[int, float]]:
+        """Top (quiz id, score) pairs for query, best first"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        self.queries += 1
+        with self._lock:
+            documents = len(self._live)
+            if not documents:
+                return []
+            average_length = self._total_len / documents
+
+            # Exact terms count fully; prefix expansions of the last one slightly less
+            weighted_terms: Dict[str, float] = {term: 1.0 for term in terms}
+            for expansion in self._expand(terms[-1]):
+                weighted_terms.setdefault(expansion, PREFIX_WEIGHT)
+            # Posting arrays and their current lengths; later appends are not scored
+            matched = [
+                (term_weight, postings, len(postings[0]))
+                for term, term_weight in weighted_terms.items()
+                if (postings := self._postings.get(term)) is not None
+            ]
+
+        # Per-slot BM25 length normalisation is base + scale * length
+        k1 = self.k1
+        base = k1 * (1 - self.b)
+        scale = k1 * self.b / average_length
+        slot_len = self._slot_len
+        slot_live = self._slot_live
+        scores: Dict[int, float] = {}
+        for term_weight, (slots, frequencies), length in matched:
+            # Tombstones inflate df slightly until the next compaction
+            df = min(length, documents)
+            boost = term_weight * math.log(1 + (documents - df + 0.5) / (df + 0.5)) * (k1 + 1)
+            for slot, frequency in islice(zip(slots, frequencies), length):
+                if slot_live[slot]:
+                    scores[slot] = scores.get(slot, 0.0) + boost * frequency / (frequency + base + scale * slot_len[slot])
+
+        top = nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self._slot_doc[slot], score) for slot, score in top]
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "documents": len(self._live),
+            "terms": len(self._postings),
+            "live_postings": self._live_postings,
+            "dead_postings": self._dead_postings,
+            "queries": self.queries,
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+        }
+
+    def add_quiz(
+        self,
+        quiz_id: int,
+        title: str,
+        quiz_data: dict,
+        article_text: Optional[str],
+        version: Optional[datetime] = None
+    ) -> None:
+        """Index a saved quiz; version is its date_generated"""
+        self.add(quiz_id, quiz_fields(title, quiz_data, article_text), version)
+
+    def sync_from_db(self, batch_size: int = 500) -> int:
+        """
+        Index every quiz saved since the watermark (all of them on first run).
+
+        Blocking; run it in a thread. Returns the number of quizzes indexed,
+        or 0 if another sync is already running.
+        """
+        from database import Quiz, QuizContent, SessionLocal, _decompress
+
+        if not self._sync_lock.acquire(blocking=False):
+            return 0
+        since = self.watermark
+        # Rows are stamped before their transaction commits; the overlap
+        # re-reads anything that committed late, at the cost of re-indexing it
+        started = datetime.utcnow() - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        indexed = 0
+        last_id = 0
+        db = SessionLocal()
+        try:
+            while True:
+                query = (
+                    db.query(
+                        Quiz.id,
+                        Quiz.title,
+                        Quiz.full_quiz_data,
+                        Quiz.date_generated,
+                        QuizContent.article_text_z,
+                    )
+                    .outerjoin(QuizContent, QuizContent.quiz_id == Quiz.id)
+                    .filter(Quiz.id > last_id)
+                )
+                if since is not None:
+                    query = query.filter(Quiz.date_generated >= since)
+                rows = query.order_by(Quiz.id).limit(batch_size).all()
+                if not rows:
+                    break
+                for quiz_id, title, full_quiz_data, date_generated, article_text_z in rows:
+                    # Already indexed by this worker when it saved the quiz
+                    if date_generated is not None and self._versions.get(quiz_id) == date_generated:
+                        continue
+                    try:
+                        quiz_data = json.loads(full_quiz_data)
+                    except (TypeError, json.JSONDecodeError):
+                        continue
+                    article_text = _decompress(article_text_z) if article_text_z is not None else None
+                    self.add_quiz(quiz_id, title, quiz_data, article_text, date_generated)
+                    indexed += 1
+                last_id = rows[-1].id
+        finally:
+            db.close()
+            self.last_refresh = time.monotonic()
+            self._sync_lock.release()
+
+        self.watermark = started
+        self.ready = True
+        return indexed
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.last_refresh > settings.SEARCH_REFRESH_SECONDS
+
+
+quiz_search = SearchIndex()
@@ -0,0 +1,98 @@
+"""
+Single-flight coalescing for expensive async work.
+
+Concurrent callers that ask for the same key share one in-flight task
+instead of each running their own copy (e.g. one scrape + one Gemini
+call per article, no matter how many requests arrive at once). Progress
+the task publishes reaches every caller, including ones that join late.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[str], None]
+
+
+class _Flight:
+    """One in-flight task, the callers listening to it and its latest status"""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Future] = None
+        self.listeners: List[Listener] = []
+        self.status: Optional[str] = None
+
+    def publish(self, status: str) -> None:
+        self.status = status
+        for listener in list(self.listeners):
+            try:
+                listener(status)
+            except Exception as e:
+                logger.warning("✗ Flight status listener failed: %s", e)
+
+
+class SingleFlight:
+    """Run at most one task per key at a time and share its result"""
+
+    def __init__(self):
+        self._inflight: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[Listener], Awaitable[Any]],
+        on_status: Optional[Listener] = None
+    ) -> Any:
+        """
+        Await fn(publish) for this key, joining an existing flight if one is running.
+
+        Every status fn passes to publish goes to the on_status of each
+        caller still waiting; a caller that joins late first gets the
+        latest one. The shared task is shielded so a caller that
+        disconnects does not cancel the work for everyone else waiting on it.
+        """
+        self.calls += 1
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.executions += 1
+            flight = _Flight()
+            self._inflight[key] = flight
+            flight.task = asyncio.ensure_future(fn(flight.publish))
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+        else:
+            self.coalesced += 1
+            logger.debug("⇄ Joining in-flight generation for: %s", key)
+            if on_status is not None and flight.status is not None:
+                on_status(flight.status)
+
+        if on_status is None:
+            return await asyncio.shield(flight.task)
+        flight.listeners.append(on_status)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.listeners.remove(on_status)
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight(),
+        }
+
+
+# Shared by the generate endpoint
+generation_flights = SingleFlight()
@@ -0,0 +1,67 @@
+"""
+Shared test setup: a throwaway SQLite database, the fake LLM provider and
+a local Wikipedia stand-in, so the suite runs offline.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Settings are read at import, so the environment is fixed before any app module loads
+_DATA_DIR = tempfile.mkdtemp(prefix="quiz-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_DATA_DIR}/test.db",
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "FAKE_LLM_JITTER_MS": "0",
+    "FAKE_LLM_FAILURE_RATE": "0",
+    "FAKE_LLM_QUOTA_RATE": "0",
+    "FAKE_LLM_MALFORMED_RATE": "0",
+    "LLM_REQUESTS_PER_MINUTE": "10000",
+    "LLM_CACHE_ENABLED": "False",
+    "LOG_LEVEL": "WARNING",
+})
+
+
+@pytest.fixture
+def wiki(monkeypatch):
+    """Running WikiStandIn with the scraper's HTTP clients routed to it"""
+    import scraper
+    from wiki_standin import WikiStandIn, route_scraper
+
+    # route_scraper swaps these module functions; monkeypatch puts them back
+    monkeypatch.setattr(scraper, "get_session", scraper.get_session)
+    monkeypatch.setattr(scraper, "get_async_client", scraper.get_async_client)
+    monkeypatch.setattr(scraper, "_session", None)
+    monkeypatch.setattr(scraper, "_async_client", None)
+    with WikiStandIn() as standin:
+        route_scraper(standin.origin)
+        yield standin
+        if scraper._session is not None:
+            scraper._session.close()
+
+
+@pytest.fixture
+def client(wiki):
+    """TestClient for main.app once the background database setup is done"""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        while not test_client.get("/health").json().get("database_ready"):
+            pass
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Tables of the test database, created once"""
+    from database import init_db
+
+    init_db()
@@ -0,0 +1,86 @@
+"""Conditional GETs: against the local Wikipedia stand-in, and served by the quiz API"""
+import asyncio
+
+import scraper
+from scraper import fetch_wikipedia_html, fetch_wikipedia_html_async
+
+URL = "https://en.wikipedia.org/wiki/Albert_Einstein"
+
+
+def test_sync_fetch_revalidates_with_etag(wiki):
+    first = fetch_wikipedia_html(URL)
+    assert first.html and first.etag and first.last_modified
+
+    again = fetch_wikipedia_html(URL, etag=first.etag, last_modified=first.last_modified)
+    assert again.not_modified
+    assert (again.etag, again.last_modified) == (first.etag, first.last_modified)
+    assert wiki.requests[("Albert_Einstein", 304)] == 1
+
+
+def test_sync_fetch_downloads_revised_page(wiki):
+    first = fetch_wikipedia_html(URL)
+    wiki.revise("Albert_Einstein")
+
+    revised = fetch_wikipedia_html(URL, etag=first.etag, last_modified=first.last_modified)
+    assert not revised.not_modified
+    assert revised.etag != first.etag
+    assert "revision 1" in revised.html
+    assert wiki.fetches(304) == 0
+
+
+def test_async_fetch_revalidates_with_etag(wiki):
+    async def fetch_twice():
+        first = await fetch_wikipedia_html_async(URL)
+        again = await fetch_wikipedia_html_async(URL, etag=first.etag, last_modified=first.last_modified)
+        wiki.revise("Albert_Einstein")
+        revised = await fetch_wikipedia_html_async(URL, etag=first.etag, last_modified=first.last_modified)
+        return first, again, revised
+
+    first, again, revised = asyncio.run(fetch_twice())
+    assert first.html and not first.not_modified
+    assert again.not_modified
+    assert revised.html and revised.etag != first.etag
+    assert wiki.fetches(200) == 2 and wiki.fetches(304) == 1
+
+
+def test_pages_arrive_compressed(wiki):
+    response = scraper.get_session().get(URL)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.text.startswith("<!DOCTYPE html>")
+
+
+def test_forced_regeneration_reuses_unchanged_article(client, wiki):
+    url = "https://en.wikipedia.org/wiki/Climate_change"
+    created = client.post("/api/generate_quiz/", json={"url": url})
+    assert created.status_code == 200
+    assert wiki.fetches(200) == 1
+
+    regenerated = client.post("/api/generate_quiz/", json={"url": url, "force": True})
+    assert regenerated.status_code == 200
+    assert regenerated.json()["id"] == created.json()["id"]
+    assert wiki.fetches(304) == 1 and wiki.fetches(200) == 1
+
+    wiki.revise("Climate_change")
+    client.post("/api/generate_quiz/", json={"url": url, "force": True}).raise_for_status()
+    assert wiki.fetches(200) == 2
+
+
+def test_quiz_details_answer_matching_etag_with_304(client):
+    url = "https://en.wikipedia.org/wiki/Etag_details_test"
+    quiz_id = client.post("/api/generate_quiz/", json={"url": url}).json()["id"]
+    path = f"/api/quiz/{quiz_id}/"
+
+    first = client.get(path)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.json()["id"] == quiz_id
+
+    unchanged = client.get(path, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag and unchanged.content == b""
+    assert client.get(path, headers={"If-None-Match": f'"stale", {etag}'}).status_code == 304
+
+    # A regenerated quiz is a new version: the old ETag no longer matches
+    client.post("/api/generate_quiz/", json={"url": url, "force": True})
+    changed = client.get(path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
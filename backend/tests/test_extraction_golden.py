@@ -0,0 +1,46 @@
+"""
+Golden-file checks for article extraction.
+
+Every saved page in sample_data/pages has a golden file in tests/golden
+holding the title and text the original BeautifulSoup extractor produces.
+Both backends must reproduce the golden output exactly.
+
+After an intentional extraction change, rewrite the golden files with:
+    UPDATE_GOLDEN=1 python -m pytest tests/test_extraction_golden.py
+"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from scraper import LXML_AVAILABLE, parse_wikipedia_html
+from wiki_standin import saved_pages
+
+GOLDEN_DIR = Path(__file__).resolve().parent / "golden"
+PAGES = saved_pages()
+BACKENDS = ["bs4", pytest.param("lxml", marks=pytest.mark.skipif(not LXML_AVAILABLE, reason="lxml not installed"))]
+
+
+def golden(name: str) -> dict:
+    path = GOLDEN_DIR / f"{name}.json"
+    if os.getenv("UPDATE_GOLDEN"):
+        title, text = parse_wikipedia_html(PAGES[name], backend="bs4")
+        expected = {"title": title, "text": text}
+        path.write_text(json.dumps(expected, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def test_every_page_has_a_golden_file():
+    assert PAGES
+    assert sorted(path.stem for path in GOLDEN_DIR.glob("*.json")) == sorted(PAGES)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_extraction_matches_golden(name, backend):
+    expected = golden(name)
+    title, text = parse_wikipedia_html(PAGES[name], backend=backend)
+    assert title == expected["title"]
+    assert text == expected["text"]
+
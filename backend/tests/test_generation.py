@@ -0,0 +1,33 @@
+"""Quiz generation through the API: one LLM call per article, saved responses match what is read back"""
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_client import llm_manager
+from llm_providers import FakeProvider
+from singleflight import generation_flights
+
+
+def test_generated_response_matches_saved_quiz(client):
+    url = "https://en.wikipedia.org/wiki/Saved_date_test"
+    for force in (False, True):
+        generated = client.post("/api/generate_quiz/", json={"url": url, "force": force}).json()
+        assert not generated["cached"]
+
+        details = client.get(f"/api/quiz/{generated['id']}/").json()
+        history = client.get("/api/history/", params={"limit": 200}).json()
+        listed = next(item for item in history if item["id"] == generated["id"])
+        assert generated["date_generated"] == details["date_generated"] == listed["date_generated"]
+
+
+def test_concurrent_requests_share_one_llm_call(client, monkeypatch):
+    provider = FakeProvider("fake-quiz-model", {}, latency_ms=300)
+    monkeypatch.setattr(llm_manager, "_provider", provider)
+    coalesced = generation_flights.coalesced
+    url = "https://en.wikipedia.org/wiki/Singleflight_test"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda _: client.post("/api/generate_quiz/", json={"url": url}), range(4)))
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert provider.calls == 1
+    assert generation_flights.coalesced - coalesced == 3
+    assert len({response.json()["id"] for response in responses}) == 1
@@ -0,0 +1,87 @@
+"""Job leases: each unfinished job is run by one worker process"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import GenerationJob, SessionLocal
+from jobs import JobQueue, QueueNotReadyError
+
+
+def make_queue(worker_id: str) -> JobQueue:
+    return JobQueue(workers=1, max_depth=10, lease_seconds=60, worker_id=worker_id)
+
+
+def expire_lease(job_id: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(GenerationJob).filter(GenerationJob.id == job_id).update(
+            {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_live_lease_blocks_other_workers(database):
+    first, second = make_queue("worker-a"), make_queue("worker-b")
+    job = first._insert_job("https://en.wikipedia.org/wiki/Lease_a", "Lease_a", False, "queued")
+
+    assert second._claim(job.id) is None
+    assert first._claim(job.id).lease_owner == "worker-a"
+
+
+def test_expired_lease_is_taken_over_once(database):
+    first, second = make_queue("worker-a"), make_queue("worker-b")
+    job = first._insert_job("https://en.wikipedia.org/wiki/Lease_b", "Lease_b", False, "queued")
+    expire_lease(job.id)
+
+    assert job.id in second._claim_expired(100)
+    assert job.id not in first._claim_expired(100)
+    # The original owner lost the job and must not run it
+    assert first._claim(job.id) is None
+    assert second._claim(job.id).lease_owner == "worker-b"
+
+
+def test_finished_jobs_are_not_claimed(database):
+    queue = make_queue("worker-a")
+    job = queue._insert_job("https://en.wikipedia.org/wiki/Lease_c", "Lease_c", False, "done", None)
+    expire_lease(job.id)
+
+    assert queue._claim(job.id) is None
+    assert job.id not in queue._claim_expired(100)
+
+
+def test_submit_before_start_is_not_ready():
+    with pytest.raises(QueueNotReadyError):
+        asyncio.run(make_queue("worker-a").submit("https://en.wikipedia.org/wiki/Lease_d", "Lease_d", False))
+
+
+def test_watchers_are_dropped_when_they_stop_waiting():
+    queue = make_queue("worker-a")
+
+    async def watch():
+        waiter = asyncio.create_task(queue.wait_for_change("job-1", timeout=5))
+        await asyncio.sleep(0)
+        assert queue.stats()["watchers"] == 1
+        for event in queue._watchers["job-1"]:
+            event.set()
+        await waiter
+        await queue.wait_for_change("job-1", timeout=0.01)
+
+    asyncio.run(watch())
+    assert queue._watchers == {}
+
+
+def test_held_queued_jobs_keep_their_lease(database):
+    first, second = make_queue("worker-a"), make_queue("worker-b")
+    waiting = first._insert_job("https://en.wikipedia.org/wiki/Lease_e", "Lease_e", False, "queued")
+    taken = first._insert_job("https://en.wikipedia.org/wiki/Lease_f", "Lease_f", False, "queued")
+    expire_lease(waiting.id)
+    expire_lease(taken.id)
+    assert second._claim(taken.id).lease_owner == "worker-b"
+
+    # Still waiting in worker-a's local queue: renewed, so its sweep leaves it alone
+    assert first._renew_leases([waiting.id, taken.id]) == 1
+    assert waiting.id not in second._claim_expired(100)
+    assert first._claim(waiting.id).lease_owner == "worker-a"
@@ -0,0 +1,60 @@
+"""LLM output cache: hits skip the provider, and the key follows prompt, model and text"""
+import asyncio
+
+import pytest
+
+import llm_quiz_generator
+from llm_cache import LLMOutputCache
+from llm_client import llm_manager
+from llm_providers import FakeProvider
+from llm_quiz_generator import generate_quiz_from_article_async, output_cache_key
+
+ARTICLE = " ".join(["Output caching is exercised with this article about glaciers."] * 30)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    outputs = LLMOutputCache(str(tmp_path / "llm_cache.db"), max_entries=10, ttl_seconds=3600)
+    monkeypatch.setattr(llm_quiz_generator, "llm_outputs", outputs)
+    return outputs
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    fake = FakeProvider("fake-quiz-model", {"temperature": 0.3})
+    monkeypatch.setattr(llm_manager, "_provider", fake)
+    return fake
+
+
+def test_second_generation_is_a_cache_hit(cache, provider):
+    first = asyncio.run(generate_quiz_from_article_async("Glaciers", ARTICLE))
+    second = asyncio.run(generate_quiz_from_article_async("Glaciers", ARTICLE))
+
+    assert second == first
+    assert provider.calls == 1
+    assert (cache.misses, cache.hits, cache.stores) == (1, 1, 1)
+
+    asyncio.run(generate_quiz_from_article_async("Glaciers", ARTICLE + " Revised."))
+    assert provider.calls == 2
+
+
+def test_key_changes_with_prompt_model_and_text(provider, monkeypatch):
+    key = output_cache_key(ARTICLE)
+    assert output_cache_key(ARTICLE) == key
+    assert output_cache_key(ARTICLE + " Revised.") != key
+
+    monkeypatch.setattr(llm_manager, "_provider", FakeProvider("other-model", {"temperature": 0.3}))
+    assert output_cache_key(ARTICLE) != key
+    monkeypatch.setattr(llm_manager, "_provider", FakeProvider("fake-quiz-model", {"temperature": 0.9}))
+    assert output_cache_key(ARTICLE) != key
+
+    monkeypatch.setattr(llm_manager, "_provider", provider)
+    monkeypatch.setattr(llm_quiz_generator, "QUIZ_PROMPT_VERSION", "test-prompt")
+    assert output_cache_key(ARTICLE) != key
+
+
+def test_expired_entries_miss(tmp_path):
+    outputs = LLMOutputCache(str(tmp_path / "llm_cache.db"), max_entries=10, ttl_seconds=-1)
+    outputs.put("key", {"quiz": []})
+    assert outputs.get("key") is None
+    assert outputs.misses == 1
@@ -0,0 +1,57 @@
+"""Rate-limited LLM slots: budget refunds and output token charging"""
+import asyncio
+
+import pytest
+
+from llm_client import LLMCapacityError, LLMClientManager
+
+
+def make_manager(**limits) -> LLMClientManager:
+    options = {"max_concurrency": 1, "requests_per_minute": 10, "tokens_per_minute": 1000, "queue_timeout": 1}
+    options.update(limits)
+    return LLMClientManager(**options)
+
+
+def test_busy_slot_refunds_request_and_tokens():
+    manager = make_manager()
+
+    async def contend():
+        async with manager.slot(100):
+            with pytest.raises(LLMCapacityError, match="LLM request slots are busy"):
+                async with manager.slot(300, timeout=0.05):
+                    pass
+
+    asyncio.run(contend())
+    assert manager.request_bucket.available() == pytest.approx(9, abs=0.1)
+    assert manager.token_bucket.available() == pytest.approx(900, abs=1)
+    assert manager.rejected == 1
+
+
+def test_token_budget_timeout_refunds_request():
+    manager = make_manager(tokens_per_minute=60)
+
+    async def starve():
+        async with manager.slot(60):
+            pass
+        with pytest.raises(LLMCapacityError, match="LLM rate limit reached"):
+            async with manager.slot(30, timeout=0.05):
+                pass
+
+    asyncio.run(starve())
+    assert manager.request_bucket.available() == pytest.approx(9, abs=0.1)
+
+
+def test_output_tokens_are_charged():
+    manager = make_manager()
+    manager.charge_output(400)
+    assert manager.token_bucket.available() == pytest.approx(600, abs=1)
+
+    # An overdrawn budget makes the next caller wait for the refill
+    manager.charge_output(1000)
+
+    async def overdrawn():
+        with pytest.raises(LLMCapacityError):
+            async with manager.slot(10, timeout=0.05):
+                pass
+
+    asyncio.run(overdrawn())
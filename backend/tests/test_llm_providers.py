@@ -0,0 +1,38 @@
+"""Fake provider: schema-valid, deterministic quizzes for every saved page"""
+import asyncio
+
+import pytest
+
+from llm_providers import FakeProvider
+from llm_quiz_generator import build_quiz_prompt, parse_quiz_response
+from scraper import parse_wikipedia_html
+from wiki_standin import saved_pages
+
+PAGES = saved_pages()
+
+
+def prompt_for(name: str) -> tuple:
+    title, text = parse_wikipedia_html(PAGES[name])
+    return title, build_quiz_prompt(title, text)
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_fake_quiz_is_valid_for_the_article(name):
+    title, prompt = prompt_for(name)
+    result = asyncio.run(FakeProvider("fake", {}).generate(prompt))
+    quiz = parse_quiz_response(result.text)
+    assert quiz["title"] == title
+    assert len(quiz["quiz"]) == 5
+    assert all(question["answer"] in question["options"] for question in quiz["quiz"])
+    assert {question["difficulty"] for question in quiz["quiz"]} == {"easy", "medium", "hard"}
+
+
+def test_fake_quiz_depends_only_on_the_prompt():
+    _, prompt = prompt_for(sorted(PAGES)[0])
+
+    async def collect(provider):
+        return "".join([chunk async for chunk in provider.stream(prompt)])
+
+    first = asyncio.run(FakeProvider("fake", {}, seed=1).generate(prompt)).text
+    assert asyncio.run(FakeProvider("fake", {}, seed=2).generate(prompt)).text == first
+    assert asyncio.run(collect(FakeProvider("fake", {}))) == first
@@ -0,0 +1,142 @@
+"""Startup migrations: legacy databases keep every quiz; one-off backfills run once"""
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+import database as database_module
+from database import Base, CompletedMigration, Question, Quiz, QuizContent, SessionLocal, run_migrations
+
+QUIZ_DATA = {"quiz": [{"question": "Which river?", "options": ["A", "B"], "answer": "A", "difficulty": "easy"}]}
+
+
+def test_question_backfill_is_recorded_and_skipped(database, monkeypatch):
+    db = SessionLocal()
+    try:
+        assert db.get(CompletedMigration, "backfill_questions") is not None
+    finally:
+        db.close()
+
+    def scan(*args, **kwargs):
+        raise AssertionError("backfill_questions ran again")
+
+    monkeypatch.setattr(database_module, "backfill_questions", scan)
+    run_migrations()
+
+
+def test_question_backfill_runs_until_recorded(database):
+    db = SessionLocal()
+    try:
+        quiz = Quiz(
+            url="https://en.wikipedia.org/wiki/Backfill_test",
+            article_key="Backfill_test",
+            title="Backfill test",
+            full_quiz_data=json.dumps(QUIZ_DATA)
+        )
+        db.add(quiz)
+        db.query(CompletedMigration).filter(CompletedMigration.name == "backfill_questions").delete()
+        db.commit()
+        quiz_id = quiz.id
+    finally:
+        db.close()
+
+    run_migrations()
+
+    db = SessionLocal()
+    try:
+        assert db.query(Question).filter(Question.quiz_id == quiz_id).count() == 1
+        assert db.get(CompletedMigration, "backfill_questions") is not None
+    finally:
+        db.close()
+
+
+LEGACY_QUIZZES = """
+CREATE TABLE quizzes (
+    id INTEGER PRIMARY KEY,
+    url VARCHAR(500) NOT NULL UNIQUE,
+    title VARCHAR(255) NOT NULL,
+    date_generated DATETIME,
+    scraped_content TEXT,
+    full_quiz_data TEXT NOT NULL
+)
+"""
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """A database from before article keys and quiz_contents, with two quizzes of one article"""
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as connection:
+        connection.execute(text(LEGACY_QUIZZES))
+        connection.execute(
+            text(
+                "INSERT INTO quizzes (id, url, title, date_generated, scraped_content, full_quiz_data) "
+                "VALUES (:id, :url, :title, :date_generated, :scraped_content, :full_quiz_data)"
+            ),
+            [
+                {"id": 1, "url": "https://en.wikipedia.org/wiki/Albert_Einstein", "title": "Albert Einstein",
+                 "date_generated": datetime(2024, 1, 1), "scraped_content": "<p>First scrape</p>",
+                 "full_quiz_data": json.dumps(QUIZ_DATA)},
+                {"id": 2, "url": "https://en.wikipedia.org/wiki/Albert%20Einstein", "title": "Albert Einstein",
+                 "date_generated": datetime(2024, 2, 1), "scraped_content": "<p>Second scrape</p>",
+                 "full_quiz_data": json.dumps(QUIZ_DATA)},
+                {"id": 3, "url": "https://en.wikipedia.org/wiki/Marie_Curie", "title": "Marie Curie",
+                 "date_generated": datetime(2024, 3, 1), "scraped_content": None,
+                 "full_quiz_data": json.dumps(QUIZ_DATA)},
+            ]
+        )
+    monkeypatch.setattr(database_module, "engine", engine)
+    monkeypatch.setattr(database_module, "SessionLocal", sessionmaker(bind=engine))
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def test_legacy_duplicates_are_kept_and_superseded(legacy_db):
+    run_migrations()
+
+    db = sessionmaker(bind=legacy_db)()
+    try:
+        old, new, other = (db.get(Quiz, quiz_id) for quiz_id in (1, 2, 3))
+        assert (old.article_key, old.superseded_by) == (None, 2)
+        assert (new.article_key, new.superseded_by) == ("Albert_Einstein", None)
+        assert (other.article_key, other.superseded_by) == ("Marie_Curie", None)
+        assert json.loads(old.full_quiz_data) == QUIZ_DATA
+        assert db.query(Quiz).filter(Quiz.article_key == "Albert_Einstein").one().id == 2
+    finally:
+        db.close()
+
+    # Existing rows stay; new duplicates are refused
+    with pytest.raises(IntegrityError):
+        with legacy_db.begin() as connection:
+            connection.execute(
+                Quiz.__table__.insert(),
+                {"url": "https://en.wikipedia.org/wiki/albert_Einstein", "article_key": "Albert_Einstein",
+                 "title": "Albert Einstein", "full_quiz_data": "{}"}
+            )
+
+
+def test_legacy_scraped_content_moves_to_quiz_contents(legacy_db):
+    run_migrations()
+
+    assert "scraped_content" not in {column["name"] for column in inspect(legacy_db).get_columns("quizzes")}
+    db = sessionmaker(bind=legacy_db)()
+    try:
+        contents = {content.quiz_id: content.raw_html for content in db.query(QuizContent)}
+        assert contents == {1: "<p>First scrape</p>", 2: "<p>Second scrape</p>"}
+    finally:
+        db.close()
+
+
+def test_legacy_migrations_run_once(legacy_db):
+    run_migrations()
+    with legacy_db.connect() as connection:
+        before = connection.execute(text("SELECT id, article_key, superseded_by FROM quizzes ORDER BY id")).all()
+
+    run_migrations()
+
+    with legacy_db.connect() as connection:
+        assert connection.execute(text("SELECT id, article_key, superseded_by FROM quizzes ORDER BY id")).all() == before
@@ -0,0 +1,106 @@
+"""Packed generation: per-batch counts, packs started as they fill, concurrent fallbacks"""
+import asyncio
+from collections import Counter
+
+import packing
+from batch import run_batch
+from config import settings
+from packing import PackBins, PackItem, generate_packed, packing_report, packing_stats
+from quiz_pipeline import PreparedArticle
+
+
+def items(prefix: str, count: int) -> list:
+    return [
+        PackItem(f"{prefix} {n}", f"Packing test article {prefix} {n} about rivers and mountains. " * 10)
+        for n in range(count)
+    ]
+
+
+def test_batches_report_their_own_packing_counts():
+    before = Counter(packing_stats)
+    first, second = Counter(), Counter()
+
+    asyncio.run(generate_packed(items("First", 3), first))
+    asyncio.run(generate_packed(items("Second", 2), second))
+
+    assert packing_report(first)["packed_articles"] == 3
+    assert packing_report(second)["packed_articles"] == 2
+    assert packing_report(second)["packed_requests"] == 1
+    assert packing_stats["packed_articles"] - before["packed_articles"] == 5
+
+
+def test_bins_are_ready_once_full_or_an_article_is_turned_away(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PACK_MAX_ARTICLES", 2)
+    monkeypatch.setattr(settings, "LLM_PACK_TOKEN_BUDGET", 100)
+    packer = PackBins()
+
+    def article(tokens: int) -> PackItem:
+        return PackItem("Article", "x" * (tokens * 4))
+
+    assert packer.add("a", article(30)) == []
+    assert packer.add("b", article(30)) == [["a", "b"]]
+    assert packer.add("c", article(60)) == []
+    # Does not fit next to "c", which is sent without waiting for more
+    assert packer.add("d", article(50)) == [["c"]]
+    assert packer.flush() == [["d"]]
+    assert packer.flush() == []
+
+
+def test_fallbacks_run_concurrently_under_the_slots(monkeypatch):
+    active, peak = 0, 0
+
+    async def failing_call(prompt, deadline, usage=None):
+        raise Exception("503 Fake provider temporarily unavailable")
+
+    async def single(title, article_text, usage=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return {"title": title}
+
+    monkeypatch.setattr(packing, "call_llm", failing_call)
+    monkeypatch.setattr(packing, "generate_quiz_from_article_async", single)
+
+    async def run():
+        return await generate_packed(items("Fallback", 4), Counter(), asyncio.Semaphore(2))
+
+    quizzes = asyncio.run(run())
+    assert [quiz_data["title"] for quiz_data, _ in quizzes] == [f"Fallback {n}" for n in range(4)]
+    assert peak == 2
+
+
+def test_full_pack_starts_before_slow_fetches_finish(monkeypatch):
+    import batch
+
+    monkeypatch.setattr(settings, "LLM_PACK_MAX_ARTICLES", 2)
+    monkeypatch.setattr(batch, "cached_quiz", lambda item: None)
+    released = None
+
+    async def prepare(url, article_key, force, notify):
+        if article_key == "Slow_fetch":
+            await released.wait()
+        return PreparedArticle(article_key, f"Early pack test article {article_key} about lakes. " * 10, article_key, None)
+
+    async def save(results):
+        return [{"id": number} for number, _ in enumerate(results, 1)]
+
+    monkeypatch.setattr(batch, "prepare_article", prepare)
+    monkeypatch.setattr(batch, "save_quizzes_async", save)
+    urls = [f"https://en.wikipedia.org/wiki/{title}" for title in ("Fast_fetch_a", "Fast_fetch_b", "Slow_fetch")]
+
+    async def run():
+        nonlocal released
+        released = asyncio.Event()
+        events = []
+        async for event in run_batch(urls, force=True, pack=True):
+            events.append(event)
+            if event.get("status") == "generated" and not released.is_set():
+                released.set()
+        return events
+
+    events = asyncio.run(asyncio.wait_for(run(), timeout=10))
+    generated = [event["url"].rsplit("/", 1)[1] for event in events if event.get("status") == "generated"]
+    assert generated[:2] == ["Fast_fetch_a", "Fast_fetch_b"]
+    assert events[-1]["generated"] == 3
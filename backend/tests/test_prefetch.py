@@ -0,0 +1,39 @@
+"""Prefetch article cache: bounded by count and by total bytes"""
+from prefetch import Prefetcher
+from scraper import STORED_HTML_CHARS, ScrapedArticle
+
+
+def article(title: str, html_chars: int = 200_000, text_chars: int = 10_000) -> ScrapedArticle:
+    return ScrapedArticle(title, "t" * text_chars, "<p>" + "h" * html_chars, None, None)
+
+
+def make_prefetcher(cache_size: int = 100, cache_max_bytes: int = 10**9) -> Prefetcher:
+    return Prefetcher(True, False, 30, 200, cache_size, cache_max_bytes, 3600)
+
+
+def test_cached_articles_keep_only_the_stored_html():
+    prefetcher = make_prefetcher()
+    prefetcher._remember_article("Big", article("Big"))
+
+    assert prefetcher.stats()["cached_bytes"] == STORED_HTML_CHARS + 10_000
+    assert len(prefetcher.take_article("Big").raw_html) == STORED_HTML_CHARS
+    assert prefetcher.stats()["cached_bytes"] == 0
+
+
+def test_oldest_articles_are_evicted_past_the_byte_limit():
+    prefetcher = make_prefetcher(cache_max_bytes=3 * (STORED_HTML_CHARS + 10_000))
+    for n in range(5):
+        prefetcher._remember_article(f"Topic_{n}", article(f"Topic {n}"))
+
+    assert prefetcher.stats()["cached_articles"] == 3
+    assert prefetcher.counters["evicted"] == 2
+    assert prefetcher.take_article("Topic_1") is None
+    assert prefetcher.take_article("Topic_4").title == "Topic 4"
+
+
+def test_article_over_the_byte_limit_is_not_cached():
+    prefetcher = make_prefetcher(cache_max_bytes=1000)
+    prefetcher._remember_article("Big", article("Big"))
+
+    assert prefetcher.stats()["cached_articles"] == 0
+    assert prefetcher.counters["too_large"] == 1
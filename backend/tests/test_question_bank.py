@@ -0,0 +1,56 @@
+"""Quiz assembly from saved questions: difficulty mix, shortfall fill and seeded samples"""
+import pytest
+
+from question_bank import difficulty_targets
+
+# The fake provider's quizzes have 2 easy, 2 medium and 1 hard question
+URLS = [
+    "https://en.wikipedia.org/wiki/Question_bank_rivers",
+    "https://en.wikipedia.org/wiki/Question_bank_mountains",
+]
+
+
+@pytest.fixture
+def bank(client):
+    for url in URLS:
+        assert client.post("/api/generate_quiz/", json={"url": url}).status_code == 200
+
+    def assemble(**body):
+        return client.post("/api/quiz/assemble", json={"urls": URLS, **body})
+
+    return assemble
+
+
+def test_targets_follow_relative_weights():
+    assert difficulty_targets(5, {"easy": 2, "medium": 2, "hard": 1}) == {"easy": 2, "medium": 2, "hard": 1}
+    assert difficulty_targets(10, {"easy": 0.4, "medium": 0.4, "hard": 0.2}) == {"easy": 4, "medium": 4, "hard": 2}
+    assert sum(difficulty_targets(7, {"easy": 1, "medium": 1, "hard": 1}).values()) == 7
+
+
+def test_mix_need_not_sum_to_one(bank):
+    body = bank(count=5, difficulty_mix={"easy": 2, "medium": 2, "hard": 1}).json()
+    assert body["difficulty_counts"] == {"easy": 2, "medium": 2, "hard": 1}
+    assert body["shortfall"] == {}
+    assert [question["difficulty"] for question in body["quiz"]] == ["easy", "easy", "medium", "medium", "hard"]
+
+
+@pytest.mark.parametrize("mix", [{}, {"easy": 0, "medium": 0, "hard": 0}, {"easy": -1, "hard": 2}, {"trivial": 1}])
+def test_unusable_mix_is_rejected(bank, mix):
+    response = bank(count=5, difficulty_mix=mix)
+    assert response.status_code == 400
+    assert "difficulty_mix" in response.json()["detail"]
+
+
+def test_shortfall_is_filled_from_the_nearest_difficulty(bank):
+    body = bank(count=4, difficulty_mix={"hard": 1}).json()
+    # 2 hard questions saved; the other 2 come from medium, next to hard
+    assert body["shortfall"] == {"hard": 2}
+    assert body["difficulty_counts"] == {"easy": 0, "medium": 2, "hard": 2}
+    assert len(body["quiz"]) == 4
+
+
+def test_seed_makes_the_sample_reproducible(bank):
+    first = bank(count=6, seed=7).json()
+    assert bank(count=6, seed=7).json()["quiz"] == first["quiz"]
+    assert len({question["question"] for question in first["quiz"]}) == 6
+    assert {question["article_key"] for question in first["quiz"]} == set(first["article_keys"])
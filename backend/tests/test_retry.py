@@ -0,0 +1,35 @@
+"""Error classification: status codes first, whole-word message matches as fallback"""
+import httpx
+import pytest
+
+from retry import classify_error
+
+
+def http_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://llm.local/v1/chat/completions")
+    return httpx.HTTPStatusError("upstream error", request=request, response=httpx.Response(status, request=request))
+
+
+class SDKError(Exception):
+    """Stands in for SDK exceptions that carry the HTTP status as .code"""
+
+    def __init__(self, message: str, code: int):
+        super().__init__(message)
+        self.code = code
+
+
+@pytest.mark.parametrize("error, expected", [
+    (http_error(429), "quota"),
+    (http_error(503), "transient"),
+    (http_error(400), "fatal"),
+    (SDKError("Resource has been exhausted", 429), "quota"),
+    # The status wins over numbers that happen to be in the message
+    (SDKError("Invalid max_output_tokens: 500", 400), "fatal"),
+    (Exception("503 Fake provider temporarily unavailable"), "transient"),
+    (Exception("429 Fake provider quota exceeded"), "quota"),
+    (Exception("ReadTimeout while streaming"), "transient"),
+    (Exception("Prompt of 1500 tokens exceeds max_tokens=15000"), "fatal"),
+    (Exception("Model gemini-1.5-pro-001 not found"), "fatal"),
+])
+def test_classify_error(error, expected):
+    assert classify_error(error) == expected
@@ -0,0 +1,80 @@
+"""Search index compaction: tombstones dropped without losing concurrent updates"""
+import builtins
+import time
+
+import search_index
+from search_index import SearchIndex
+
+
+def fields(title: str, body: str = "") -> dict:
+    return {"title": title, "entities": "", "summary": body, "questions": "", "article": ""}
+
+
+def reindexed(count: int = 50, versions: int = 5) -> SearchIndex:
+    index = SearchIndex()
+    for version in range(versions):
+        for quiz_id in range(count):
+            index.add(quiz_id, fields(f"Topic {quiz_id}", f"version{version} history river"))
+    return index
+
+
+def wait_for_compaction(index: SearchIndex) -> None:
+    deadline = time.monotonic() + 5
+    while index._touched is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_compaction_keeps_results_and_drops_tombstones():
+    index = reindexed()
+    wait_for_compaction(index)
+    before = index.search("history river", limit=100)
+
+    index.compact()
+
+    assert index._dead_postings == 0
+    assert index.search("history river", limit=100) == before
+    assert index.search("version4") and not index.search("version0")
+
+
+def test_add_starts_compaction_in_background():
+    index = SearchIndex()
+    for version in range(60):
+        for quiz_id in range(20):
+            index.add(quiz_id, fields(f"Topic {quiz_id}", f"version{version} river"))
+    wait_for_compaction(index)
+
+    assert index._touched is None
+    # About 4000 tombstoned postings without compaction; it starts above 1000
+    assert index.stats()["dead_postings"] <= 1000
+    assert len(index.search("river", limit=100)) == 20
+
+
+def test_updates_during_compaction_are_kept(monkeypatch):
+    index = reindexed()
+    wait_for_compaction(index)
+
+    def sorted_with_update(terms):
+        # Runs between building the compacted arrays and swapping them in
+        index.add(7, fields("Topic 7", "lighthouse history"))
+        index.add(1000, fields("Brand new quiz", "lighthouse"))
+        return builtins.sorted(terms)
+
+    monkeypatch.setattr(search_index, "sorted", sorted_with_update, raising=False)
+    index.compact()
+    monkeypatch.undo()
+
+    assert {quiz_id for quiz_id, _ in index.search("lighthouse")} == {7, 1000}
+    assert 7 not in {quiz_id for quiz_id, _ in index.search("river", limit=100)}
+    assert index.search("bran")[0][0] == 1000
+
+
+def test_search_request_builds_index_when_not_ready(client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main.quiz_search, "ready", False)
+    assert client.get("/api/search", params={"q": "history"}).status_code == 200
+
+    deadline = time.monotonic() + 5
+    while not main.app.state.search_refresh_task.done() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert main.quiz_search.ready
@@ -0,0 +1,20 @@
+"""Request-scoped sessions: handler errors are not database errors"""
+import logging
+
+
+def test_not_found_is_not_logged_as_database_error(client, caplog):
+    with caplog.at_level(logging.ERROR, logger="database"):
+        assert client.get("/api/quiz/987654/").status_code == 404
+        assert client.get("/api/jobs/missing-job").status_code == 404
+    assert "Database connection error" not in caplog.text
+
+
+def test_health_check_uses_async_session(client, monkeypatch):
+    import database
+
+    def blocking_session():
+        raise AssertionError("health check opened a sync session")
+
+    monkeypatch.setattr(database, "SessionLocal", blocking_session)
+    body = client.get("/health").json()
+    assert (body["status"], body["database"]) == ("healthy", "connected")
@@ -0,0 +1,61 @@
+"""Single-flight: one execution per key, progress shared with every caller"""
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def test_joiners_share_the_result_and_follow_its_status():
+    flights = SingleFlight()
+    first_seen, joiner_seen = [], []
+
+    async def scenario():
+        release = asyncio.Event()
+        executions = []
+
+        async def work(publish):
+            executions.append(1)
+            publish("scraping")
+            await release.wait()
+            publish("generating")
+            return "quiz"
+
+        first = asyncio.create_task(flights.do("Article", work, first_seen.append))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(flights.do("Article", work, joiner_seen.append))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(first, joiner)
+        return results, len(executions)
+
+    results, executions = asyncio.run(scenario())
+    assert results == ["quiz", "quiz"]
+    assert executions == 1
+    assert first_seen == ["scraping", "generating"]
+    # Joined after "scraping": gets it on arrival, then the live updates
+    assert joiner_seen == ["scraping", "generating"]
+    assert flights.stats() == {"calls": 2, "executions": 1, "coalesced": 1, "in_flight": 0}
+
+
+def test_cancelled_caller_stops_listening_without_cancelling_the_work():
+    flights = SingleFlight()
+    seen = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def work(publish):
+            await release.wait()
+            publish("generating")
+            return "quiz"
+
+        leaving = asyncio.create_task(flights.do("Article", work, seen.append))
+        await asyncio.sleep(0)
+        staying = asyncio.create_task(flights.do("Article", work))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await staying
+
+    assert asyncio.run(scenario()) == "quiz"
+    assert seen == []
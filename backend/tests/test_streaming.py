@@ -0,0 +1,144 @@
+"""Streamed generation: retries before the first question, one shared flight per article"""
+import asyncio
+import json
+
+import pytest
+
+import retry
+from llm_client import llm_manager
+from llm_providers import FakeProvider
+from llm_quiz_generator import stream_quiz_from_article
+
+ARTICLE = " ".join(["Streaming retries are exercised with this article text."] * 40)
+
+
+class FlakyProvider(FakeProvider):
+    """Fake provider whose streams fail before the first chunk, or after a few"""
+
+    def __init__(self, failures_before_first_chunk: int = 0, fail_after_chars: int = 0):
+        super().__init__("fake-quiz-model", {})
+        self.failures_before_first_chunk = failures_before_first_chunk
+        self.fail_after_chars = fail_after_chars
+        self.streams = 0
+
+    async def stream(self, prompt):
+        self.streams += 1
+        if self.failures_before_first_chunk:
+            self.failures_before_first_chunk -= 1
+            raise Exception("503 Fake provider temporarily unavailable")
+        sent = 0
+        async for chunk in super().stream(prompt):
+            if self.fail_after_chars and sent >= self.fail_after_chars:
+                raise Exception("503 Fake provider temporarily unavailable")
+            sent += len(chunk)
+            yield chunk
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    def install(**behaviour) -> FlakyProvider:
+        flaky = FlakyProvider(**behaviour)
+        monkeypatch.setattr(llm_manager, "_provider", flaky)
+        return flaky
+
+    monkeypatch.setitem(retry.RETRY_POLICIES, "transient", retry.RetryPolicy(max_retries=3, base_delay=0.01))
+    return install
+
+
+def collect(title: str):
+    async def run():
+        return [event async for event in stream_quiz_from_article(title, ARTICLE)]
+
+    return asyncio.run(run())
+
+
+def test_failure_before_first_chunk_is_retried(provider):
+    flaky = provider(failures_before_first_chunk=2)
+    events = collect("Retried stream")
+
+    assert flaky.streams == 3
+    assert [kind for kind, _ in events] == ["question"] * 5 + ["quiz"]
+
+
+def test_failure_after_questions_were_sent_is_raised(provider):
+    flaky = provider(fail_after_chars=1200)
+    questions = []
+
+    async def run():
+        async for kind, payload in stream_quiz_from_article("Broken stream", ARTICLE):
+            questions.append(payload)
+
+    with pytest.raises(Exception, match="Quiz generation failed"):
+        asyncio.run(run())
+    assert questions and flaky.streams == 1
+
+
+def test_quota_error_names_the_provider(provider, monkeypatch):
+    monkeypatch.setitem(retry.RETRY_POLICIES, "quota", retry.RetryPolicy(max_retries=1, base_delay=0.01))
+    flaky = provider()
+
+    async def exhausted(prompt):
+        raise Exception("429 Fake provider quota exceeded")
+        yield
+
+    monkeypatch.setattr(flaky, "stream", exhausted)
+    with pytest.raises(Exception, match=r"LLM quota exceeded \(fake provider\)"):
+        collect("Quota stream")
+
+
+def test_stream_endpoint_saves_then_serves_from_cache(client):
+    def stream(url):
+        with client.stream("POST", "/api/generate_quiz/stream", json={"url": url}) as response:
+            response.raise_for_status()
+            return [json.loads(line) for line in response.iter_lines() if line]
+
+    url = "https://en.wikipedia.org/wiki/Stream_endpoint_test"
+    events = stream(url)
+    assert [event["event"] for event in events][:2] == ["status", "status"]
+    questions = [event for event in events if event["event"] == "question"]
+    done = events[-1]
+    assert done["event"] == "done" and not done["quiz"]["cached"]
+    assert len(questions) == len(done["quiz"]["quiz"])
+
+    again = stream(url)
+    assert again[-1]["event"] == "done" and again[-1]["quiz"]["cached"]
+    assert again[-1]["quiz"]["id"] == done["quiz"]["id"]
+
+
+def stream_events(client, url):
+    with client.stream("POST", "/api/generate_quiz/stream", json={"url": url}) as response:
+        response.raise_for_status()
+        return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def test_concurrent_streams_share_one_llm_call(client, provider):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from singleflight import generation_flights
+
+    coalesced = generation_flights.coalesced
+    flaky = provider()
+    flaky.latency_ms = 300
+    url = "https://en.wikipedia.org/wiki/Stream_flight_test"
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        results = list(pool.map(lambda _: stream_events(client, url), range(3)))
+
+    assert flaky.streams == 1
+    assert generation_flights.coalesced - coalesced == 2
+    for events in results:
+        assert events[-1]["event"] == "done"
+        questions = [event["question"] for event in events if event["event"] == "question"]
+        assert questions == events[-1]["quiz"]["quiz"]
+    assert len({events[-1]["quiz"]["id"] for events in results}) == 1
+
+
+def test_stream_without_a_final_quiz_is_an_error(client, monkeypatch):
+    import quiz_pipeline
+
+    async def questions_only(title, article_text, usage=None):
+        yield "question", {"question": "Unfinished?"}
+
+    monkeypatch.setattr(quiz_pipeline, "stream_quiz_from_article", questions_only)
+    events = stream_events(client, "https://en.wikipedia.org/wiki/Stream_unfinished_test")
+    assert [event["event"] for event in events][-2:] == ["question", "error"]
+    assert events[-1]["detail"] == "LLM stream ended without a complete quiz"
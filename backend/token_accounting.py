@@ -0,0 +1,62 @@
+"""
+Token and latency accounting for LLM generations.
+
+A TokenUsage collects what one generation cost across all of its LLM
+calls (retries and repairs included) and is saved on the Quiz row.
+Process-wide totals are kept for /health.
+"""
+from collections import Counter
+from typing import Optional
+
+# Tokens, milliseconds and calls across all generations in this process
+usage_totals: Counter = Counter()
+
+
+class TokenUsage:
+    """Prompt/output tokens and LLM time spent on one generation"""
+
+    def __init__(self, prompt_tokens: int = 0, output_tokens: int = 0, latency_ms: int = 0, llm_calls: int = 0):
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+        self.latency_ms = latency_ms
+        self.llm_calls = llm_calls
+
+    def record(self, prompt_tokens: int, output_tokens: int, latency_seconds: float) -> None:
+        """Add one LLM call"""
+        latency_ms = round(latency_seconds * 1000)
+        self.prompt_tokens += prompt_tokens
+        self.output_tokens += output_tokens
+        self.latency_ms += latency_ms
+        self.llm_calls += 1
+
+        usage_totals["prompt_tokens"] += prompt_tokens
+        usage_totals["output_tokens"] += output_tokens
+        usage_totals["latency_ms"] += latency_ms
+        usage_totals["llm_calls"] += 1
+
+    def share(self, parts: int) -> "TokenUsage":
+        """Even share of this usage, e.g. per article of a packed request"""
+        return TokenUsage(
+            self.prompt_tokens // parts,
+            self.output_tokens // parts,
+            self.latency_ms // parts,
+            self.llm_calls
+        )
+
+    def merge(self, other: Optional["TokenUsage"]) -> None:
+        if other is not None:
+            self.prompt_tokens += other.prompt_tokens
+            self.output_tokens += other.output_tokens
+            self.latency_ms += other.latency_ms
+            self.llm_calls += other.llm_calls
+
+
+def usage_report() -> dict:
+    calls = usage_totals["llm_calls"]
+    output_tokens = usage_totals["output_tokens"]
+    return {
+        **usage_totals,
+        "avg_prompt_tokens": round(usage_totals["prompt_tokens"] / calls) if calls else None,
+        "avg_output_tokens": round(output_tokens / calls) if calls else None,
+        "ms_per_output_token": round(usage_totals["latency_ms"] / output_tokens, 2) if output_tokens else None,
+    }
@@ -0,0 +1,21 @@
+"""
+Rough LLM token estimates shared by the scraper and the prompt builder.
+
+Gemini does not expose a tokenizer offline, so budgets use the usual
+~4 characters per token estimate for English text.
+"""
+from config import settings
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of LLM tokens in text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def char_budget(token_budget: int = None) -> int:
+    """Character allowance for a token budget (defaults to the article budget)"""
+    if token_budget is None:
+        token_budget = settings.ARTICLE_TOKEN_BUDGET
+    return token_budget * CHARS_PER_TOKEN
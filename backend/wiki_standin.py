@@ -0,0 +1,402 @@
+"""Local stand-in for en.wikipedia.org, used by the tests and benchmarks
+
+Serves Wikipedia-shaped article pages over plain HTTP on 127.0.0.1 with
+ETag/Last-Modified validators, 304 answers to conditional GETs and gzip.
+Pages saved in sample_data/pages are served as they are; any other title
+gets a synthetic page built from the title. Titles in REDIRECTS are served
+with their target's page, whose canonical link names the target, the way
+Wikipedia answers a redirect.
+
+route_scraper() points the scraper's shared HTTP clients at the stand-in,
+so nothing reaches the real site.
+
+Usage:
+    python wiki_standin.py --write-pages   # regenerate sample_data/pages
+    python wiki_standin.py --port 8900     # serve until interrupted
+"""
+import argparse
+import gzip
+import hashlib
+import html
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import unquote, urlsplit
+
+PAGES_DIR = Path(__file__).resolve().parent.parent / "sample_data" / "pages"
+WIKIPEDIA_ORIGIN = "https://en.wikipedia.org"
+LAST_MODIFIED = "Mon, 06 Jan 2025 10:00:00 GMT"
+
+# Redirect titles and the article they resolve to
+REDIRECTS = {
+    "Python_language": "Python_(programming_language)",
+    "AI": "Artificial_intelligence",
+    "Einstein": "Albert_Einstein",
+    "WWII": "World_War_II",
+    "Global_warming": "Climate_change",
+}
+
+WORDS = (
+    "the of and to in a is was for on that by with as from at which an were are be this it "
+    "has had its their or been not also first other new between after during most more over "
+    "into such many these them than only some state system time world group use part work "
+    "period form government research development theory language model process power energy "
+    "war army force country region city population economy science history culture society "
+    "program data design network computer machine learning knowledge problem method result "
+    "study effect change climate temperature ocean carbon emission policy treaty campaign "
+    "physics relativity quantum light particle field equation paper university institute"
+).split()
+PROPER_NOUNS = (
+    "Europe Germany France Britain Japan China India America Berlin London Paris Tokyo Zurich "
+    "Princeton Geneva Netherlands Soviet Pacific Atlantic Einstein Turing Guido Churchill "
+    "Roosevelt Stalin Bohr Planck Curie McCarthy Minsky Hinton UNESCO NASA IPCC Google Microsoft"
+).split()
+SECTION_NAMES = (
+    "History Background Design Development Overview Applications Research Legacy Impact "
+    "Reception Philosophy Syntax Implementation Causes Effects Mitigation Adaptation Politics "
+    "Campaigns Aftermath Theory Criticism Economics Culture Education Awards Personal_life"
+).split()
+
+# Saved pages: title -> (sections, paragraphs per section, modern heading markup)
+CORPUS = {
+    "Python_(programming_language)": (10, 3, False),
+    "Artificial_intelligence": (18, 4, True),
+    "Albert_Einstein": (14, 3, False),
+    "World_War_II": (60, 5, False),
+    "Climate_change": (28, 4, True),
+    "Stub_article": (0, 0, False),
+}
+
+
+def _sentence(rng: random.Random) -> str:
+    words = []
+    for _ in range(rng.randint(8, 22)):
+        roll = rng.random()
+        if roll < 0.12:
+            words.append(rng.choice(PROPER_NOUNS))
+        elif roll < 0.16:
+            words.append(str(rng.randint(1850, 2024)))
+        else:
+            words.append(rng.choice(WORDS))
+    words[0] = words[0][0].upper() + words[0][1:]
+    return " ".join(words) + "."
+
+
+def _paragraph(rng: random.Random, citation: list) -> str:
+    """One <p> with links, emphasis, citations and entities, like rendered wikitext"""
+    parts = []
+    for _ in range(rng.randint(3, 7)):
+        sentence = html.escape(_sentence(rng), quote=False)
+        roll = rng.random()
+        if roll < 0.3:
+            word = rng.choice(PROPER_NOUNS)
+            sentence = sentence.replace(" ", f' <a href="/wiki/{word}" title="{word}">{word}</a> ', 1)
+        elif roll < 0.4:
+            sentence = f"<i>{sentence}</i>"
+        elif roll < 0.45:
+            sentence += " Costs rose by 12&#160;% &amp; prices fell&#8212;sharply&#8211;in Zürich"
+        parts.append(sentence)
+        if rng.random() < 0.35:
+            citation[0] += 1
+            n = citation[0]
+            parts[-1] += (
+                f'<sup id="cite_ref-{n}" class="reference"><a href="#cite_note-{n}">&#91;{n}&#93;</a></sup>'
+            )
+    if rng.random() < 0.1:
+        parts.append("The figure was revised later [14] in the report.")
+    text = " ".join(parts)
+    # Rendered wikitext keeps source line breaks inside paragraphs
+    if rng.random() < 0.3:
+        text = text.replace(". ", ".\n", 1)
+    return f"<p>{text}\n</p>"
+
+
+def _heading(level: int, name: str, modern: bool) -> str:
+    label = name.replace("_", " ")
+    if modern:
+        return (
+            f'<div class="mw-heading mw-heading{level}"><h{level} id="{name}">{label}</h{level}>'
+            f'<span class="mw-editsection">[edit]</span></div>'
+        )
+    return f'<h{level}><span class="mw-headline" id="{name}">{label}</span><span class="mw-editsection">[edit]</span></h{level}>'
+
+
+def article_html(title: str, sections: int = 6, paragraphs: int = 3, modern_headings: bool = False) -> str:
+    """
+    Wikipedia-shaped HTML for an article, the same for the same arguments.
+
+    Includes what the extractor has to strip: an infobox table, citation
+    superscripts, inline style/script, thumbnails, short paragraphs and
+    See also/Notes/References/External links sections.
+    """
+    rng = random.Random(title)
+    display = html.escape(title.replace("_", " "))
+    citation = [0]
+    body = [
+        '<table class="infobox vcard"><tbody>'
+        f'<tr><th colspan="2" class="infobox-above">{display}</th></tr>'
+        '<tr><th>Founded</th><td>1991<sup class="reference"><a href="#cite_note-0">[0]</a></sup></td></tr>'
+        '<tr><td colspan="2"><p>Infobox paragraph text inside the summary table at the top of the article.</p></td></tr>'
+        "</tbody></table>",
+        '<p class="mw-empty-elt">\n</p>',
+        f"<p><b>{display}</b> is described in this article. " + _paragraph(rng, citation)[3:],
+        '<style data-mw-deduplicate="TemplateStyles:r1">.mw-parser-output .hatnote{font-style:italic}</style>',
+        "<p>Short paragraph.</p>",
+    ]
+    if sections == 0:
+        body.append(_paragraph(rng, citation))
+    for n in range(sections):
+        name = f"{SECTION_NAMES[n % len(SECTION_NAMES)]}_{n // len(SECTION_NAMES) + 1}"
+        body.append(_heading(2, name, modern_headings))
+        if rng.random() < 0.3:
+            body.append(
+                '<figure class="mw-default-size"><a href="/wiki/File:Example.jpg"><img src="x.jpg"></a>'
+                "<figcaption>A caption, not part of any paragraph.</figcaption></figure>"
+            )
+        for k in range(paragraphs):
+            if k and rng.random() < 0.25:
+                body.append(_heading(3, f"{name}_part_{k}", modern_headings))
+            body.append(_paragraph(rng, citation))
+        if rng.random() < 0.2:
+            body.append(
+                '<div class="thumb"><div class="thumbinner"><p>A paragraph inside a thumbnail block '
+                "describing the picture shown above it in the article.</p></div></div>"
+            )
+        if rng.random() < 0.15:
+            body.append("<!-- editor comment -->")
+            body.append("<script>document.write('inline script in content')</script>")
+        if rng.random() < 0.1:
+            body.append(
+                '<table class="wikitable"><tr><td><p>Table paragraph text inside a data table in the article body.</p>'
+                "</td></tr></table>"
+            )
+    body += [
+        _heading(2, "See_also", modern_headings),
+        '<ul><li><a href="/wiki/Computer_science">Computer science</a></li></ul>',
+        "<p>See also paragraph pointing readers to closely related articles.</p>",
+        _heading(2, "Notes", modern_headings),
+        "<p>Notes paragraph with explanatory footnotes about the cited sources.</p>",
+        _heading(2, "References", modern_headings),
+        '<div class="reflist"><ol class="references">'
+        + "".join(
+            f'<li id="cite_note-{n}"><span class="reference-text">Reference number {n}, a citation.</span></li>'
+            for n in range(1, citation[0] + 1)
+        )
+        + "</ol></div>",
+        "<h4>Sources</h4><p>Sources paragraph under a subheading of the references.</p>",
+        _heading(2, "External_links", modern_headings),
+        '<ul><li><a href="https://example.org">Official website</a></li></ul>',
+        '<div role="navigation" class="navbox"><table class="nowraplinks"><tr><td>'
+        + " &#183; ".join(f'<a href="/wiki/Topic_{n}">Topic {n}</a>' for n in range(60))
+        + "</td></tr></table></div>",
+    ]
+    return (
+        "<!DOCTYPE html>\n"
+        '<html class="client-nojs" lang="en" dir="ltr">\n<head>\n<meta charset="UTF-8">\n'
+        f"<title>{display} - Wikipedia</title>\n"
+        '<script>document.documentElement.className="client-js";RLCONF={"wgTitle":"x"};</script>\n'
+        f'<link rel="canonical" href="https://en.wikipedia.org/wiki/{html.escape(title)}">\n'
+        "</head>\n<body>\n"
+        f'<h1 id="firstHeading" class="firstHeading mw-first-heading"><span class="mw-page-title-main">{display}</span></h1>\n'
+        '<div id="bodyContent" class="vector-body"><div id="siteSub">From Wikipedia, the free encyclopedia</div>\n'
+        '<div id="mw-content-text" class="mw-body-content"><div class="mw-content-ltr mw-parser-output" lang="en" dir="ltr">\n'
+        + "\n".join(body)
+        + "\n</div></div></div>\n"
+        '<div id="catlinks"><p>Categories: Articles</p></div>\n'
+        "<script>(RLQ=window.RLQ||[]).push(function(){mw.config.set({});});</script>\n"
+        "</body>\n</html>\n"
+    )
+
+
+def write_pages(directory: Path = PAGES_DIR) -> None:
+    """Save the corpus pages (the fixtures the golden tests check against)"""
+    directory.mkdir(parents=True, exist_ok=True)
+    for title, (sections, paragraphs, modern) in CORPUS.items():
+        page = article_html(title, sections, paragraphs, modern)
+        (directory / f"{title}.html").write_text(page, encoding="utf-8")
+        print(f"{title}.html: {len(page) / 1024:.0f} KB")
+
+
+def saved_pages(directory: Path = PAGES_DIR) -> Dict[str, str]:
+    """Saved pages by article title"""
+    return {path.stem: path.read_text(encoding="utf-8") for path in sorted(directory.glob("*.html"))}
+
+
+class WikiStandIn:
+    """
+    Threaded HTTP server answering /wiki/<title> like Wikipedia.
+
+    delay adds latency to every response. requests counts answers by
+    (title, status). revise() changes an article so its ETag changes.
+    """
+
+    def __init__(self, delay: float = 0, pages_dir: Path = PAGES_DIR):
+        self.delay = delay
+        self.pages = saved_pages(pages_dir) if pages_dir.exists() else {}
+        self.revisions = Counter()
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def origin(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def page(self, title: str) -> Optional[str]:
+        """HTML served for a title, or None for a missing article"""
+        title = REDIRECTS.get(title, title)
+        if title.startswith("Nonexistent"):
+            return None
+        page = self.pages.get(title) or article_html(title)
+        if self.revisions[title]:
+            page = page.replace("</h1>", f"</h1><!-- revision {self.revisions[title]} -->", 1)
+        return page
+
+    def revise(self, title: str) -> None:
+        self.revisions[title] += 1
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, title: str, status: int, body: bytes = b"", headers: Optional[dict] = None):
+                # Counted before answering, so a client sees it once it has the response
+                with standin._lock:
+                    standin.requests[(title, status)] += 1
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if standin.delay:
+                    time.sleep(standin.delay)
+                path = urlsplit(self.path).path
+                title = unquote(path.split("/wiki/", 1)[-1]) if path.startswith("/wiki/") else ""
+                page = standin.page(title) if title else None
+                if page is None:
+                    self._send(title, 404, b"Not Found", {"Content-Type": "text/plain"})
+                else:
+                    body = page.encode("utf-8")
+                    etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                    validators = {"ETag": etag, "Last-Modified": LAST_MODIFIED}
+                    if self.headers.get("If-None-Match") == etag:
+                        self._send(title, 304, headers=validators)
+                    else:
+                        headers = {"Content-Type": "text/html; charset=UTF-8", **validators}
+                        if "gzip" in self.headers.get("Accept-Encoding", ""):
+                            body = gzip.compress(body, 6)
+                            headers["Content-Encoding"] = "gzip"
+                        self._send(title, 200, body, headers)
+
+        return Handler
+
+    def start(self, port: int = 0) -> "WikiStandIn":
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def fetches(self, status: Optional[int] = None) -> int:
+        """Answered requests, optionally only those with one status"""
+        with self._lock:
+            return sum(count for (_, code), count in self.requests.items() if status in (None, code))
+
+    def __enter__(self) -> "WikiStandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def route_scraper(origin: str) -> None:
+    """
+    Send the scraper's Wikipedia requests to origin (e.g. WikiStandIn.origin).
+
+    Replaces scraper.get_session / get_async_client with factories whose
+    clients rewrite https://en.wikipedia.org to origin; headers, pooling and
+    timeouts stay as in production.
+    """
+    import httpx
+    import requests
+    import requests.adapters
+
+    import scraper
+
+    class RewriteAdapter(requests.adapters.HTTPAdapter):
+        def send(self, request, **kwargs):
+            request.url = origin + request.url[len(WIKIPEDIA_ORIGIN):]
+            return super().send(request, **kwargs)
+
+    class RewriteTransport(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self._inner = httpx.AsyncHTTPTransport()
+            self._origin = httpx.URL(origin)
+
+        async def handle_async_request(self, request):
+            if request.url.host == "en.wikipedia.org":
+                request.url = request.url.copy_with(
+                    scheme=self._origin.scheme, host=self._origin.host, port=self._origin.port
+                )
+            return await self._inner.handle_async_request(request)
+
+        async def aclose(self):
+            await self._inner.aclose()
+
+    def get_session() -> "requests.Session":
+        if scraper._session is None:
+            session = requests.Session()
+            session.headers.update(scraper.WIKIPEDIA_HEADERS)
+            session.mount(WIKIPEDIA_ORIGIN, RewriteAdapter())
+            scraper._session = session
+        return scraper._session
+
+    def get_async_client() -> "httpx.AsyncClient":
+        if scraper._async_client is None or scraper._async_client.is_closed:
+            scraper._async_client = httpx.AsyncClient(
+                headers=scraper.WIKIPEDIA_HEADERS,
+                timeout=scraper.FETCH_TIMEOUT,
+                transport=RewriteTransport()
+            )
+        return scraper._async_client
+
+    scraper._session = None
+    scraper._async_client = None
+    scraper.get_session = get_session
+    scraper.get_async_client = get_async_client
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Wikipedia stand-in")
+    parser.add_argument("--write-pages", action="store_true", help=f"Regenerate {PAGES_DIR}")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--delay", type=float, default=0, help="Seconds added to every response")
+    args = parser.parse_args()
+    if args.write_pages:
+        write_pages()
+    else:
+        standin = WikiStandIn(args.delay).start(args.port)
+        print(f"Serving on {standin.origin}/wiki/<title>")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            standin.stop()
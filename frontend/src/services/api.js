@@ -55,11 +55,15 @@ export const generateQuiz = async (url, force = false) => {
   }
 };
 
-// Get list of all quizzes
-export const getQuizHistory = async () => {
+// Get one page of quiz history (newest first)
+export const getQuizHistory = async (cursor = null) => {
   try {
-    const response = await apiClient.get('/history/');
-    return response.data;
+    const params = cursor ? { cursor } : {};
+    const response = await apiClient.get('/history/', { params });
+    return {
+      items: response.data,
+      nextCursor: response.headers['x-next-cursor'] || null
+    };
   } catch (error) {
     const errorMessage = error.response?.data?.detail || 
                         'Failed to fetch quiz history';
@@ -6,6 +6,8 @@ import LoadingSpinner from '../components/LoadingSpinner';
 
 function HistoryTab() {
   const [history, setHistory] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [selectedQuiz, setSelectedQuiz] = useState(null);
@@ -20,7 +22,8 @@ function HistoryTab() {
     try {
       setLoading(true);
       const data = await getQuizHistory();
-      setHistory(data);
+      setHistory(data.items);
+      setNextCursor(data.nextCursor);
       setError(null);
     } catch (err) {
       setError(err.toString());
@@ -29,6 +32,19 @@ function HistoryTab() {
     }
   };
 
+  const fetchMoreHistory = async () => {
+    try {
+      setLoadingMore(true);
+      const data = await getQuizHistory(nextCursor);
+      setHistory((previous) => [...previous, ...data.items]);
+      setNextCursor(data.nextCursor);
+    } catch (err) {
+      alert('Failed to load more quizzes: ' + err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleViewDetails = async (quizId) => {
     try {
       setLoadingDetails(true);
@@ -179,6 +195,18 @@ function HistoryTab() {
             </tbody>
           </table>
         </div>
+
+        {nextCursor && (
+          <div className="mt-6 text-center">
+            <button
+              onClick={fetchMoreHistory}
+              disabled={loadingMore}
+              className="btn-secondary disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Modal */}